@@ -1,11 +1,31 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
+import click
 import traceback
-import re
-from flask_mysqldb import MySQL
 from flask_cors import CORS
+import contextvars
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
-from werkzeug.security import check_password_hash, generate_password_hash
+
+from auth import HasherBusy, PasswordHasher, SessionSigner, is_legacy_plaintext, session_secret_key
+from compression import Compress
+from db_pool import PooledMySQL, PoolTimeout
+from formats import JSON, NotAcceptable, encode, negotiate
+from match_engine import flatten_matches
+from metrics import InstrumentedSSCursor, Metrics
+from query_builder import FilteredQuery
+from reads import (
+    CARD_COLUMNS, CARD_FIELDS, COLLECTION_FIELDS, MARKET_TREND_COLUMNS, USER_COLUMNS,
+    WISHLIST_FIELDS, CardCatalogue, PartnerCache, card_item, card_name_filter, collection_item,
+    dashboard_reads, market_trend_item, parse_include, parse_match_mode, parse_page_args, project,
+    read_active_trades, read_cards, read_filtered, read_rows, read_trade_opportunities, read_users,
+    user_item, wishlist_item,
+)
+from sql_statements import load_statements, run
+from streaming import RowStream
+from trade_settlement import CollectionChanged, decline_trades, run_in_chunks, settle_trades
+from user_resolver import UserResolver
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend communication
@@ -16,55 +36,277 @@ app.config['MYSQL_USER'] = os.environ.get('MYSQL_USER', 'user')
 app.config['MYSQL_PASSWORD'] = os.environ.get('MYSQL_PASSWORD', 'password')
 app.config['MYSQL_DB'] = os.environ.get('MYSQL_DATABASE', 'app_db')
 
-# Initialize MySQL connection
-mysql = MySQL(app)
+# Connection pool sizing (see db_pool.ConnectionPool)
+app.config['MYSQL_POOL_MIN_SIZE'] = int(os.environ.get('MYSQL_POOL_MIN_SIZE', 2))
+app.config['MYSQL_POOL_MAX_SIZE'] = int(os.environ.get('MYSQL_POOL_MAX_SIZE', 10))
+app.config['MYSQL_POOL_IDLE_TIMEOUT'] = float(os.environ.get('MYSQL_POOL_IDLE_TIMEOUT', 300))
+app.config['MYSQL_POOL_PRE_PING'] = os.environ.get('MYSQL_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+app.config['MYSQL_POOL_WAIT_TIMEOUT'] = float(os.environ.get('MYSQL_POOL_WAIT_TIMEOUT', 5))
+
+# /api/cards response cache: how long browsers may reuse it, and how often the
+# catalogue version is re-checked against the database
+app.config['CARDS_CACHE_MAX_AGE'] = int(os.environ.get('CARDS_CACHE_MAX_AGE', 60))
+app.config['CARDS_VERSION_CHECK_INTERVAL'] = float(os.environ.get('CARDS_VERSION_CHECK_INTERVAL', 5))
+
+# Seconds a user's computed mutual matches are reused (0 disables the per-user cache)
+app.config['MATCHES_CACHE_TTL'] = float(os.environ.get('MATCHES_CACHE_TTL', 0))
+
+# username -> userID cache shared by the handlers that accept `username`
+app.config['USER_CACHE_MAX_SIZE'] = int(os.environ.get('USER_CACHE_MAX_SIZE', 10000))
+app.config['USER_CACHE_TTL'] = float(os.environ.get('USER_CACHE_TTL', 300))
+
+# Threads that run /api/dashboard sections in parallel, each on its own pooled connection.
+# Shared by all requests of a worker; keep it plus the server's request threads within
+# MYSQL_POOL_MAX_SIZE so sections do not queue for connections
+app.config['DASHBOARD_WORKERS'] = int(os.environ.get('DASHBOARD_WORKERS', 4))
+
+# Session tokens are signed with SECRET_KEY; import fails without it unless FLASK_DEBUG is set
+app.config['SECRET_KEY'] = session_secret_key()
+app.config['SESSION_MAX_AGE'] = int(os.environ.get('SESSION_MAX_AGE', 7 * 24 * 3600))
+
+# Password hashing process pool: worker count, queued+running job limit, per-job timeout
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or None
+app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 0)) or None
+app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+
+# Prometheus metrics at /metrics (metrics.py); disable to drop the cursor instrumentation
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+# Batch trade endpoints: trades per transaction, and retries of a chunk that hits a deadlock
+app.config['TRADE_BATCH_CHUNK'] = int(os.environ.get('TRADE_BATCH_CHUNK', 50))
+app.config['TRADE_BATCH_RETRIES'] = int(os.environ.get('TRADE_BATCH_RETRIES', 3))
+
+# Response compression: bodies below this many bytes are sent as they are
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+
+# Initialize pooled MySQL connections (mysql.connection is checked out per request)
+mysql = PooledMySQL(app)
+
+# Cache-Control for successful GETs by endpoint, unless the handler sets its own (get_cards
+# does, with an ETag). Shared lists may be cached briefly; per-user data only privately.
+CACHE_POLICIES = {
+    'get_market_trends': 'public, max-age=30',
+    'get_users': 'public, max-age=30',
+    'suggest_cards': 'public, max-age=300',
+    'get_collection': 'private, no-cache',
+    'get_wishlist': 'private, no-cache',
+    'get_wishlist_owners': 'private, no-cache',
+    'get_mutual_matches': 'private, no-cache',
+    'get_trade_opportunities': 'private, no-cache',
+    'list_active_trades': 'private, no-cache',
+    'get_dashboard': 'private, no-cache',
+    'get_session': 'no-store',
+    'health_check': 'no-store',
+    'metrics': 'no-store',
+}
+# Request/DB instrumentation at /metrics; registered before Compress so that its
+# after_request hook runs last and sees the bytes actually sent
+metrics = Metrics(app, mysql) if app.config['METRICS_ENABLED'] else None
+compress = Compress(app, policies=CACHE_POLICIES)
 
 SQL_QUERIES = {}
+FILTERED_QUERIES = {}
 def _load_queries():
-    """Load individual .sql files into SQL_QUERIES dict (no parsing of monolithic file)."""
+    """Compile each .sql file once into a SQLStatement in the SQL_QUERIES dict.
+
+    Optional-filter templates go into FILTERED_QUERIES and compile per filter combination.
+    """
     sql_dir = Path(__file__).parent / 'sql'
     name_to_file = {
         'get_cards': 'get_cards.sql',
         'login_get_user_by_username': 'login_get_user_by_username.sql',
-        'get_collection': 'get_collection.sql',
         'add_to_collection': 'add_to_collection.sql',
+        'add_to_collection_batch': 'add_to_collection_batch.sql',
         'get_users': 'get_users.sql',
            'signup_check_username': 'signup_check_username.sql',
            'signup_insert_user': 'signup_insert_user.sql',
            'remove_from_collection': 'remove_from_collection.sql',
-           'get_wishlist': 'get_wishlist.sql',
+        'decrement_collection': 'decrement_collection.sql',
            'add_to_wishlist': 'add_to_wishlist.sql',
            'remove_from_wishlist': 'remove_from_wishlist.sql',
         'get_wishlist_owners': 'get_wishlist_owners.sql',
-        'get_mutual_matches': 'get_mutual_matches.sql',
+        'match_owners_of_my_wishlist': 'match_owners_of_my_wishlist.sql',
+        'match_wishers_of_my_collection': 'match_wishers_of_my_collection.sql',
         'get_trade_opportunities': 'get_trade_opportunities.sql',
         'create_active_trade': 'create_active_trade.sql',
         'insert_tradecard': 'insert_tradecard.sql',
         'get_card_rarity': 'get_card_rarity.sql',
         'get_collection_quantity': 'get_collection_quantity.sql',
         'check_card_pending': 'check_card_pending.sql',
+        'lock_trade_cards': 'lock_trade_cards.sql',
+        'validate_new_trade': 'validate_new_trade.sql',
         'find_pending_trade': 'find_pending_trade.sql',
         'get_active_trades': 'get_active_trades.sql',
         'confirm_active_trade': 'confirm_active_trade.sql',
+        'lock_trades': 'lock_trades.sql',
+        'lock_trade_legs': 'lock_trade_legs.sql',
+        'take_from_collection_batch': 'take_from_collection_batch.sql',
+        'delete_collection_rows': 'delete_collection_rows.sql',
+        'remove_from_wishlist_batch': 'remove_from_wishlist_batch.sql',
         'decline_active_trade': 'decline_active_trade.sql',
         'get_market_trends': 'get_market_trends.sql',
+        'rebuild_card_market_stats': 'rebuild_card_market_stats.sql',
+        'get_opportunity_outbox_lag': 'get_opportunity_outbox_lag.sql',
+        'reconcile_trade_opportunity_cards': 'reconcile_trade_opportunity_cards.sql',
+        'reconcile_trade_opportunities_delete': 'reconcile_trade_opportunities_delete.sql',
+        'reconcile_trade_opportunities_insert': 'reconcile_trade_opportunities_insert.sql',
+        'get_catalog_version': 'get_catalog_version.sql',
+        'resolve_user_id': 'resolve_user_id.sql',
+        'rehash_user_password': 'rehash_user_password.sql',
+        'get_cards_page': 'get_cards_page.sql',
+        'match_partner_usernames': 'match_partner_usernames.sql',
     }
-    for name, filename in name_to_file.items():
+    SQL_QUERIES.update(load_statements(sql_dir, name_to_file))
+
+    # Templates whose optional filters are composed per request (see query_builder.py)
+    name_to_template = {
+        'get_collection': 'get_collection.sql',
+        'get_wishlist': 'get_wishlist.sql',
+    }
+    for name, filename in name_to_template.items():
         path = sql_dir / filename
         if path.exists():
-            SQL_QUERIES[name] = path.read_text(encoding='utf-8').strip().rstrip(';')
-        else:
-            # Leave missing entries absent; handlers will raise KeyError if used
-            pass
+            FILTERED_QUERIES[name] = FilteredQuery.from_text(name, path.read_text(encoding='utf-8'))
 
 _load_queries()
 
+user_ids = UserResolver(
+    SQL_QUERIES['resolve_user_id'],
+    max_size=app.config['USER_CACHE_MAX_SIZE'],
+    ttl=app.config['USER_CACHE_TTL'],
+)
+
+passwords = PasswordHasher(
+    max_workers=app.config['PASSWORD_HASH_WORKERS'],
+    max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+    timeout=app.config['PASSWORD_HASH_TIMEOUT'],
+)
+sessions = SessionSigner(app.config['SECRET_KEY'], max_age=app.config['SESSION_MAX_AGE'])
+
+# Serialized /api/cards response and card-name search index (see reads.CardCatalogue)
+catalogue = CardCatalogue(SQL_QUERIES, check_interval=app.config['CARDS_VERSION_CHECK_INTERVAL'])
+
+# Ranked mutual-match partners per user, reused for MATCHES_CACHE_TTL seconds
+MATCHES_CACHE_MAX_USERS = 10000
+partner_cache = PartnerCache(SQL_QUERIES, ttl=app.config['MATCHES_CACHE_TTL'], max_users=MATCHES_CACHE_MAX_USERS)
+
+# Runs /api/dashboard sections; threads start on first use, i.e. inside each server worker
+dashboard_executor = ThreadPoolExecutor(max_workers=app.config['DASHBOARD_WORKERS'],
+                                        thread_name_prefix='dashboard')
+
+
+def _read(read):
+    """Run a read generator (see reads.py) on a cursor of the request's connection."""
+    cur = mysql.connection.cursor()
+    try:
+        return run(cur, read)
+    finally:
+        cur.close()
+
+
+def _read_pooled(read):
+    """Run a read generator on a connection of its own, checked out of the pool."""
+    conn = mysql.pool.acquire()
+    try:
+        cur = conn.cursor()
+        try:
+            return run(cur, read)
+        finally:
+            cur.close()
+    finally:
+        mysql.pool.release(conn)
+
+
+def _stream_arg(*conflicts):
+    """True when `stream=1` asks for a streamed body; ValueError on a conflicting arg."""
+    if request.args.get('stream') not in ('1', 'true'):
+        return False
+    used = [name for name in conflicts if request.args.get(name)]
+    if used:
+        raise ValueError(f'stream cannot be combined with {", ".join(used)}')
+    return True
+
+
+def _stream(statement, values, shape, key='items', fields=None):
+    """Streamed JSON response for `statement`, on its own pooled connection (see streaming.py)."""
+    cursor_class = InstrumentedSSCursor if metrics else None
+    stream = RowStream(mysql.pool, statement, values, shape, key, fields, cursor_class=cursor_class)
+    return Response(stream, mimetype='application/json')
+
+
+def _format_arg(*conflicts):
+    """Negotiated media type (see formats.py); JSON when a conflicting arg is set."""
+    used = [name for name in conflicts if request.args.get(name)]
+    if not used:
+        return negotiate(request.args, request.accept_mimetypes)
+    if request.args.get('format', 'json') != 'json':
+        raise ValueError(f'format cannot be combined with {", ".join(used)}')
+    return JSON
+
+
+def _columnar(media_type, statement, columns, fields=None):
+    """Encode every row of `statement` column-wise as `media_type`."""
+    rows = _read(read_rows(statement))
+    resp = Response(encode(media_type, columns, rows, fields), mimetype=media_type)
+    resp.vary.add('Accept')
+    return resp
+
+
+def _timed(operation):
+    """Time a block under operation_duration_seconds (a no-op when metrics are off)."""
+    return metrics.timed(operation) if metrics else nullcontext()
+
+
+def _session_user():
+    """The {userID, username} signed into the request's bearer token, or None."""
+    if '_session_user' not in g:
+        auth = request.headers.get('Authorization', '')
+        scheme, _, token = auth.partition(' ')
+        g._session_user = sessions.verify(token.strip()) if scheme.lower() == 'bearer' and token else None
+    return g._session_user
+
+
+def _user_id_arg():
+    """userID from the query string, falling back to the session token's user."""
+    user_id = request.args.get('userID', type=int)
+    if not user_id:
+        session = _session_user()
+        if session:
+            user_id = session['userID']
+    return user_id
+
+
+def _service_unavailable(e):
+    """503 with Retry-After, for a saturated hashing pool or connection pool."""
+    resp = jsonify({'status': 'error', 'message': str(e)})
+    resp.status_code = 503
+    resp.headers['Retry-After'] = '1'
+    return resp
+
+
+# No pooled connection freed up within MYSQL_POOL_WAIT_TIMEOUT
+app.register_error_handler(PoolTimeout, _service_unavailable)
+
+
+def _server_error(e):
+    """Response for a view's catch-all `except Exception`: roll back and answer 500.
+
+    PoolTimeout is re-raised for its 503 handler. Only a connection the request actually
+    checked out is rolled back, so the error path never waits on the pool.
+    """
+    if isinstance(e, PoolTimeout):
+        raise e
+    mysql.rollback()
+    traceback.print_exc()
+    return jsonify({'status': 'error', 'message': str(e)}), 500
+
 
 @app.route('/api/signup', methods=['POST'])
 def signup():
     """Create a new user if the username is unique. Expects JSON: { username, password }.
 
-    Passwords are hashed server-side using Werkzeug's `generate_password_hash` before storage.
+    Passwords are hashed server-side using Werkzeug's `generate_password_hash` before storage,
+    on the bounded hashing pool (503 with Retry-After when it is saturated).
     """
     data = request.get_json(silent=True) or {}
     username = data.get('username')
@@ -75,7 +317,10 @@ def signup():
 
     # Hash the provided password for storage
     try:
-        password_hash = generate_password_hash(password)
+        with _timed('password_hash'):
+            password_hash = passwords.hash(password)
+    except HasherBusy as e:
+        return _service_unavailable(e)
     except Exception as e:
         return jsonify({'status': 'error', 'message': 'failed to hash password'}), 500
 
@@ -88,12 +333,7 @@ def signup():
             cur.close()
             return jsonify({'status': 'error', 'message': 'signup_check_username query missing'}), 500
 
-        if ':' in sql_check:
-            sql_no_comments = re.sub(r"--.*?\n", "\n", sql_check)
-            sql_no_comments = sql_no_comments.replace(':username', '%s')
-            cur.execute(sql_no_comments, (username,))
-        else:
-            cur.execute(sql_check, (username,))
+        sql_check.execute(cur, {'username': username})
 
         if cur.fetchone():
             cur.close()
@@ -105,21 +345,14 @@ def signup():
             cur.close()
             return jsonify({'status': 'error', 'message': 'signup_insert_user query missing'}), 500
 
-        if ':' in sql_insert:
-            sql_no_comments = re.sub(r"--.*?\n", "\n", sql_insert)
-            for k in ['username', 'passwordHash']:
-                sql_no_comments = sql_no_comments.replace(f':{k}', '%s')
-            cur.execute(sql_no_comments, (username, password_hash))
-        else:
-            cur.execute(sql_insert, (username, password_hash))
+        sql_insert.execute(cur, {'username': username, 'passwordHash': password_hash})
 
         mysql.connection.commit()
         cur.close()
+        user_ids.invalidate(username)
         return jsonify({'status': 'success'}), 201
     except Exception as e:
-        mysql.connection.rollback()
-        traceback.print_exc()
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return _server_error(e)
 
 @app.route('/')
 def hello_world():
@@ -129,42 +362,105 @@ def hello_world():
         'app': 'PocketTrader Backend'
     })
 
+
 @app.route('/api/cards')
 def get_cards():
-    """Get all Pokemon cards from the database"""
+    """Get all Pokemon cards from the database.
+
+    The serialized catalogue is cached in-process per CatalogVersion and served with a
+    strong ETag, so a matching If-None-Match gets a bodiless 304.
+
+    Optional `limit`/`cursor` return one keyset page with a `nextCursor`, and `fields`
+    projects each card to the listed keys; those requests bypass the cache.
+
+    `q` searches card names (`match` = prefix, substring or fuzzy; default substring) and
+    returns the best matches first, capped by `limit`; cursors do not apply to searches.
+
+    `stream=1` streams every card (optionally projected by `fields`) straight from the
+    database, bypassing the cache.
+
+    Full listings can also be negotiated as columnar JSON, MessagePack or Arrow (Accept
+    header or `format=`; see formats.py).
+    """
+    query = request.args.get('q')
     try:
-        cur = mysql.connection.cursor()
-        cur.execute(SQL_QUERIES['get_cards'])
-        cards = cur.fetchall()
-        cur.close()
+        limit, after, fields = parse_page_args(request.args, CARD_FIELDS)
+        match = parse_match_mode(request.args)
+        if query and after:
+            raise ValueError('cursor cannot be combined with q')
+        stream = _stream_arg('q', 'limit', 'cursor')
+        media_type = _format_arg('q', 'limit', 'cursor', 'stream')
+    except NotAcceptable as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 406
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
 
-        # Convert to list of dictionaries
-        card_list = []
-        for card in cards:
-            card_list.append({
-                'cardID': card[0],
-                'name': card[1],
-                'packName': card[2],
-                'rarity': card[3],
-                'type': card[4],
-                'imageURL': card[5]
-            })
+    try:
+        if media_type != JSON:
+            return _columnar(media_type, SQL_QUERIES['get_cards'], CARD_COLUMNS, fields)
+
+        if stream:
+            return _stream(SQL_QUERIES['get_cards'], None, card_item, 'cards', fields)
+
+        if query:
+            _, _, index = _read(catalogue.current())
+            card_list = project([index.cards[c] for c in index.search(query, match, limit)], fields)
+            return jsonify({'status': 'success', 'cards': card_list, 'count': len(card_list)})
+
+        if limit is not None or fields:
+            cards, next_cursor = _read(read_cards(SQL_QUERIES, limit, after))
+            card_list = project(cards, fields)
+            payload = {'status': 'success', 'cards': card_list, 'count': len(card_list)}
+            if limit is not None:
+                payload['nextCursor'] = next_cursor
+            return jsonify(payload)
+
+        etag, body, _ = _read(catalogue.current())
+        resp = Response(body, mimetype='application/json')
+        resp.set_etag(etag)
+        resp.cache_control.public = True
+        resp.cache_control.max_age = app.config['CARDS_CACHE_MAX_AGE']
+        resp.cache_control.must_revalidate = True
+        resp.vary.add('Accept')
+        return resp.make_conditional(request)
+    except Exception as e:
+        return _server_error(e)
 
-        return jsonify({
-            'status': 'success',
-            'cards': card_list,
-            'count': len(card_list)
-        })
+
+MAX_SUGGESTIONS = 50
+
+
+@app.route('/api/cards/suggest')
+def suggest_cards():
+    """Autocomplete card names. Query params: q (required), limit (default 10, max 50).
+
+    Served from the in-process search index: prefix matches first, then substring, then
+    typo-tolerant matches. Each item carries `match` naming the pass that found it.
+    """
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', 10, type=int)
+    if not query.strip():
+        return jsonify({'status': 'error', 'message': 'q required'}), 400
+    if limit <= 0 or limit > MAX_SUGGESTIONS:
+        return jsonify({'status': 'error', 'message': f'limit must be between 1 and {MAX_SUGGESTIONS}'}), 400
+
+    try:
+        _, _, index = _read(catalogue.current())
+        items = [dict(index.cards[card_id], match=mode) for card_id, mode in index.suggest(query, limit)]
+        return jsonify({'status': 'success', 'items': items, 'count': len(items)})
     except Exception as e:
-        return jsonify({
-            'status': 'error',
-            'message': str(e)
-        }), 500
+        return _server_error(e)
 
 
 @app.route('/api/login', methods=['POST'])
 def login():
-    """Basic login for the sample user."""
+    """Verify credentials and issue a signed session token.
+
+    The hash check runs on the bounded hashing pool (503 with Retry-After when saturated).
+    Legacy plaintext rows (stored values that are not Werkzeug hashes) are rehashed on their
+    first successful login. GET requests may send `Authorization: Bearer <token>` instead of
+    `userID`; the token identifies the user but no route requires it.
+    """
     data = request.get_json(silent=True) or {}
     username = data.get('username')
     password = data.get('password')
@@ -173,13 +469,7 @@ def login():
 
     try:
         cur = mysql.connection.cursor()
-        sql = SQL_QUERIES.get('login_get_user_by_username')
-        if sql and ':' in sql:
-            sql_no_comments = re.sub(r"--.*?\n", "\n", sql)
-            sql_no_comments = sql_no_comments.replace(':username', '%s')
-            cur.execute(sql_no_comments, (username,))
-        else:
-            cur.execute(SQL_QUERIES['login_get_user_by_username'], (username,))
+        SQL_QUERIES['login_get_user_by_username'].execute(cur, {'username': username})
         row = cur.fetchone()
         cur.close()
 
@@ -189,37 +479,57 @@ def login():
         user_id, uname, password_hash, date_joined = row
 
         # Support both hashed and legacy plain-text seeds to avoid lockout
-        password_valid = False
-        if password_hash:
-            try:
-                password_valid = check_password_hash(password_hash, password)
-            except ValueError:
-                password_valid = False
-        if not password_valid and password_hash == password:
-            password_valid = True
-
-        if not password_valid:
+        with _timed('password_verify'):
+            verified = passwords.verify(password_hash, password)
+        if not verified:
             return jsonify({'status': 'error', 'message': 'invalid credentials'}), 401
 
+        if is_legacy_plaintext(password_hash, password):
+            with _timed('password_hash'):
+                new_hash = passwords.hash(password)
+            cur = mysql.connection.cursor()
+            SQL_QUERIES['rehash_user_password'].execute(cur, {
+                'userId': user_id,
+                'passwordHash': new_hash,
+                'oldPasswordHash': password_hash,
+            })
+            mysql.connection.commit()
+            cur.close()
+
         return jsonify({
             'status': 'success',
             'user': {
                 'userID': user_id,
                 'username': uname,
                 'dateJoined': str(date_joined) if date_joined else None
-            }
+            },
+            'token': sessions.issue(user_id, uname)
         })
+    except HasherBusy as e:
+        return _service_unavailable(e)
     except Exception as e:
-        # Print full traceback to container logs to aid debugging during development
-        print('Error in get_collection:')
-        traceback.print_exc()
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return _server_error(e)
+
+
+@app.route('/api/session')
+def get_session():
+    """Return the user signed into the bearer token (no database access)."""
+    session = _session_user()
+    if not session:
+        return jsonify({'status': 'error', 'message': 'invalid or expired session'}), 401
+    return jsonify({'status': 'success', 'user': session})
 
 
 @app.route('/api/collection', methods=['GET'])
 def get_collection():
-    """Return a user's collection with optional filters (rarity, type, packName, name)."""
-    user_id = request.args.get('userID', type=int)
+    """Return a user's collection with optional filters (rarity, type, packName, name).
+
+    `name` is matched through the card-name search index; `match` picks prefix, substring
+    (default) or fuzzy. Optional `limit`/`cursor` return one keyset page (rarity, name order)
+    with a `nextCursor`; `fields` projects each item to the listed keys. `stream=1` streams
+    the unpaged result.
+    """
+    user_id = _user_id_arg()
     username = request.args.get('username')
     rarity = request.args.get('rarity')
     ctype = request.args.get('type')
@@ -229,68 +539,48 @@ def get_collection():
     if not user_id and not username:
         return jsonify({'status': 'error', 'message': 'userID or username required'}), 400
 
+    try:
+        limit, after, fields = parse_page_args(request.args, COLLECTION_FIELDS)
+        match = parse_match_mode(request.args)
+        stream = _stream_arg('limit', 'cursor')
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
     try:
         cur = mysql.connection.cursor()
 
         # Resolve user_id from username if needed
         if not user_id and username:
-            cur.execute("SELECT userID FROM User WHERE username = %s", (username,))
-            row = cur.fetchone()
-            if not row:
+            user_id = user_ids.resolve(cur, username)
+            if user_id is None:
                 cur.close()
                 return jsonify({'status': 'error', 'message': 'user not found'}), 404
-            user_id = row[0]
-
-        # Handle named-parameter SQL template (e.g. :userId, :rarityOpt, :typeOpt, :packOpt, :nameSearchOpt)
-        sql = SQL_QUERIES['get_collection']
-        # If the SQL uses named params, replace them with positional %s and build params tuple
-        if ':' in sql:
-            # Remove SQL line comments (starting with --) so we don't accidentally replace tokens inside comments
-            sql_no_comments = re.sub(r"--.*?\n", "\n", sql)
-
-            # Replace named tokens with %s in the cleaned SQL
-            for k in ['userId', 'rarityOpt', 'typeOpt', 'packOpt', 'nameSearchOpt']:
-                sql_no_comments = sql_no_comments.replace(f":{k}", "%s")
-
-            # Protect literal percent signs (e.g. in LIKE patterns) so Python-formatting
-            # used by the DB driver doesn't treat them as format directives.
-            placeholder = '__PCT_S__'
-            sql_no_comments = sql_no_comments.replace('%s', placeholder)
-            sql_no_comments = sql_no_comments.replace('%', '%%')
-            sql_no_comments = sql_no_comments.replace(placeholder, '%s')
-
-            # Build params tuple matching the expanded occurrences in the SQL
-            params = (
-                user_id,
-                rarity, rarity,
-                ctype, ctype,
-                pack, pack,
-                name_like, name_like,
-            )
-            cur.execute(sql_no_comments, params)
-        else:
-            # Fallback: existing positional template
-            params = (
-                user_id,
-                rarity, rarity,
-                ctype, ctype,
-                pack, pack,
-                name_like, name_like
-            )
-            cur.execute(sql, params)
-        rows = cur.fetchall()
+
+        # Only the supplied filters become predicates (see query_builder.FilteredQuery)
+        params = {
+            'userId': user_id,
+            'rarity': rarity,
+            'type': ctype,
+            'packName': pack,
+            'cardIds': run(cur, card_name_filter(catalogue, name_like, match)),
+        }
+        if stream and params['cardIds'] != []:
+            cur.close()
+            query = FILTERED_QUERIES['get_collection']
+            return _stream(query.variant_for(params), params, collection_item, fields=fields)
+
+        items, next_cursor = run(cur, read_filtered(
+            FILTERED_QUERIES['get_collection'], params, collection_item, limit, after))
         cur.close()
 
-        items = [{
-            'cardID': r[0], 'name': r[1], 'packName': r[2], 'rarity': r[3], 'type': r[4],
-            'quantity': r[5], 'imageURL': r[6]
-        } for r in rows]
+        items = project(items, fields)
 
-        return jsonify({'status': 'success', 'items': items, 'count': len(items)})
+        payload = {'status': 'success', 'items': items, 'count': len(items)}
+        if limit is not None:
+            payload['nextCursor'] = next_cursor
+        return jsonify(payload)
     except Exception as e:
-        print('Exception in get_collection:')
-        traceback.print_exc()
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return _server_error(e)
 
 
 @app.route('/api/collection', methods=['POST'])
@@ -309,20 +599,91 @@ def add_to_collection():
     try:
         cur = mysql.connection.cursor()
         # Use INSERT ... ON DUPLICATE KEY UPDATE as per R7-b
-        sql = SQL_QUERIES.get('add_to_collection')
-        if sql and ':' in sql:
-            sql_no_comments = re.sub(r"--.*?\n", "\n", sql)
-            sql_no_comments = sql_no_comments.replace(':userId', '%s').replace(':cardId', '%s').replace(':quantity', '%s')
-            cur.execute(sql_no_comments, (user_id, card_id, qty))
-        else:
-            cur.execute(SQL_QUERIES['add_to_collection'], (user_id, card_id, qty))
+        SQL_QUERIES['add_to_collection'].execute(cur, {'userId': user_id, 'cardId': card_id, 'quantity': qty})
         mysql.connection.commit()
         cur.close()
 
         return jsonify({'status': 'success'})
     except Exception as e:
-        mysql.connection.rollback()
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return _server_error(e)
+
+
+MAX_BATCH_ITEMS = 500
+
+
+@app.route('/api/collection/batch', methods=['POST'])
+def add_to_collection_batch():
+    """Add many cards to a user's collection in one transaction.
+
+    Expects JSON { userID, items: [{ cardID, quantity }] } (quantity defaults to 1). Valid
+    items are applied with one multi-row INSERT ... ON DUPLICATE KEY UPDATE, so the
+    Collection insert/update triggers fire per row exactly as for POST /api/collection.
+    Returns one result per item, in request order, with the resulting quantity.
+    """
+    data = request.get_json(silent=True) or {}
+    user_id = data.get('userID')
+    items = data.get('items')
+
+    if not user_id or not isinstance(items, list) or not items:
+        return jsonify({'status': 'error', 'message': 'userID and a non-empty items list required'}), 400
+    if len(items) > MAX_BATCH_ITEMS:
+        return jsonify({'status': 'error', 'message': f'at most {MAX_BATCH_ITEMS} items per batch'}), 400
+
+    results = []
+    for index, item in enumerate(items):
+        card_id = item.get('cardID') if isinstance(item, dict) else None
+        qty = item.get('quantity', 1) if isinstance(item, dict) else None
+        result = {'index': index, 'cardID': card_id}
+        if not card_id:
+            result.update(status='error', message='cardID required')
+        elif not isinstance(qty, int) or isinstance(qty, bool) or qty <= 0:
+            result.update(status='error', message='quantity must be a positive integer')
+        else:
+            result.update(status='pending', quantityAdded=qty)
+        results.append(result)
+
+    try:
+        cur = mysql.connection.cursor()
+        pending = [r for r in results if r['status'] == 'pending']
+        card_ids = list({r['cardID'] for r in pending})
+
+        if card_ids:
+            placeholders = ', '.join(['%s'] * len(card_ids))
+            cur.execute(f"SELECT cardID FROM Card WHERE cardID IN ({placeholders})", card_ids)
+            known = {row[0] for row in cur.fetchall()}
+            for r in pending:
+                if r['cardID'] not in known:
+                    r.update(status='error', message='card not found')
+                    del r['quantityAdded']
+            pending = [r for r in pending if r['status'] == 'pending']
+
+        if pending:
+            SQL_QUERIES['add_to_collection_batch'].executemany(cur, [
+                {'userId': user_id, 'cardId': r['cardID'], 'quantity': r['quantityAdded']}
+                for r in pending
+            ])
+            applied = list({r['cardID'] for r in pending})
+            placeholders = ', '.join(['%s'] * len(applied))
+            cur.execute(
+                f"SELECT cardID, quantity FROM Collection WHERE userID = %s AND cardID IN ({placeholders})",
+                [user_id] + applied
+            )
+            quantities = dict(cur.fetchall())
+            for r in pending:
+                r.update(status='success', quantity=quantities.get(r['cardID']))
+
+        mysql.connection.commit()
+        cur.close()
+
+        applied_count = sum(1 for r in results if r['status'] == 'success')
+        return jsonify({
+            'status': 'success' if applied_count == len(results) else 'partial',
+            'results': results,
+            'applied': applied_count,
+            'failed': len(results) - applied_count
+        })
+    except Exception as e:
+        return _server_error(e)
 
 
 @app.route('/api/collection', methods=['DELETE'])
@@ -342,76 +703,63 @@ def remove_from_collection():
             cur.close()
             return jsonify({'status': 'error', 'message': 'remove_from_collection query missing'}), 500
 
-        # Check current quantity first so we can decrement instead of deleting all copies.
-        # Lock the row to prevent race conditions
-        cur.execute(
-            "SELECT quantity FROM Collection WHERE userID = %s AND cardID = %s FOR UPDATE",
-            (user_id, card_id)
-        )
-        row = cur.fetchone()
-        if not row:
-            cur.close()
-            return jsonify({'status': 'error', 'message': 'card not found in collection'}), 404
-
-        current_qty = int(row[0])
-
-        if current_qty <= 1:
-            # Delete outright to avoid violating the quantity > 0 check constraint
-            cur.execute(
-                "DELETE FROM Collection WHERE userID = %s AND cardID = %s",
-                (user_id, card_id)
-            )
+        # One atomic decrement while copies remain; the conditional delete takes the last one.
+        # Both are single-row primary-key writes, so the row lock is held for one statement.
+        key = {'userId': user_id, 'cardId': card_id}
+        if SQL_QUERIES['decrement_collection'].execute(cur, key):
+            new_quantity = int(cur.lastrowid)
+        elif sql.execute(cur, key):
             new_quantity = 0
         else:
-            # Explicitly set the new quantity
-            new_quantity = current_qty - 1
-            cur.execute(
-                "UPDATE Collection SET quantity = %s WHERE userID = %s AND cardID = %s",
-                (new_quantity, user_id, card_id)
-            )
+            cur.close()
+            return jsonify({'status': 'error', 'message': 'card not found in collection'}), 404
 
         mysql.connection.commit()
         cur.close()
         return jsonify({'status': 'success', 'quantity': new_quantity})
     except Exception as e:
-        mysql.connection.rollback()
-        traceback.print_exc()
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return _server_error(e)
 
 @app.route('/api/users')
 def get_users():
-    """Get all users from the database"""
+    """Get all users from the database.
+
+    `stream=1` streams them; columnar formats are negotiated as for /api/cards.
+    """
     try:
-        cur = mysql.connection.cursor()
-        cur.execute(SQL_QUERIES['get_users'])
-        users = cur.fetchall()
-        cur.close()
+        media_type = _format_arg('stream')
+    except NotAcceptable as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 406
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
 
-        # Convert to list of dictionaries
-        user_list = []
-        for user in users:
-            user_list.append({
-                'userID': user[0],
-                'username': user[1],
-                'dateJoined': str(user[2]) if user[2] else None
-            })
+    try:
+        if media_type != JSON:
+            return _columnar(media_type, SQL_QUERIES['get_users'], USER_COLUMNS)
+        if _stream_arg():
+            return _stream(SQL_QUERIES['get_users'], None, user_item, 'users')
 
-        return jsonify({
+        user_list = _read(read_users(SQL_QUERIES))
+
+        resp = jsonify({
             'status': 'success',
             'users': user_list,
             'count': len(user_list)
         })
+        resp.vary.add('Accept')
+        return resp
     except Exception as e:
-        return jsonify({
-            'status': 'error',
-            'message': str(e)
-        }), 500
+        return _server_error(e)
 
 
 @app.route('/api/wishlist', methods=['GET'])
 def get_wishlist():
-    """Return a user's wishlist with optional filters (rarity, type, packName, name)."""
-    user_id = request.args.get('userID', type=int)
+    """Return a user's wishlist with optional filters (rarity, type, packName, name).
+
+    Supports the same `match` name search, `limit`/`cursor`/`fields` paging and `stream`
+    parameters as GET /api/collection.
+    """
+    user_id = _user_id_arg()
     username = request.args.get('username')
     rarity = request.args.get('rarity')
     ctype = request.args.get('type')
@@ -421,65 +769,50 @@ def get_wishlist():
     if not user_id and not username:
         return jsonify({'status': 'error', 'message': 'userID or username required'}), 400
 
+    try:
+        limit, after, fields = parse_page_args(request.args, WISHLIST_FIELDS)
+        match = parse_match_mode(request.args)
+        stream = _stream_arg('limit', 'cursor')
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
     try:
         cur = mysql.connection.cursor()
 
         # Resolve user_id from username if needed
         if not user_id and username:
-            cur.execute("SELECT userID FROM User WHERE username = %s", (username,))
-            row = cur.fetchone()
-            if not row:
+            user_id = user_ids.resolve(cur, username)
+            if user_id is None:
                 cur.close()
                 return jsonify({'status': 'error', 'message': 'user not found'}), 404
-            user_id = row[0]
 
-        sql = SQL_QUERIES.get('get_wishlist')
-        if not sql:
+        query = FILTERED_QUERIES.get('get_wishlist')
+        if not query:
             cur.close()
             return jsonify({'status': 'error', 'message': 'get_wishlist query missing'}), 500
 
-        if ':' in sql:
-            sql_no_comments = re.sub(r"--.*?\n", "\n", sql)
-            for k in ['userId', 'rarityOpt', 'typeOpt', 'packOpt', 'nameSearchOpt']:
-                sql_no_comments = sql_no_comments.replace(f':{k}', '%s')
-
-            # Protect literal percent signs in SQL (LIKE patterns) from Python formatting
-            placeholder = '__PCT_S__'
-            sql_no_comments = sql_no_comments.replace('%s', placeholder)
-            sql_no_comments = sql_no_comments.replace('%', '%%')
-            sql_no_comments = sql_no_comments.replace(placeholder, '%s')
-
-            params = (
-                user_id,
-                rarity, rarity,
-                ctype, ctype,
-                pack, pack,
-                name_like, name_like,
-            )
-            cur.execute(sql_no_comments, params)
-        else:
-            params = (
-                user_id,
-                rarity, rarity,
-                ctype, ctype,
-                pack, pack,
-                name_like, name_like,
-            )
-            cur.execute(sql, params)
+        params = {
+            'userId': user_id,
+            'rarity': rarity,
+            'type': ctype,
+            'packName': pack,
+            'cardIds': run(cur, card_name_filter(catalogue, name_like, match)),
+        }
+        if stream and params['cardIds'] != []:
+            cur.close()
+            return _stream(query.variant_for(params), params, wishlist_item, fields=fields)
 
-        rows = cur.fetchall()
+        items, next_cursor = run(cur, read_filtered(query, params, wishlist_item, limit, after))
         cur.close()
 
-        items = [{
-            'cardID': r[0], 'name': r[1], 'packName': r[2], 'rarity': r[3], 'type': r[4],
-            'dateAdded': str(r[5]) if r[5] else None, 'imageURL': r[6]
-        } for r in rows]
+        items = project(items, fields)
 
-        return jsonify({'status': 'success', 'items': items, 'count': len(items)})
+        payload = {'status': 'success', 'items': items, 'count': len(items)}
+        if limit is not None:
+            payload['nextCursor'] = next_cursor
+        return jsonify(payload)
     except Exception as e:
-        print('Exception in get_wishlist:')
-        traceback.print_exc()
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return _server_error(e)
 
 
 @app.route('/api/wishlist', methods=['POST'])
@@ -499,27 +832,13 @@ def add_to_wishlist():
             cur.close()
             return jsonify({'status': 'error', 'message': 'add_to_wishlist query missing'}), 500
 
-        if ':' in sql:
-            sql_no_comments = re.sub(r"--.*?$", "", sql, flags=re.MULTILINE)
-            ordered_keys = []
-
-            def repl(match):
-                ordered_keys.append(match.group(1))
-                return '%s'
-
-            sql_no_comments = re.sub(r':(cardId|userId)', repl, sql_no_comments)
-            params = tuple(card_id if key == 'cardId' else user_id for key in ordered_keys)
-            cur.execute(sql_no_comments, params)
-        else:
-            cur.execute(sql, (card_id, user_id))
+        sql.execute(cur, {'userId': user_id, 'cardId': card_id})
 
         mysql.connection.commit()
         cur.close()
         return jsonify({'status': 'success'})
     except Exception as e:
-        mysql.connection.rollback()
-        traceback.print_exc()
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return _server_error(e)
 
 
 @app.route('/api/wishlist', methods=['DELETE'])
@@ -539,28 +858,13 @@ def remove_from_wishlist():
             cur.close()
             return jsonify({'status': 'error', 'message': 'remove_from_wishlist query missing'}), 500
 
-        if ':' in sql:
-            sql_no_comments = re.sub(r"--.*?$", "", sql, flags=re.MULTILINE)
-            ordered_keys = []
-
-            def repl(match):
-                ordered_keys.append(match.group(1))
-                return '%s'
-
-            sql_no_comments = re.sub(r':(cardId|userId)', repl, sql_no_comments)
-
-            params = tuple(card_id if key == 'cardId' else user_id for key in ordered_keys)
-            cur.execute(sql_no_comments, params)
-        else:
-            cur.execute(sql, (card_id, user_id))
+        sql.execute(cur, {'userId': user_id, 'cardId': card_id})
 
         mysql.connection.commit()
         cur.close()
         return jsonify({'status': 'success'})
     except Exception as e:
-        mysql.connection.rollback()
-        traceback.print_exc()
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return _server_error(e)
 
 
 @app.route('/api/wishlist/owners', methods=['GET'])
@@ -585,20 +889,7 @@ def get_wishlist_owners():
             cur.close()
             return jsonify({'status': 'error', 'message': 'get_wishlist_owners query missing'}), 500
 
-        if ':' in sql:
-            sql_no_comments = re.sub(r"--.*?$", "", sql, flags=re.MULTILINE)
-            ordered_keys = []
-
-            def repl(match):
-                ordered_keys.append(match.group(1))
-                return '%s'
-
-            sql_no_comments = re.sub(r':(cardId|userId)', repl, sql_no_comments)
-
-            params = tuple(card_id if key == 'cardId' else user_id for key in ordered_keys)
-            cur.execute(sql_no_comments, params)
-        else:
-            cur.execute(sql, (card_id, user_id))
+        sql.execute(cur, {'userId': user_id, 'cardId': card_id})
 
         rows = cur.fetchall()
         cur.close()
@@ -609,68 +900,56 @@ def get_wishlist_owners():
 
         return jsonify({'status': 'success', 'items': items, 'count': len(items)})
     except Exception as e:
-        print('Exception in get_wishlist_owners:')
-        traceback.print_exc()
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return _server_error(e)
 
 
+# Per-user ranked partners from match_engine, reused for MATCHES_CACHE_TTL seconds
 @app.route('/api/matches', methods=['GET'])
 def get_mutual_matches():
     """Find mutual trade matches for the logged-in user.
 
     Accepts `userID` or `username` as query params. Returns items with partnerID, partnerName,
-    iWant_cardID, iWant_name, rarity_required, theyWant_cardID, theyWant_name.
+    iWant_cardID, iWant_name, rarity_required, theyWant_cardID, theyWant_name, plus `partners`:
+    the same matches grouped by partner and rarity, best trading partners first (see
+    match_engine). Optional `limit` keeps only the top N partners; `refresh=1` bypasses the
+    per-user cache when MATCHES_CACHE_TTL is set.
     """
-    user_id = request.args.get('userID', type=int)
+    user_id = _user_id_arg()
     username = request.args.get('username')
+    limit = request.args.get('limit', type=int)
+    refresh = request.args.get('refresh') in ('1', 'true')
 
     if not user_id and not username:
         return jsonify({'status': 'error', 'message': 'userID or username required'}), 400
+    if limit is not None and limit <= 0:
+        return jsonify({'status': 'error', 'message': 'limit must be a positive integer'}), 400
 
     try:
         cur = mysql.connection.cursor()
 
         # Resolve user_id from username if needed
         if not user_id and username:
-            cur.execute("SELECT userID FROM User WHERE username = %s", (username,))
-            row = cur.fetchone()
-            if not row:
+            user_id = user_ids.resolve(cur, username)
+            if user_id is None:
                 cur.close()
                 return jsonify({'status': 'error', 'message': 'user not found'}), 404
-            user_id = row[0]
-
-        sql = SQL_QUERIES.get('get_mutual_matches')
-        if not sql:
-            cur.close()
-            return jsonify({'status': 'error', 'message': 'get_mutual_matches query missing'}), 500
-
-        if ':' in sql:
-            sql_no_comments = re.sub(r"--.*?\n", "\n", sql)
-            sql_no_comments = sql_no_comments.replace(':me', '%s')
-            cur.execute(sql_no_comments, (user_id,))
-        else:
-            cur.execute(sql, (user_id,))
 
-        rows = cur.fetchall()
+        partners = run(cur, partner_cache.ranked(user_id, refresh))
         cur.close()
 
-        items = [{
-            'partnerID': r[0], 'partnerName': r[1],
-            'iWant_cardID': r[2], 'iWant_name': r[3], 'rarity_required': r[4],
-            'theyWant_cardID': r[5], 'theyWant_name': r[6]
-        } for r in rows]
+        if limit is not None:
+            partners = partners[:limit]
+        items = flatten_matches(partners)
 
-        return jsonify({'status': 'success', 'items': items, 'count': len(items)})
+        return jsonify({'status': 'success', 'items': items, 'count': len(items), 'partners': partners})
     except Exception as e:
-        print('Exception in get_mutual_matches:')
-        traceback.print_exc()
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return _server_error(e)
 
 
 @app.route('/api/trade-opportunities', methods=['GET'])
 def get_trade_opportunities():
     """Return trade opportunities targeting the given user (userID or username)."""
-    user_id = request.args.get('userID', type=int)
+    user_id = _user_id_arg()
     username = request.args.get('username')
 
     if not user_id and not username:
@@ -681,37 +960,17 @@ def get_trade_opportunities():
 
         # Resolve user_id from username if needed
         if not user_id and username:
-            cur.execute("SELECT userID FROM User WHERE username = %s", (username,))
-            row = cur.fetchone()
-            if not row:
+            user_id = user_ids.resolve(cur, username)
+            if user_id is None:
                 cur.close()
                 return jsonify({'status': 'error', 'message': 'user not found'}), 404
-            user_id = row[0]
-
-        sql = SQL_QUERIES.get('get_trade_opportunities')
-        if not sql:
-            cur.close()
-            return jsonify({'status': 'error', 'message': 'get_trade_opportunities query missing'}), 500
-
-        if ':' in sql:
-            sql_no_comments = re.sub(r"--.*?\n", "\n", sql)
-            sql_no_comments = sql_no_comments.replace(':targetId', '%s')
-            cur.execute(sql_no_comments, (user_id,))
-        else:
-            cur.execute(sql, (user_id,))
 
-        rows = cur.fetchall()
+        items = run(cur, read_trade_opportunities(SQL_QUERIES, user_id))
         cur.close()
 
-        items = [{
-            'ownerID': r[0], 'ownerName': r[1], 'cardID': r[2], 'cardName': r[3], 'createdAt': str(r[4]) if r[4] else None
-        } for r in rows]
-
         return jsonify({'status': 'success', 'items': items, 'count': len(items)})
     except Exception as e:
-        print('Exception in get_trade_opportunities:')
-        traceback.print_exc()
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return _server_error(e)
 
 
 @app.route('/api/active-trades', methods=['POST'])
@@ -726,7 +985,7 @@ def create_active_trade():
 
     if not user1 or not user2 or not cardSent1 or not cardSent2 or not createdBy:
         return jsonify({'status': 'error', 'message': 'user1,user2,cardSent1,cardSent2,createdBy required'}), 400
-    # Perform validations and multi-statement creation in the app using SQL files (no procedures)
+    # Validate with one locking read, then insert, all in one transaction (no procedures)
     try:
         cur = mysql.connection.cursor()
 
@@ -735,78 +994,59 @@ def create_active_trade():
             cur.close()
             return jsonify({'status': 'error', 'message': 'createdBy must be one of the participants'}), 400
 
-        # 1) Check rarities
-        sql_r = SQL_QUERIES.get('get_card_rarity')
-        if not sql_r:
-            cur.close()
-            return jsonify({'status': 'error', 'message': 'get_card_rarity query missing'}), 500
-        cur.execute(sql_r, (cardSent1,))
-        r1 = cur.fetchone()
-        cur.execute(sql_r, (cardSent2,))
-        r2 = cur.fetchone()
-        if not r1 or not r2 or r1[0] != r2[0]:
-            cur.close()
-            return jsonify({'status': 'error', 'message': 'cards must exist and have matching rarity'}), 400
-
-        # 2) Check quantities (>2 required by business rule)
-        sql_q = SQL_QUERIES.get('get_collection_quantity')
-        if not sql_q:
+        # 1) Lock both Card rows in cardID order, then validate rarities, quantities (>= 2) and
+        #    pending status in one locking read. The Card and Collection rows stay locked until
+        #    the inserts below commit.
+        sql_v = SQL_QUERIES.get('validate_new_trade')
+        if not sql_v:
             cur.close()
-            return jsonify({'status': 'error', 'message': 'get_collection_quantity query missing'}), 500
-        cur.execute(sql_q, (user1, cardSent1))
-        q1r = cur.fetchone()
-        cur.execute(sql_q, (user2, cardSent2))
-        q2r = cur.fetchone()
-        q1 = q1r[0] if q1r else None
-        q2 = q2r[0] if q2r else None
-        if q1 is None or q1 < 2:
+            return jsonify({'status': 'error', 'message': 'validate_new_trade query missing'}), 500
+        SQL_QUERIES['lock_trade_cards'].execute(cur, {'cardSent1': cardSent1, 'cardSent2': cardSent2})
+        sql_v.execute(cur, {'user1': user1, 'user2': user2, 'cardSent1': cardSent1, 'cardSent2': cardSent2})
+        rarity1, rarity2, q1, q2, pending1, pending2 = cur.fetchone()
+
+        error = None
+        if rarity1 is None or rarity2 is None or rarity1 != rarity2:
+            error = 'cards must exist and have matching rarity'
+        elif q1 is None or q1 < 2:
+            error = 'user1 does not have >= 2 copies of cardSent1'
+        elif q2 is None or q2 < 2:
+            error = 'user2 does not have >= 2 copies of cardSent2'
+        elif pending1:
+            error = 'cardSent1 is already part of a pending trade'
+        elif pending2:
+            error = 'cardSent2 is already part of a pending trade'
+        if error:
+            mysql.connection.rollback()
             cur.close()
-            return jsonify({'status': 'error', 'message': 'user1 does not have >= 2 copies of cardSent1'}), 400
-        if q2 is None or q2 < 2:
-            cur.close()
-            return jsonify({'status': 'error', 'message': 'user2 does not have >= 2 copies of cardSent2'}), 400
+            return jsonify({'status': 'error', 'message': error}), 400
 
-        # 3) Check neither card is already in a pending trade
-        sql_chk = SQL_QUERIES.get('check_card_pending')
-        if not sql_chk:
-            cur.close()
-            return jsonify({'status': 'error', 'message': 'check_card_pending query missing'}), 500
-        cur.execute(sql_chk, (cardSent1,))
-        if cur.fetchone():
-            cur.close()
-            return jsonify({'status': 'error', 'message': 'cardSent1 is already part of a pending trade'}), 400
-        cur.execute(sql_chk, (cardSent2,))
-        if cur.fetchone():
-            cur.close()
-            return jsonify({'status': 'error', 'message': 'cardSent2 is already part of a pending trade'}), 400
-
-        # 4) Insert Trade and Tradecard rows within a transaction
+        # 2) Insert Trade and both Tradecard rows (one multi-row INSERT) in the same transaction
         sql_insert_trade = SQL_QUERIES.get('create_active_trade')
         sql_insert_tradecard = SQL_QUERIES.get('insert_tradecard')
         if not sql_insert_trade or not sql_insert_tradecard:
             cur.close()
             return jsonify({'status': 'error', 'message': 'insert queries missing'}), 500
 
-        cur.execute(sql_insert_trade, (user1, user2, createdBy))
+        sql_insert_trade.execute(cur, (user1, user2, createdBy))
         new_trade_id = cur.lastrowid
 
-        # insert two tradecard rows
-        cur.execute(sql_insert_tradecard, (new_trade_id, cardSent1, user1, user2))
-        cur.execute(sql_insert_tradecard, (new_trade_id, cardSent2, user2, user1))
+        sql_insert_tradecard.executemany(cur, [
+            (new_trade_id, cardSent1, user1, user2),
+            (new_trade_id, cardSent2, user2, user1),
+        ])
 
         mysql.connection.commit()
         cur.close()
         return jsonify({'status': 'success'}), 201
     except Exception as e:
-        mysql.connection.rollback()
-        traceback.print_exc()
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return _server_error(e)
 
 
 @app.route('/api/active-trades', methods=['GET'])
 def list_active_trades():
     """List active trades for a user. Accepts query param userID or username."""
-    user_id = request.args.get('userID', type=int)
+    user_id = _user_id_arg()
     username = request.args.get('username')
 
     if not user_id and not username:
@@ -815,46 +1055,17 @@ def list_active_trades():
     try:
         cur = mysql.connection.cursor()
         if not user_id and username:
-            cur.execute("SELECT userID FROM User WHERE username = %s", (username,))
-            row = cur.fetchone()
-            if not row:
+            user_id = user_ids.resolve(cur, username)
+            if user_id is None:
                 cur.close()
                 return jsonify({'status': 'error', 'message': 'user not found'}), 404
-            user_id = row[0]
-
-        # Use the SQL query loaded from backend/sql (selects from active_trades_view)
-        sql = SQL_QUERIES.get('get_active_trades')
-        if not sql:
-            cur.close()
-            return jsonify({'status': 'error', 'message': 'get_active_trades query missing'}), 500
 
-        cur.execute(sql, (user_id, user_id))
-        rows = cur.fetchall()
+        items = run(cur, read_active_trades(SQL_QUERIES, user_id))
         cur.close()
 
-        items = []
-        for r in rows:
-            # active_trades_view columns (after schema change):
-            # 0: tradeID, 1: initiatorID, 2: responderID,
-            # 3: cardOfferedByUser1, 4: cardOfferedByUser1Name, 5: cardOfferedByUser1Image,
-            # 6: cardOfferedByUser2, 7: cardOfferedByUser2Name, 8: cardOfferedByUser2Image,
-            # 9: status, 10: createdBy, 11: confirmedBy, 12: dateCompleted, 13: dateStarted
-            status = r[9]
-            items.append({
-                'initiatorID': r[1], 'responderID': r[2],
-                'cardOfferedByUser1': r[3], 'cardOfferedByUser1Name': r[4], 'cardOfferedByUser1Image': r[5],
-                'cardOfferedByUser2': r[6], 'cardOfferedByUser2Name': r[7], 'cardOfferedByUser2Image': r[8],
-                'status': status,
-                'confirmed': True if status == 'accepted' else False,
-                'createdBy': r[10], 'confirmedBy': r[11],
-                'dateCompleted': str(r[12]) if r[12] else None,
-                'createdAt': str(r[13]) if r[13] else None
-            })
-
         return jsonify({'status': 'success', 'items': items, 'count': len(items)})
     except Exception as e:
-        traceback.print_exc()
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return _server_error(e)
 
 
 @app.route('/api/active-trades/confirm', methods=['POST'])
@@ -869,8 +1080,12 @@ def confirm_active_trade():
 
     if not confirmedBy or not user1 or not user2 or not cardSent1 or not cardSent2:
         return jsonify({'status': 'error', 'message': 'confirmedBy,user1,user2,cardSent1,cardSent2 required'}), 400
+    try:
+        confirmedBy = int(confirmedBy)
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'confirmedBy must be a userID'}), 400
 
-    # Locate the matching pending trade, then mark accepted. Triggers will handle swap.
+    # Locate the matching pending trade, then settle it (see trade_settlement.py)
     try:
         cur = mysql.connection.cursor()
         sql_find = SQL_QUERIES.get('find_pending_trade')
@@ -879,26 +1094,26 @@ def confirm_active_trade():
             return jsonify({'status': 'error', 'message': 'find_pending_trade query missing'}), 500
 
         # pass params: card1, card2, (user1,user2) and (user2,user1) to match orientation
-        cur.execute(sql_find, (cardSent1, cardSent2, user1, user2, user2, user1))
+        sql_find.execute(cur, (cardSent1, cardSent2, user1, user2, user2, user1))
         row = cur.fetchone()
         if not row:
             cur.close()
             return jsonify({'status': 'error', 'message': 'no matching pending trade found'}), 404
         trade_id = row[0]
 
-        sql_confirm = SQL_QUERIES.get('confirm_active_trade')
-        if not sql_confirm:
+        reason = settle_trades(cur, SQL_QUERIES, [trade_id], confirmedBy)[trade_id]
+        if reason is not None:
+            mysql.connection.rollback()
             cur.close()
-            return jsonify({'status': 'error', 'message': 'confirm_active_trade query missing'}), 500
-
-        cur.execute(sql_confirm, (confirmedBy, trade_id))
+            return jsonify({'status': 'error', 'message': reason}), 409
         mysql.connection.commit()
         cur.close()
         return jsonify({'status': 'success'})
+    except CollectionChanged as e:
+        mysql.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 409
     except Exception as e:
-        mysql.connection.rollback()
-        traceback.print_exc()
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return _server_error(e)
 
 
 @app.route('/api/active-trades', methods=['DELETE'])
@@ -920,7 +1135,7 @@ def decline_active_trade():
             cur.close()
             return jsonify({'status': 'error', 'message': 'find_pending_trade query missing'}), 500
 
-        cur.execute(sql_find, (cardSent1, cardSent2, user1, user2, user2, user1))
+        sql_find.execute(cur, (cardSent1, cardSent2, user1, user2, user2, user1))
         row = cur.fetchone()
         if not row:
             cur.close()
@@ -932,46 +1147,207 @@ def decline_active_trade():
             cur.close()
             return jsonify({'status': 'error', 'message': 'decline_active_trade query missing'}), 500
 
-        cur.execute(sql_decline, (trade_id,))
+        sql_decline.execute(cur, {'tradeIds': [trade_id]})
         mysql.connection.commit()
         cur.close()
         return jsonify({'status': 'success'})
     except Exception as e:
-        mysql.connection.rollback()
-        traceback.print_exc()
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return _server_error(e)
+
+def _trade_ids_arg(data):
+    """The validated `tradeIDs` list of a batch trade request, or raise ValueError."""
+    trade_ids = data.get('tradeIDs')
+    if not isinstance(trade_ids, list) or not trade_ids:
+        raise ValueError('a non-empty tradeIDs list required')
+    if len(trade_ids) > MAX_BATCH_ITEMS:
+        raise ValueError(f'at most {MAX_BATCH_ITEMS} tradeIDs per batch')
+    if any(not isinstance(t, int) or isinstance(t, bool) for t in trade_ids):
+        raise ValueError('tradeIDs must be integers')
+    return trade_ids
+
+
+def _trade_batch_response(trade_ids, apply):
+    """Run `apply` over `trade_ids` in chunked transactions and report one result per ID."""
+    outcome, retries = run_in_chunks(
+        mysql.connection, trade_ids, apply,
+        chunk_size=app.config['TRADE_BATCH_CHUNK'], retries=app.config['TRADE_BATCH_RETRIES'],
+    )
+    results = []
+    for trade_id in trade_ids:
+        reason = outcome.get(trade_id)
+        if reason is None:
+            results.append({'tradeID': trade_id, 'status': 'success'})
+        else:
+            results.append({'tradeID': trade_id, 'status': 'error', 'message': reason})
+    applied = sum(1 for r in results if r['status'] == 'success')
+    return jsonify({
+        'status': 'success' if applied == len(results) else 'partial',
+        'results': results,
+        'applied': applied,
+        'failed': len(results) - applied,
+        'retries': retries
+    })
+
+
+@app.route('/api/active-trades/confirm/batch', methods=['POST'])
+def confirm_active_trades_batch():
+    """Confirm many pending trades by ID. Expects JSON { confirmedBy, tradeIDs: [...] }.
+
+    Trades settle TRADE_BATCH_CHUNK at a time, one transaction per chunk, and chunks that
+    deadlock are retried. Returns a result per tradeID in request order (see run_in_chunks).
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        confirmed_by = int(data.get('confirmedBy'))
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'confirmedBy must be a userID'}), 400
+    try:
+        trade_ids = _trade_ids_arg(data)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    try:
+        return _trade_batch_response(
+            trade_ids, lambda cur, chunk: settle_trades(cur, SQL_QUERIES, chunk, confirmed_by))
+    except Exception as e:
+        return _server_error(e)
+
+
+@app.route('/api/active-trades/batch', methods=['DELETE'])
+def decline_active_trades_batch():
+    """Decline many pending trades by ID. Expects JSON { declinedBy, tradeIDs: [...] }.
+
+    Only trades `declinedBy` is a participant in are declined; the rest are reported as
+    per-item errors. Results as for confirm.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        declined_by = int(data.get('declinedBy'))
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'declinedBy must be a userID'}), 400
+    try:
+        trade_ids = _trade_ids_arg(data)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    try:
+        return _trade_batch_response(
+            trade_ids, lambda cur, chunk: decline_trades(cur, SQL_QUERIES, chunk, declined_by))
+    except Exception as e:
+        return _server_error(e)
+
+@app.route('/api/dashboard', methods=['GET'])
+def get_dashboard():
+    """Everything the trades page loads, in one response.
+
+    Query params: userID or username, and optionally `include` (comma-separated sections:
+    activeTrades, users, tradeOpportunities, collection, matches, cards; default all).
+    Each section has the same shape as the body of the endpoint it stands in for. The
+    sections run in parallel: the first on the request's connection, the rest on
+    dashboard_executor threads with their own pooled connections.
+    """
+    user_id = _user_id_arg()
+    username = request.args.get('username')
+
+    if not user_id and not username:
+        return jsonify({'status': 'error', 'message': 'userID or username required'}), 400
+    try:
+        sections = parse_include(request.args)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    try:
+        if not user_id:
+            user_id = _read(user_ids.lookup(username))
+            if user_id is None:
+                return jsonify({'status': 'error', 'message': 'user not found'}), 404
+
+        reads = dashboard_reads(SQL_QUERIES, FILTERED_QUERIES['get_collection'], catalogue,
+                                partner_cache, user_id, sections)
+        first, *rest = sections
+        # Each section runs in a copy of this context so its queries count toward the request
+        futures = {
+            name: dashboard_executor.submit(contextvars.copy_context().run, _read_pooled, reads[name])
+            for name in rest
+        }
+        payload = {'status': 'success', 'userID': user_id, first: _read(reads[first])}
+        for name, future in futures.items():
+            payload[name] = future.result()
+        return jsonify(payload)
+    except Exception as e:
+        return _server_error(e)
+
 
 @app.route('/api/market-trends', methods=['GET'])
 def get_market_trends():
-    """Return market trends data from the market_trends_view."""
+    """Return market trends from CardMarketStats, highest trend (demand - supply) first.
+
+    `stream=1` streams the items instead of building the whole list first. Columnar JSON,
+    MessagePack and Arrow can be negotiated as for /api/cards.
+    """
     try:
-        cur = mysql.connection.cursor()
-        # The view is already ordered by valueScore DESC
+        media_type = _format_arg('stream')
+    except NotAcceptable as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 406
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    try:
+        # Ordered by trend DESC via idx_cardmarketstats_trend
         sql = SQL_QUERIES.get('get_market_trends')
         if not sql:
-            cur.close()
             return jsonify({'status': 'error', 'message': 'get_market_trends query missing'}), 500
+        if media_type != JSON:
+            return _columnar(media_type, sql, MARKET_TREND_COLUMNS)
+        if _stream_arg():
+            return _stream(sql, None, market_trend_item)
 
-        cur.execute(sql)
+        cur = mysql.connection.cursor()
+        sql.execute(cur)
         rows = cur.fetchall()
         cur.close()
 
-        items = [{
-            'cardID': r[0],
-            'name': r[1],
-            'rarity': r[2],
-            'packName': r[3],
-            'imageURL': r[4],
-            'demand': r[5],
-            'supply': r[6],
-            'trend': r[7]
-        } for r in rows]
+        items = [market_trend_item(r) for r in rows]
 
-        return jsonify({'status': 'success', 'items': items, 'count': len(items)})
+        resp = jsonify({'status': 'success', 'items': items, 'count': len(items)})
+        resp.vary.add('Accept')
+        return resp
     except Exception as e:
-        print('Exception in get_market_trends:')
-        traceback.print_exc()
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return _server_error(e)
+
+@app.cli.command('rebuild-market-stats')
+def rebuild_market_stats():
+    """Recompute CardMarketStats from Wishlist and Collection (repairs trigger drift)."""
+    cur = mysql.connection.cursor()
+    SQL_QUERIES['rebuild_card_market_stats'].execute(cur)
+    mysql.connection.commit()
+    cur.execute("SELECT COUNT(*) FROM CardMarketStats")
+    print(f'CardMarketStats rebuilt: {cur.fetchone()[0]} cards')
+    cur.close()
+
+@app.cli.command('reconcile-trade-opportunities')
+@click.option('--batch-size', default=500, show_default=True, help='Cards per transaction.')
+def reconcile_trade_opportunities(batch_size):
+    """Repair TradeOpportunity drift: drop stale rows and add missing ones, card batch by batch.
+
+    Each batch of cards is one short transaction, so the job can run against a live database.
+    """
+    cur = mysql.connection.cursor()
+    after = ''
+    removed = added = 0
+    while True:
+        SQL_QUERIES['reconcile_trade_opportunity_cards'].execute(
+            cur, {'afterCardId': after, 'batchSize': batch_size})
+        card_ids = [r[0] for r in cur.fetchall()]
+        if not card_ids:
+            break
+        bounds = {'afterCardId': after, 'lastCardId': card_ids[-1]}
+        removed += SQL_QUERIES['reconcile_trade_opportunities_delete'].execute(cur, bounds)
+        added += SQL_QUERIES['reconcile_trade_opportunities_insert'].execute(cur, bounds)
+        mysql.connection.commit()
+        after = card_ids[-1]
+    cur.close()
+    print(f'TradeOpportunity reconciled: {removed} stale rows removed, {added} missing rows added')
 
 @app.route('/api/health')
 def health_check():
@@ -983,6 +1359,8 @@ def health_check():
         card_count = cur.fetchone()[0]
         cur.execute("SELECT COUNT(*) FROM User")
         user_count = cur.fetchone()[0]
+        SQL_QUERIES['get_opportunity_outbox_lag'].execute(cur)
+        outbox_pending, outbox_oldest = cur.fetchone()
         cur.close()
 
         return jsonify({
@@ -990,14 +1368,35 @@ def health_check():
             'database': 'connected',
             'message': 'Pokemon Trading Card App Backend',
             'card_count': card_count,
-            'user_count': user_count
+            'user_count': user_count,
+            'pool': mysql.pool.stats(),
+            'user_cache': user_ids.stats(),
+            'password_hasher': passwords.stats(),
+            'compression': compress.stats(),
+            # Refreshes waiting for opportunity_worker.py; the oldest age is the current lag
+            'opportunity_outbox': {
+                'pending': outbox_pending,
+                'oldest_seconds': float(outbox_oldest) if outbox_oldest is not None else None,
+            },
         })
     except Exception as e:
         return jsonify({
             'status': 'unhealthy',
             'database': 'disconnected',
-            'error': str(e)
+            'error': str(e),
+            'pool': mysql.pool.stats()
         }), 500
 
+def create_app():
+    """Return the configured application for a WSGI server (see wsgi.py, gunicorn.conf.py).
+
+    Routes, SQL statements and the connection pool are set up at import; this only applies
+    runtime settings. Debug mode stays off unless FLASK_DEBUG is set.
+    """
+    app.debug = os.environ.get('FLASK_DEBUG', '').lower() in ('1', 'true', 'yes')
+    return app
+
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    # Development server only; production runs `gunicorn -c gunicorn.conf.py wsgi:app`
+    create_app().run(host='0.0.0.0', port=int(os.environ.get('PORT', 5001)))
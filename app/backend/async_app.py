@@ -0,0 +1,325 @@
+"""Async (ASGI) variant of the read endpoints used by the trades dashboard.
+
+Serves the same GET routes and JSON as app.py for /api/cards, /api/users, /api/collection,
+/api/wishlist, /api/matches, /api/trade-opportunities, /api/active-trades and
+/api/dashboard. It uses Quart on an aiomysql pool, so one worker process can keep many
+MySQL round trips in flight instead of blocking a thread on each. The SQL and the row shaping are shared with
+the sync app through reads.py.
+
+    pip install -r requirements-async.txt
+    uvicorn async_app:app --host 0.0.0.0 --port 5002 --workers 2
+
+Writes stay on the sync app. Set SECRET_KEY to the sync app's value so its session
+tokens verify here too.
+"""
+import asyncio
+import os
+import traceback
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import aiomysql
+from quart import Quart, Response, jsonify, request
+from quart_cors import cors
+
+from auth import SessionSigner, session_secret_key
+from match_engine import flatten_matches
+from query_builder import FilteredQuery
+from reads import (
+    CARD_FIELDS, COLLECTION_FIELDS, WISHLIST_FIELDS, CardCatalogue, PartnerCache, card_name_filter,
+    collection_item, dashboard_reads, parse_include, parse_match_mode, parse_page_args, project,
+    read_active_trades, read_cards, read_filtered, read_trade_opportunities, read_users,
+    wishlist_item,
+)
+from sql_statements import load_statements, run_async
+from user_resolver import UserResolver
+
+app = cors(Quart(__name__))  # Enable CORS for frontend communication
+
+app.config['MYSQL_HOST'] = os.environ.get('MYSQL_HOST', 'db')
+app.config['MYSQL_USER'] = os.environ.get('MYSQL_USER', 'user')
+app.config['MYSQL_PASSWORD'] = os.environ.get('MYSQL_PASSWORD', 'password')
+app.config['MYSQL_DB'] = os.environ.get('MYSQL_DATABASE', 'app_db')
+app.config['MYSQL_PORT'] = int(os.environ.get('MYSQL_PORT', 3306))
+
+# Same MYSQL_POOL_* knobs as the sync pool. aiomysql has no idle timeout: MYSQL_POOL_IDLE_TIMEOUT
+# becomes its pool_recycle, which replaces a connection on checkout once it is that many seconds
+# old (counted from when it was opened, however busy it has been)
+app.config['MYSQL_POOL_MIN_SIZE'] = int(os.environ.get('MYSQL_POOL_MIN_SIZE', 2))
+app.config['MYSQL_POOL_MAX_SIZE'] = int(os.environ.get('MYSQL_POOL_MAX_SIZE', 10))
+app.config['MYSQL_POOL_IDLE_TIMEOUT'] = float(os.environ.get('MYSQL_POOL_IDLE_TIMEOUT', 300))
+
+app.config['CARDS_CACHE_MAX_AGE'] = int(os.environ.get('CARDS_CACHE_MAX_AGE', 60))
+app.config['CARDS_VERSION_CHECK_INTERVAL'] = float(os.environ.get('CARDS_VERSION_CHECK_INTERVAL', 5))
+app.config['MATCHES_CACHE_TTL'] = float(os.environ.get('MATCHES_CACHE_TTL', 0))
+app.config['USER_CACHE_MAX_SIZE'] = int(os.environ.get('USER_CACHE_MAX_SIZE', 10000))
+app.config['USER_CACHE_TTL'] = float(os.environ.get('USER_CACHE_TTL', 300))
+app.config['SECRET_KEY'] = session_secret_key()
+app.config['SESSION_MAX_AGE'] = int(os.environ.get('SESSION_MAX_AGE', 7 * 24 * 3600))
+
+_sql_dir = Path(__file__).parent / 'sql'
+SQL_QUERIES = load_statements(_sql_dir, {
+    'get_cards': 'get_cards.sql',
+    'get_cards_page': 'get_cards_page.sql',
+    'get_catalog_version': 'get_catalog_version.sql',
+    'get_users': 'get_users.sql',
+    'resolve_user_id': 'resolve_user_id.sql',
+    'get_trade_opportunities': 'get_trade_opportunities.sql',
+    'get_active_trades': 'get_active_trades.sql',
+    'match_owners_of_my_wishlist': 'match_owners_of_my_wishlist.sql',
+    'match_wishers_of_my_collection': 'match_wishers_of_my_collection.sql',
+    'match_partner_usernames': 'match_partner_usernames.sql',
+})
+FILTERED_QUERIES = {
+    name: FilteredQuery.from_text(name, (_sql_dir / f'{name}.sql').read_text(encoding='utf-8'))
+    for name in ('get_collection', 'get_wishlist')
+}
+
+user_ids = UserResolver(
+    SQL_QUERIES['resolve_user_id'],
+    max_size=app.config['USER_CACHE_MAX_SIZE'],
+    ttl=app.config['USER_CACHE_TTL'],
+)
+sessions = SessionSigner(app.config['SECRET_KEY'], max_age=app.config['SESSION_MAX_AGE'])
+catalogue = CardCatalogue(SQL_QUERIES, check_interval=app.config['CARDS_VERSION_CHECK_INTERVAL'])
+partner_cache = PartnerCache(SQL_QUERIES, ttl=app.config['MATCHES_CACHE_TTL'])
+
+_pool = None
+
+
+@app.before_serving
+async def _open_pool():
+    global _pool
+    cfg = app.config
+    # Reads only: autocommit keeps each SELECT on a fresh snapshot and lets the pool reuse
+    # connections without a rollback
+    _pool = await aiomysql.create_pool(
+        host=cfg['MYSQL_HOST'], port=cfg['MYSQL_PORT'], user=cfg['MYSQL_USER'],
+        password=cfg['MYSQL_PASSWORD'], db=cfg['MYSQL_DB'],
+        minsize=cfg['MYSQL_POOL_MIN_SIZE'], maxsize=cfg['MYSQL_POOL_MAX_SIZE'],
+        pool_recycle=cfg['MYSQL_POOL_IDLE_TIMEOUT'], autocommit=True,
+    )
+
+
+@app.after_serving
+async def _close_pool():
+    _pool.close()
+    await _pool.wait_closed()
+
+
+@asynccontextmanager
+async def _cursor():
+    async with _pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            yield cur
+
+
+def _user_id_arg():
+    """userID from the query string, falling back to the bearer session token's user."""
+    user_id = request.args.get('userID', type=int)
+    if not user_id:
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        session = sessions.verify(token.strip()) if scheme.lower() == 'bearer' and token else None
+        if session:
+            user_id = session['userID']
+    return user_id
+
+
+async def _resolve_user(cur):
+    """(user_id, error response) for the userID/username/session of the request."""
+    user_id = _user_id_arg()
+    username = request.args.get('username')
+    if not user_id and not username:
+        return None, (jsonify({'status': 'error', 'message': 'userID or username required'}), 400)
+    if not user_id:
+        user_id = await run_async(cur, user_ids.lookup(username))
+        if user_id is None:
+            return None, (jsonify({'status': 'error', 'message': 'user not found'}), 404)
+    return user_id, None
+
+
+def _error(e):
+    traceback.print_exc()
+    return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@app.route('/api/cards')
+async def get_cards():
+    """Async GET /api/cards (same parameters, caching and ETag as app.get_cards)."""
+    query = request.args.get('q')
+    try:
+        limit, after, fields = parse_page_args(request.args, CARD_FIELDS)
+        match = parse_match_mode(request.args)
+        if query and after:
+            raise ValueError('cursor cannot be combined with q')
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    try:
+        async with _cursor() as cur:
+            if query:
+                _, _, index = await run_async(cur, catalogue.current())
+                card_list = project([index.cards[c] for c in index.search(query, match, limit)], fields)
+                return jsonify({'status': 'success', 'cards': card_list, 'count': len(card_list)})
+
+            if limit is not None or fields:
+                cards, next_cursor = await run_async(cur, read_cards(SQL_QUERIES, limit, after))
+                card_list = project(cards, fields)
+                payload = {'status': 'success', 'cards': card_list, 'count': len(card_list)}
+                if limit is not None:
+                    payload['nextCursor'] = next_cursor
+                return jsonify(payload)
+
+            etag, body, _ = await run_async(cur, catalogue.current())
+
+        if request.if_none_match.contains(etag):
+            resp = Response(b'', status=304)
+        else:
+            resp = Response(body, mimetype='application/json')
+        resp.set_etag(etag)
+        resp.cache_control.public = True
+        resp.cache_control.max_age = app.config['CARDS_CACHE_MAX_AGE']
+        resp.cache_control.must_revalidate = True
+        return resp
+    except Exception as e:
+        return _error(e)
+
+
+@app.route('/api/users')
+async def get_users():
+    try:
+        async with _cursor() as cur:
+            user_list = await run_async(cur, read_users(SQL_QUERIES))
+        return jsonify({'status': 'success', 'users': user_list, 'count': len(user_list)})
+    except Exception as e:
+        return _error(e)
+
+
+async def _browse(query_name, allowed_fields, shape):
+    try:
+        limit, after, fields = parse_page_args(request.args, allowed_fields)
+        match = parse_match_mode(request.args)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    try:
+        async with _cursor() as cur:
+            user_id, error = await _resolve_user(cur)
+            if error:
+                return error
+            params = {
+                'userId': user_id,
+                'rarity': request.args.get('rarity'),
+                'type': request.args.get('type'),
+                'packName': request.args.get('packName'),
+                'cardIds': await run_async(cur, card_name_filter(catalogue, request.args.get('name'), match)),
+            }
+            items, next_cursor = await run_async(cur, read_filtered(
+                FILTERED_QUERIES[query_name], params, shape, limit, after))
+
+        items = project(items, fields)
+        payload = {'status': 'success', 'items': items, 'count': len(items)}
+        if limit is not None:
+            payload['nextCursor'] = next_cursor
+        return jsonify(payload)
+    except Exception as e:
+        return _error(e)
+
+
+@app.route('/api/collection')
+async def get_collection():
+    return await _browse('get_collection', COLLECTION_FIELDS, collection_item)
+
+
+@app.route('/api/wishlist')
+async def get_wishlist():
+    return await _browse('get_wishlist', WISHLIST_FIELDS, wishlist_item)
+
+
+@app.route('/api/matches')
+async def get_mutual_matches():
+    limit = request.args.get('limit', type=int)
+    refresh = request.args.get('refresh') in ('1', 'true')
+    if limit is not None and limit <= 0:
+        return jsonify({'status': 'error', 'message': 'limit must be a positive integer'}), 400
+
+    try:
+        async with _cursor() as cur:
+            user_id, error = await _resolve_user(cur)
+            if error:
+                return error
+            partners = await run_async(cur, partner_cache.ranked(user_id, refresh))
+
+        if limit is not None:
+            partners = partners[:limit]
+        items = flatten_matches(partners)
+        return jsonify({'status': 'success', 'items': items, 'count': len(items), 'partners': partners})
+    except Exception as e:
+        return _error(e)
+
+
+@app.route('/api/trade-opportunities')
+async def get_trade_opportunities():
+    try:
+        async with _cursor() as cur:
+            user_id, error = await _resolve_user(cur)
+            if error:
+                return error
+            items = await run_async(cur, read_trade_opportunities(SQL_QUERIES, user_id))
+        return jsonify({'status': 'success', 'items': items, 'count': len(items)})
+    except Exception as e:
+        return _error(e)
+
+
+@app.route('/api/active-trades')
+async def list_active_trades():
+    try:
+        async with _cursor() as cur:
+            user_id, error = await _resolve_user(cur)
+            if error:
+                return error
+            items = await run_async(cur, read_active_trades(SQL_QUERIES, user_id))
+        return jsonify({'status': 'success', 'items': items, 'count': len(items)})
+    except Exception as e:
+        return _error(e)
+
+
+async def _read_section(read):
+    async with _cursor() as cur:
+        return await run_async(cur, read)
+
+
+@app.route('/api/dashboard')
+async def get_dashboard():
+    """Async GET /api/dashboard: the sections run concurrently, one pooled connection each."""
+    try:
+        sections = parse_include(request.args)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    try:
+        async with _cursor() as cur:
+            user_id, error = await _resolve_user(cur)
+            if error:
+                return error
+        reads = dashboard_reads(SQL_QUERIES, FILTERED_QUERIES['get_collection'], catalogue,
+                                partner_cache, user_id, sections)
+        results = await asyncio.gather(*(_read_section(reads[name]) for name in sections))
+        return jsonify({'status': 'success', 'userID': user_id, **dict(zip(sections, results))})
+    except Exception as e:
+        return _error(e)
+
+
+@app.route('/api/health')
+async def health_check():
+    try:
+        async with _cursor() as cur:
+            await cur.execute('SELECT 1')
+            await cur.fetchall()
+        return jsonify({
+            'status': 'healthy',
+            'database': 'connected',
+            'pool': {'size': _pool.size, 'idle': _pool.freesize, 'max_size': _pool.maxsize},
+        })
+    except Exception as e:
+        return jsonify({'status': 'unhealthy', 'database': 'disconnected', 'error': str(e)}), 500
@@ -0,0 +1,156 @@
+"""Password hashing off the request threads, and signed session tokens.
+
+pbkdf2 hashes cost ~100 ms of CPU each, so `PasswordHasher` runs them in a bounded
+process pool. At most `max_pending` hash/verify jobs may be queued or running; beyond
+that `HasherBusy` is raised immediately so the endpoint can answer 503 instead of piling
+up blocked worker threads.
+
+`SessionSigner` issues the token returned by /api/login. Requests may present it as
+`Authorization: Bearer <token>` so GET endpoints can default `userID` to the signed user; it
+is verified with an HMAC check, without a database round trip. It is a convenience, not
+access control: routes still act on the userID they are given.
+"""
+import hmac
+import logging
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue is full (or a job times out)."""
+
+
+def _hash_password(password):
+    return generate_password_hash(password)
+
+
+def is_password_hash(stored):
+    """True when `stored` has the Werkzeug `method$salt$hash` shape with a pbkdf2/scrypt method.
+
+    Anything else, including plaintext that happens to contain `$`, is a legacy password.
+    """
+    parts = (stored or '').split('$')
+    return (len(parts) == 3 and parts[0].startswith(('pbkdf2:', 'scrypt:'))
+            and all(parts[1:]))
+
+
+def is_legacy_plaintext(password_hash, password):
+    """True when the stored value is an unhashed legacy password equal to `password`.
+
+    Stored hashes never qualify, so presenting a hash as the password cannot log in.
+    """
+    if not password_hash or is_password_hash(password_hash):
+        return False
+    return hmac.compare_digest(password_hash.encode('utf-8'), password.encode('utf-8'))
+
+
+def _verify_password(password_hash, password):
+    """True if `password` matches; only rows that are not hashes compare as plaintext."""
+    if is_password_hash(password_hash):
+        try:
+            return check_password_hash(password_hash, password)
+        except ValueError:
+            return False
+    return is_legacy_plaintext(password_hash, password)
+
+
+class PasswordHasher:
+    """Bounded process pool for generate_password_hash / check_password_hash."""
+
+    def __init__(self, max_workers=None, max_pending=None, timeout=10.0):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 4
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._rejected = 0
+
+    def _pool(self):
+        # Created on first use so each forked server worker gets its own processes
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HasherBusy('password hashing queue is full')
+        try:
+            future = self._pool().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot frees when the job finishes, even if this caller stops waiting for it
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HasherBusy('password hashing timed out') from None
+
+    def hash(self, password):
+        return self._run(_hash_password, password)
+
+    def verify(self, password_hash, password):
+        return self._run(_verify_password, password_hash, password)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self):
+        return {
+            'workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'rejected': self._rejected,
+        }
+
+
+def session_secret_key(environ=os.environ):
+    """SECRET_KEY from `environ` for signing session tokens.
+
+    Required outside debug mode: a generated key changes on every restart, and without
+    gunicorn's preload_app every worker would generate its own. With FLASK_DEBUG set, a
+    throwaway key is generated and a warning logged.
+    """
+    key = environ.get('SECRET_KEY')
+    if key:
+        return key
+    if environ.get('FLASK_DEBUG', '').lower() not in ('1', 'true', 'yes'):
+        raise RuntimeError('SECRET_KEY is not set; set it (the same value for every backend process) '
+                           'or set FLASK_DEBUG=1 to use a throwaway key')
+    logging.getLogger(__name__).warning(
+        'SECRET_KEY is not set; using a random key, so session tokens stop verifying on restart')
+    return secrets.token_hex(32)
+
+
+class SessionSigner:
+    """Signs {userID, username} into a timestamped URL-safe token."""
+
+    def __init__(self, secret_key, max_age=7 * 24 * 3600):
+        self._serializer = URLSafeTimedSerializer(secret_key, salt='pockettrader-session')
+        self.max_age = max_age
+
+    def issue(self, user_id, username):
+        return self._serializer.dumps({'userID': user_id, 'username': username})
+
+    def verify(self, token):
+        """Return the signed {userID, username} dict, or None if invalid or expired."""
+        try:
+            data = self._serializer.loads(token, max_age=self.max_age)
+        except (BadSignature, SignatureExpired):
+            return None
+        if not isinstance(data, dict) or not isinstance(data.get('userID'), int):
+            return None
+        return data
@@ -0,0 +1,151 @@
+"""In-process card-name search for /api/cards, /api/collection, /api/wishlist and
+/api/cards/suggest.
+
+The catalogue is small and changes rarely, so `CardNameIndex` is built from the Card
+rows once per CatalogVersion and answers three kinds of query without touching MySQL:
+
+- prefix:    the query starts the name or one of its words ("char" -> "Mega Charizard ex")
+- substring: the query appears anywhere in the name (what LIKE '%q%' did)
+- fuzzy:     the query appears with up to one or two typos ("charzard" -> "Charizard")
+
+Names and queries are normalized the same way: case-folded, accents stripped and
+punctuation turned into spaces, so "pokemon" finds "Pokémon" and "mr mime" finds "Mr. Mime".
+"""
+import bisect
+import unicodedata
+from collections import defaultdict
+
+SEARCH_MODES = ('prefix', 'substring', 'fuzzy')
+
+
+def normalize(text):
+    """Lower-case `text`, drop accents and collapse punctuation/whitespace to single spaces."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    return ' '.join(''.join(ch if ch.isalnum() else ' ' for ch in text).split())
+
+
+def _bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _max_typos(query):
+    if len(query) <= 3:
+        return 0
+    return 1 if len(query) <= 6 else 2
+
+
+def _substring_distance(query, text, max_dist):
+    """Fewest edits turning `query` into some substring of `text`, or None if > max_dist."""
+    prev = [0] * (len(text) + 1)  # matching may start anywhere in text
+    for i, qc in enumerate(query, 1):
+        cur = [i] + [0] * len(text)
+        for j, tc in enumerate(text, 1):
+            cur[j] = min(prev[j - 1] + (qc != tc), prev[j] + 1, cur[j - 1] + 1)
+        if min(cur) > max_dist:
+            return None
+        prev = cur
+    best = min(prev)
+    return best if best <= max_dist else None
+
+
+class CardNameIndex:
+    """Prefix, substring and typo-tolerant lookups over card names.
+
+    `cards` is a sequence of dicts with at least `cardID` and `name`; they are kept in
+    `self.cards` (by cardID) in the order given so results can be served directly.
+    """
+
+    def __init__(self, cards):
+        self.cards = {}
+        self._order = {}
+        self._norm = {}
+        self._words = []                   # sorted (name from word k on, k, cardID)
+        self._by_name = defaultdict(list)  # normalized name -> cardIDs (reprints share a name)
+        self._grams = defaultdict(set)     # bigram -> normalized names containing it
+        for position, card in enumerate(cards):
+            card_id = card['cardID']
+            norm = normalize(card['name'])
+            self.cards[card_id] = card
+            self._order[card_id] = position
+            self._norm[card_id] = norm
+            self._by_name[norm].append(card_id)
+            words = norm.split(' ')
+            for k in range(len(words)):
+                self._words.append((' '.join(words[k:]), k, card_id))
+            for gram in _bigrams(norm):
+                self._grams[gram].add(norm)
+        self._words.sort()
+
+    def __len__(self):
+        return len(self.cards)
+
+    def search(self, query, mode='substring', limit=None):
+        """Return matching cardIDs, best first; `limit` caps the result count."""
+        if mode not in SEARCH_MODES:
+            raise ValueError(f'match must be one of: {", ".join(SEARCH_MODES)}')
+        query = normalize(query)
+        if not query:
+            return []
+        if mode == 'prefix':
+            ranked = self._prefix(query)
+        elif mode == 'substring':
+            ranked = self._substring(query)
+        else:
+            ranked = self._fuzzy(query)
+        return ranked[:limit] if limit is not None else ranked
+
+    def _prefix(self, query):
+        # (word position, name length, catalogue order): whole-name prefixes first
+        best = {}
+        start = bisect.bisect_left(self._words, (query,))
+        for key, word_pos, card_id in self._words[start:]:
+            if not key.startswith(query):
+                break
+            if card_id not in best or word_pos < best[card_id]:
+                best[card_id] = word_pos
+        return sorted(best, key=lambda c: (best[c], len(self._norm[c]), self._order[c]))
+
+    def _candidates(self, query, min_shared):
+        """Distinct normalized names sharing at least `min_shared` bigrams with `query`."""
+        if min_shared <= 0:
+            return list(self._by_name)
+        counts = defaultdict(int)
+        for gram in _bigrams(query):
+            for norm in self._grams.get(gram, ()):
+                counts[norm] += 1
+        return [norm for norm, n in counts.items() if n >= min_shared]
+
+    def _substring(self, query):
+        found = [c for norm in self._candidates(query, len(_bigrams(query))) if query in norm
+                 for c in self._by_name[norm]]
+        return sorted(found, key=lambda c: (self._norm[c].find(query) != 0, self._order[c]))
+
+    def _fuzzy(self, query):
+        max_dist = _max_typos(query)
+        # each edit can break at most two of the query's bigrams
+        candidates = self._candidates(query, len(_bigrams(query)) - 2 * max_dist)
+        scored = []
+        for norm in candidates:
+            dist = _substring_distance(query, norm, max_dist)
+            if dist is not None:
+                miss = not norm.startswith(query[:1])
+                scored.extend((dist, miss, self._order[c], c) for c in self._by_name[norm])
+        scored.sort()
+        return [card_id for *_, card_id in scored]
+
+    def suggest(self, query, limit=10):
+        """Autocomplete: prefix hits, then substring hits, then fuzzy hits, up to `limit`.
+
+        Returns (cardID, mode) pairs where mode says which pass found the card.
+        """
+        seen = set()
+        out = []
+        for mode in SEARCH_MODES:
+            for card_id in self.search(query, mode):
+                if card_id not in seen:
+                    seen.add(card_id)
+                    out.append((card_id, mode))
+                    if len(out) >= limit:
+                        return out
+        return out
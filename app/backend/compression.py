@@ -0,0 +1,170 @@
+"""Response compression and per-route Cache-Control, as a Flask extension.
+
+`Compress(app, policies)` adds an after_request hook that:
+
+- sets Cache-Control from `policies` (endpoint name -> header value) on successful GET
+  responses that did not set one themselves
+- negotiates Accept-Encoding and compresses with brotli (when the `brotli` package is
+  installed) or gzip. Bodies below COMPRESS_MIN_SIZE bytes stay as they are, and streamed
+  bodies are compressed chunk by chunk as they are sent.
+- keeps the compressed bytes of `public` responses in a small LRU keyed by ETag (or a body
+  digest) and encoding, so a cached catalogue is not recompressed on every request
+- weakens the ETag of encoded responses (W/"..."). Werkzeug matches If-None-Match weakly,
+  so revalidation still gets a 304.
+
+Config keys: COMPRESS_MIN_SIZE (default 1024), COMPRESS_GZIP_LEVEL (6),
+COMPRESS_BROTLI_QUALITY (5), COMPRESS_CACHE_MAX_ENTRIES (64), COMPRESS_CACHE_MAX_BYTES (8 MiB).
+"""
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+_BINARY_PREFIXES = ('image/', 'audio/', 'video/')
+
+
+class _EncodedStream:
+    """Compresses a streamed body chunk by chunk, flushing after each chunk."""
+
+    def __init__(self, iterable, encoding, gzip_level, brotli_quality):
+        self._iterable = iterable
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # gzip container
+        self._encoding = encoding
+
+    def __iter__(self):
+        for chunk in self._iterable:
+            if self._encoding == 'br':
+                out = self._compressor.process(chunk) + self._compressor.flush()
+            else:
+                out = self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            if out:
+                yield out
+        yield self._compressor.finish() if self._encoding == 'br' else self._compressor.flush()
+
+    def close(self):
+        close = getattr(self._iterable, 'close', None)
+        if close is not None:
+            close()
+
+
+class Compress:
+    """Compresses responses and applies Cache-Control policies (see the module docstring)."""
+
+    def __init__(self, app=None, policies=None):
+        self.policies = dict(policies or {})
+        self._cache = OrderedDict()  # (key, encoding) -> compressed bytes
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        cfg = app.config
+        self.min_size = int(cfg.get('COMPRESS_MIN_SIZE', 1024))
+        self.gzip_level = int(cfg.get('COMPRESS_GZIP_LEVEL', 6))
+        self.brotli_quality = int(cfg.get('COMPRESS_BROTLI_QUALITY', 5))
+        self.cache_max_entries = int(cfg.get('COMPRESS_CACHE_MAX_ENTRIES', 64))
+        self.cache_max_bytes = int(cfg.get('COMPRESS_CACHE_MAX_BYTES', 8 * 1024 * 1024))
+        self.encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+        app.after_request(self.after_request)
+
+    def _negotiate(self):
+        return request.accept_encodings.best_match(self.encodings)
+
+    def _compress(self, body, encoding):
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def _cached_compress(self, body, encoding, etag):
+        key = (etag or hashlib.blake2b(body, digest_size=16).digest(), encoding)
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return data
+            self._misses += 1
+        data = self._compress(body, encoding)
+        if len(data) <= self.cache_max_bytes:
+            with self._lock:
+                if key not in self._cache:
+                    self._cache[key] = data
+                    self._cache_bytes += len(data)
+                while self._cache and (len(self._cache) > self.cache_max_entries
+                                       or self._cache_bytes > self.cache_max_bytes):
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cache_bytes -= len(evicted)
+        return data
+
+    def after_request(self, response):
+        policy = self.policies.get(request.endpoint)
+        if (policy and request.method == 'GET' and response.status_code == 200
+                and 'Cache-Control' not in response.headers):
+            response.headers['Cache-Control'] = policy
+
+        mimetype = response.mimetype or ''
+        if (response.direct_passthrough or 'Content-Encoding' in response.headers
+                or mimetype.startswith(_BINARY_PREFIXES)):
+            return response
+        response.vary.add('Accept-Encoding')
+
+        encoding = self._negotiate()
+        if not encoding or request.method == 'HEAD':
+            return response
+        etag, weak = response.get_etag()
+        if response.status_code == 304:
+            if etag and not weak:
+                response.set_etag(etag, weak=True)
+            return response
+        if response.status_code != 200:
+            return response
+
+        if response.is_streamed:
+            response.response = _EncodedStream(
+                response.response, encoding, self.gzip_level, self.brotli_quality)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+            if response.cache_control.public:
+                data = self._cached_compress(body, encoding, etag)
+            else:
+                data = self._compress(body, encoding)
+            with self._lock:
+                self._bytes_in += len(body)
+                self._bytes_out += len(data)
+            response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def stats(self):
+        """Counters for the health endpoint."""
+        with self._lock:
+            return {
+                'encodings': list(self.encodings),
+                'cache_entries': len(self._cache),
+                'cache_bytes': self._cache_bytes,
+                'cache_hits': self._hits,
+                'cache_misses': self._misses,
+                'bytes_in': self._bytes_in,
+                'bytes_out': self._bytes_out,
+            }
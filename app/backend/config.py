@@ -5,4 +5,4 @@ DATABASE_URI = (
 	f"@{os.environ.get('MYSQL_HOST')}/{os.environ.get('MYSQL_DATABASE')}"
 )
 SECRET_KEY = os.environ.get('SECRET_KEY', 'your_secret_key')
-DEBUG = True
\ No newline at end of file
+DEBUG = os.environ.get('FLASK_DEBUG', '').lower() in ('1', 'true', 'yes')
\ No newline at end of file
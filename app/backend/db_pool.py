@@ -0,0 +1,257 @@
+"""Pooled MySQL connections exposed through a flask_mysqldb-style `mysql.connection`.
+
+`PooledMySQL(app)` keeps a bounded pool of MySQLdb connections that are reused across
+requests. A request checks a connection out the first time it touches
+`mysql.connection` and hands it back (rolled back) when the app context tears down.
+"""
+import threading
+import time
+from collections import deque
+
+import MySQLdb
+from flask import g
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the wait timeout."""
+
+
+class ConnectionPool:
+    """A thread-safe bounded pool of MySQLdb connections.
+
+    - `min_size` connections are kept open even when idle.
+    - at most `max_size` connections exist at once; callers beyond that wait up to
+      `wait_timeout` seconds before `PoolTimeout` is raised.
+    - idle connections older than `idle_timeout` seconds are closed (down to `min_size`).
+    - with `pre_ping`, a connection is pinged on checkout and replaced if it is dead.
+    """
+
+    def __init__(self, connect_kwargs, min_size=1, max_size=10, idle_timeout=300.0,
+                 pre_ping=True, wait_timeout=5.0):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError('pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1')
+        self.connect_kwargs = dict(connect_kwargs)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.pre_ping = pre_ping
+        self.wait_timeout = wait_timeout
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, returned_at) pairs, most recently used on the right
+        self._size = 0        # open connections, idle + in use
+        self._in_use = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+
+    def _connect(self):
+        conn = MySQLdb.connect(**self.connect_kwargs)
+        with self._cond:
+            self._created += 1
+        return conn
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _reap_idle(self, now):
+        """Pop idle connections past idle_timeout (caller holds the lock). Returns them."""
+        expired = []
+        if self.idle_timeout is None or self.idle_timeout <= 0:
+            return expired
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self._discarded += 1
+            expired.append(conn)
+        return expired
+
+    def fill(self):
+        """Open connections until min_size exist."""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def acquire(self):
+        """Check out a connection, waiting up to wait_timeout if the pool is exhausted."""
+        started = time.monotonic()
+        deadline = started + self.wait_timeout if self.wait_timeout is not None else None
+        waited = False
+        with self._cond:
+            while True:
+                expired = self._reap_idle(time.monotonic())
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                    create = False
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = None
+                    create = True
+                    break
+                waited = True
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._timeouts += 1
+                    self._record_wait(time.monotonic() - started)
+                    raise PoolTimeout(
+                        f'no MySQL connection available within {self.wait_timeout}s '
+                        f'(max_size={self.max_size})'
+                    )
+                self._cond.wait(remaining)
+            self._in_use += 1
+            if waited:
+                self._record_wait(time.monotonic() - started)
+
+        for stale in expired:
+            self._close_quietly(stale)
+
+        try:
+            if create:
+                conn = self._connect()
+            elif self.pre_ping:
+                try:
+                    conn.ping()
+                except MySQLdb.Error:
+                    self._close_quietly(conn)
+                    with self._cond:
+                        self._discarded += 1
+                    conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._size -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def release(self, conn, discard=False):
+        """Return a checked-out connection; its open transaction is rolled back first."""
+        if not discard:
+            try:
+                conn.rollback()
+            except MySQLdb.Error:
+                discard = True
+        with self._cond:
+            self._in_use -= 1
+            if discard:
+                self._size -= 1
+                self._discarded += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        if discard:
+            self._close_quietly(conn)
+
+    def close(self):
+        """Close every idle connection (in-use connections close when released)."""
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def _record_wait(self, elapsed):
+        self._waits += 1
+        self._wait_time += elapsed
+        self._max_wait = max(self._max_wait, elapsed)
+
+    def stats(self):
+        """Snapshot of pool usage for the health endpoint."""
+        with self._cond:
+            return {
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'created': self._created,
+                'discarded': self._discarded,
+                'waits': self._waits,
+                'wait_timeouts': self._timeouts,
+                'wait_time_total_ms': round(self._wait_time * 1000, 3),
+                'wait_time_avg_ms': round(self._wait_time * 1000 / self._waits, 3) if self._waits else 0.0,
+                'wait_time_max_ms': round(self._max_wait * 1000, 3),
+            }
+
+
+class PooledMySQL:
+    """Drop-in replacement for flask_mysqldb.MySQL backed by a ConnectionPool.
+
+    Reads the same MYSQL_* config keys plus MYSQL_POOL_* for pool sizing.
+    """
+
+    def __init__(self, app=None):
+        self.pool = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        cfg = app.config
+        connect_kwargs = {
+            'host': cfg.get('MYSQL_HOST', 'localhost'),
+            'user': cfg.get('MYSQL_USER', 'root'),
+            'passwd': cfg.get('MYSQL_PASSWORD', ''),
+            'db': cfg.get('MYSQL_DB', ''),
+            'port': int(cfg.get('MYSQL_PORT', 3306)),
+            'connect_timeout': int(cfg.get('MYSQL_CONNECT_TIMEOUT', 10)),
+        }
+        if cfg.get('MYSQL_CHARSET'):
+            connect_kwargs['charset'] = cfg['MYSQL_CHARSET']
+        self.pool = ConnectionPool(
+            connect_kwargs,
+            min_size=int(cfg.get('MYSQL_POOL_MIN_SIZE', 1)),
+            max_size=int(cfg.get('MYSQL_POOL_MAX_SIZE', 10)),
+            idle_timeout=float(cfg.get('MYSQL_POOL_IDLE_TIMEOUT', 300)),
+            pre_ping=bool(cfg.get('MYSQL_POOL_PRE_PING', True)),
+            wait_timeout=float(cfg.get('MYSQL_POOL_WAIT_TIMEOUT', 5)),
+        )
+        app.teardown_appcontext(self.teardown)
+
+    @property
+    def connection(self):
+        """The connection checked out for the current app context (acquired lazily)."""
+        conn = g.get('_pooled_mysql_conn')
+        if conn is None:
+            self.pool.fill()
+            conn = self.pool.acquire()
+            g._pooled_mysql_conn = conn
+        return conn
+
+    def rollback(self):
+        """Roll back the current app context's connection, if it checked one out.
+
+        Unlike `mysql.connection.rollback()`, this never acquires a connection, so error
+        paths do not wait on an exhausted pool. Errors are ignored here: teardown rolls back
+        again on release and discards the connection if that fails.
+        """
+        conn = g.get('_pooled_mysql_conn')
+        if conn is not None:
+            try:
+                conn.rollback()
+            except MySQLdb.Error:
+                pass
+
+    def teardown(self, exception):
+        conn = g.pop('_pooled_mysql_conn', None)
+        if conn is not None:
+            self.pool.release(conn)
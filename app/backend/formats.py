@@ -0,0 +1,92 @@
+"""Columnar response formats for bulk pulls of /api/cards, /api/users and /api/market-trends.
+
+The default JSON body repeats every key on every row. Bulk consumers can instead negotiate
+one of these formats, either with an `Accept` header or with `format=<name>`:
+
+- columnar (application/vnd.pockettrader.columnar+json): {"status", "count", "columns"},
+  where `columns` maps each column name to the array of its values
+- msgpack (application/msgpack): the same structure as MessagePack; needs `msgpack`
+- arrow (application/vnd.apache.arrow.stream): an Arrow IPC stream with one record batch and
+  native column types (timestamps stay timestamps); needs `pyarrow`
+
+All of them are built column-wise straight from the cursor rows, with no per-row dicts.
+"""
+try:
+    import msgpack
+except ImportError:  # optional; msgpack responses are unavailable without it
+    msgpack = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # optional; Arrow responses are unavailable without it
+    pyarrow = None
+
+from streaming import dumps
+
+JSON = 'application/json'
+COLUMNAR = 'application/vnd.pockettrader.columnar+json'
+MSGPACK = 'application/msgpack'
+ARROW = 'application/vnd.apache.arrow.stream'
+
+FORMATS = {'json': JSON, 'columnar': COLUMNAR, 'msgpack': MSGPACK, 'arrow': ARROW}
+_REQUIRES = {MSGPACK: ('msgpack', msgpack), ARROW: ('pyarrow', pyarrow)}
+
+
+class NotAcceptable(Exception):
+    """The requested format is known but its optional dependency is not installed."""
+
+
+def available():
+    """Media types this process can produce, JSON first (the default on ties)."""
+    return [mt for mt in FORMATS.values() if mt not in _REQUIRES or _REQUIRES[mt][1] is not None]
+
+
+def negotiate(args, accept_mimetypes):
+    """Pick the response media type from `format=` or else the Accept header.
+
+    Raises ValueError for an unknown `format` and NotAcceptable when an explicitly named
+    format cannot be produced. An Accept header nothing here satisfies falls back to JSON.
+    """
+    name = args.get('format')
+    if name:
+        if name not in FORMATS:
+            raise ValueError(f'format must be one of: {", ".join(FORMATS)}')
+        media_type = FORMATS[name]
+        if media_type not in available():
+            raise NotAcceptable(f'{name} responses need the {_REQUIRES[media_type][0]} package')
+        return media_type
+    return accept_mimetypes.best_match(available(), default=JSON)
+
+
+def encode(media_type, columns, rows, fields=None):
+    """Encode cursor `rows` laid out as `columns` ((name, converter) pairs) as `media_type`.
+
+    `fields` selects and orders a subset of the columns. Converters (e.g. dates to text)
+    apply to the JSON and MessagePack formats; Arrow keeps native values.
+    """
+    if fields:
+        positions = {name: i for i, (name, _) in enumerate(columns)}
+        selected = [(name, positions[name], columns[positions[name]][1]) for name in fields]
+    else:
+        selected = [(name, i, convert) for i, (name, convert) in enumerate(columns)]
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+
+    if media_type == ARROW:
+        table = pyarrow.table({name: list(values[i]) for name, i, _ in selected})
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    body = {
+        'status': 'success',
+        'count': len(rows),
+        'columns': {
+            name: [convert(v) for v in values[i]] if convert else list(values[i])
+            for name, i, convert in selected
+        },
+    }
+    if media_type == MSGPACK:
+        return msgpack.packb(body)
+    return dumps(body)
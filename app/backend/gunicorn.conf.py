@@ -0,0 +1,41 @@
+"""Gunicorn settings for the production backend, all overridable through the environment.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Send SIGHUP to the master for a graceful reload: new workers start with the current
+config and old ones finish their in-flight requests (up to GUNICORN_GRACEFUL_TIMEOUT).
+With GUNICORN_PRELOAD on, application code is loaded once in the master, so code changes
+need a full restart instead.
+"""
+import multiprocessing
+import os
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes')
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5001')}"
+
+# Processes x threads = concurrent requests. Each worker has its own MySQL pool
+# (MYSQL_POOL_MAX_SIZE), so keep workers * pool size under the server's max_connections.
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Recycle workers periodically to bound memory growth (0 disables)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+# Load the app once in the master before forking; MySQL and hashing pools are created
+# lazily, so every worker still opens its own after the fork
+preload_app = _env_bool('GUNICORN_PRELOAD', 'true')
+reload = _env_bool('GUNICORN_RELOAD', 'false')
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
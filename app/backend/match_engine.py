@@ -0,0 +1,87 @@
+"""Mutual trade matching for /api/matches.
+
+A partner matches when they hold a card I wish for and wish for a card I hold, and both
+cards share a rarity. Instead of crossing every user with every other user, the engine
+runs two index probes that start from my own rows:
+
+- owners of my wishlist cards      (match_owners_of_my_wishlist.sql)
+- wishers of my collection cards   (match_wishers_of_my_collection.sql)
+
+and intersects them per (partner, rarity) in memory. Partners are ranked by how many
+one-for-one trades they can make with me (`score`), then by the number of card pairs.
+"""
+from collections import defaultdict
+
+from sql_statements import run
+
+
+def mutual_matches(statements, user_id, limit=None):
+    """Read generator (see sql_statements.run) returning ranked partners for `user_id`.
+
+    `statements` maps the two probe names and match_partner_usernames to compiled
+    SQLStatements. Each partner is
+    { partnerID, partnerName, score, pairs, rarities: { rarity: { iWant, theyWant } } },
+    where iWant/theyWant are lists of { cardID, name }. `limit` caps the partner count.
+    """
+    # (partner, rarity) -> {cardID: name}
+    i_want = defaultdict(dict)
+    they_want = defaultdict(dict)
+
+    rows = yield statements['match_owners_of_my_wishlist'], {'me': user_id}
+    for card_id, name, rarity, partner_id in rows:
+        i_want[(partner_id, rarity)][card_id] = name
+
+    rows = yield statements['match_wishers_of_my_collection'], {'me': user_id}
+    for card_id, name, rarity, partner_id in rows:
+        if (partner_id, rarity) in i_want:
+            they_want[(partner_id, rarity)][card_id] = name
+
+    partners = {}
+    for (partner_id, rarity), theirs in they_want.items():
+        mine = i_want[(partner_id, rarity)]
+        partner = partners.setdefault(partner_id, {
+            'partnerID': partner_id, 'score': 0, 'pairs': 0, 'rarities': {}
+        })
+        partner['score'] += min(len(mine), len(theirs))
+        partner['pairs'] += len(mine) * len(theirs)
+        partner['rarities'][rarity] = {
+            'iWant': [{'cardID': c, 'name': n} for c, n in sorted(mine.items(), key=lambda kv: kv[1])],
+            'theyWant': [{'cardID': c, 'name': n} for c, n in sorted(theirs.items(), key=lambda kv: kv[1])],
+        }
+
+    names = {}
+    if partners:
+        rows = yield statements['match_partner_usernames'], {'userIds': list(partners)}
+        names = dict(rows)
+    for partner in partners.values():
+        partner['partnerName'] = names.get(partner['partnerID'])
+
+    ranked = sorted(
+        partners.values(),
+        key=lambda p: (-p['score'], -p['pairs'], p['partnerName'] or '', p['partnerID'])
+    )
+    if limit is not None:
+        ranked = ranked[:limit]
+    return ranked
+
+
+def find_mutual_matches(cur, statements, user_id, limit=None):
+    """Run `mutual_matches` on a MySQLdb cursor."""
+    return run(cur, mutual_matches(statements, user_id, limit))
+
+
+def flatten_matches(partners):
+    """Expand ranked partners into the legacy one-row-per-card-pair items."""
+    items = []
+    for partner in partners:
+        for rarity in sorted(partner['rarities']):
+            group = partner['rarities'][rarity]
+            for mine in group['iWant']:
+                for theirs in group['theyWant']:
+                    items.append({
+                        'partnerID': partner['partnerID'], 'partnerName': partner['partnerName'],
+                        'iWant_cardID': mine['cardID'], 'iWant_name': mine['name'],
+                        'rarity_required': rarity,
+                        'theyWant_cardID': theirs['cardID'], 'theyWant_name': theirs['name']
+                    })
+    return items
@@ -0,0 +1,255 @@
+"""Request and database instrumentation, exported in Prometheus text format at /metrics.
+
+`Metrics(app, mysql)` installs request hooks plus a cursor class on the MySQL pool:
+
+- http_request_duration_seconds{endpoint,method,status}: request latency histogram
+- http_request_db_seconds{endpoint}: time spent in MySQL per request
+- http_request_db_queries{endpoint}: statements executed per request
+- http_response_bytes_total{endpoint}: response body bytes (when the size is known)
+- db_statement_duration_seconds{statement}: latency per SQL_QUERIES name
+- db_statement_rows_total{statement}: rows fetched per SQL_QUERIES name
+- operation_duration_seconds{operation}: other timed work, e.g. password hashing
+
+Statements are labeled by the name of the `SQLStatement` that ran them, which the cursor
+reads from `cur.statement_name`; ad-hoc SQL is labeled "adhoc". Work running in other
+threads (dashboard sections) counts toward the request when it runs in a copy of the
+request's context (`contextvars.copy_context`). Rows read by a streamed body are recorded
+per statement only, since the request has already finished when they are read.
+
+Each server process keeps its own numbers, so with several gunicorn workers a scrape sees
+one worker; the `pid` label on every series tells them apart.
+"""
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from MySQLdb.cursors import Cursor, SSCursor
+from flask import Response, request
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+_request_stats = contextvars.ContextVar('request_db_stats', default=None)
+_metrics = None  # the Metrics instance cursors report to
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = ','.join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    if extra:
+        pairs = f'{pairs},{extra}' if pairs else extra
+    return '{' + pairs + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help = help_text
+        self.label_names = ('pid',) + tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        key = tuple(label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        pid = (str(os.getpid()),)  # read at export: workers fork after this object exists
+        with self._lock:
+            items = sorted((pid + key, value) for key, value in self._values.items())
+        for key, value in items:
+            lines.append(f'{self.name}{_labels(self.label_names, key)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = ('pid',) + tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        key = tuple(label_values)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        pid = (str(os.getpid()),)
+        with self._lock:
+            items = sorted((pid + key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}')
+            inf = 'le="+Inf"'
+            lines.append(f'{self.name}_bucket{_labels(self.label_names, key, inf)} {series[-1]}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, key)} {series[-2]:.6f}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, key)} {series[-1]}')
+        return lines
+
+
+class _RequestStats:
+    __slots__ = ('queries', 'db_time', 'lock')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.lock = threading.Lock()
+
+
+class _InstrumentedMixin:
+    """Times execute/executemany/callproc and counts fetched rows for `_metrics`."""
+
+    statement_name = None
+    _label = 'adhoc'
+    _nested = False
+
+    def _timed(self, call, *args):
+        if _metrics is None or self._nested:
+            return call(*args)
+        self._label = self.statement_name or 'adhoc'
+        self.statement_name = None
+        self._nested = True  # executemany may fall back to execute per row
+        started = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            self._nested = False
+            _metrics.record_statement(self._label, time.perf_counter() - started)
+
+    def execute(self, query, args=None):
+        return self._timed(super().execute, query, args)
+
+    def executemany(self, query, args):
+        return self._timed(super().executemany, query, args)
+
+    def callproc(self, procname, args=()):
+        return self._timed(super().callproc, procname, args)
+
+    def _count(self, rows):
+        if _metrics is not None and rows:
+            _metrics.record_rows(self._label, len(rows))
+        return rows
+
+    def fetchone(self):
+        row = super().fetchone()
+        if _metrics is not None and row is not None:
+            _metrics.record_rows(self._label, 1)
+        return row
+
+    def fetchmany(self, size=None):
+        return self._count(super().fetchmany(size))
+
+    def fetchall(self):
+        return self._count(super().fetchall())
+
+
+class InstrumentedCursor(_InstrumentedMixin, Cursor):
+    """Default cursor class of pooled connections while metrics are enabled."""
+
+
+class InstrumentedSSCursor(_InstrumentedMixin, SSCursor):
+    """Unbuffered variant used by streamed responses."""
+
+
+class Metrics:
+    """Flask extension collecting the series listed in the module docstring."""
+
+    def __init__(self, app=None, mysql=None):
+        self.requests = Histogram(
+            'http_request_duration_seconds', 'Request latency.', ('endpoint', 'method', 'status'))
+        self.request_db_time = Histogram(
+            'http_request_db_seconds', 'Time spent in MySQL per request.', ('endpoint',))
+        self.request_db_queries = Histogram(
+            'http_request_db_queries', 'SQL statements executed per request.', ('endpoint',),
+            buckets=COUNT_BUCKETS)
+        self.response_bytes = Counter(
+            'http_response_bytes_total', 'Response body bytes sent.', ('endpoint',))
+        self.statements = Histogram(
+            'db_statement_duration_seconds', 'Statement execution time by SQL_QUERIES name.',
+            ('statement',))
+        self.statement_rows = Counter(
+            'db_statement_rows_total', 'Rows fetched by SQL_QUERIES name.', ('statement',))
+        self.operations = Histogram(
+            'operation_duration_seconds', 'Duration of other timed work.', ('operation',))
+        if app is not None:
+            self.init_app(app, mysql)
+
+    def init_app(self, app, mysql=None):
+        global _metrics
+        _metrics = self
+        if mysql is not None and mysql.pool is not None:
+            mysql.pool.connect_kwargs['cursorclass'] = InstrumentedCursor
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self.export)
+
+    def _before_request(self):
+        request.environ['metrics.started'] = time.perf_counter()
+        request.environ['metrics.token'] = _request_stats.set(_RequestStats())
+
+    def _after_request(self, response):
+        started = request.environ.get('metrics.started')
+        if started is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        self.requests.observe((endpoint, request.method, response.status_code),
+                              time.perf_counter() - started)
+        stats = _request_stats.get()
+        if stats is not None:
+            self.request_db_time.observe((endpoint,), stats.db_time)
+            self.request_db_queries.observe((endpoint,), stats.queries)
+            _request_stats.reset(request.environ.pop('metrics.token'))
+        if response.content_length is not None:
+            self.response_bytes.inc((endpoint,), response.content_length)
+        return response
+
+    def record_statement(self, name, seconds):
+        self.statements.observe((name,), seconds)
+        stats = _request_stats.get()
+        if stats is not None:
+            with stats.lock:
+                stats.queries += 1
+                stats.db_time += seconds
+
+    def record_rows(self, name, count):
+        self.statement_rows.inc((name,), count)
+
+    @contextmanager
+    def timed(self, operation):
+        """Record the duration of the enclosed block under operation_duration_seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.operations.observe((operation,), time.perf_counter() - started)
+
+    def export(self):
+        """GET /metrics in Prometheus text exposition format."""
+        lines = []
+        for family in (self.requests, self.request_db_time, self.request_db_queries,
+                       self.response_bytes, self.statements, self.statement_rows,
+                       self.operations):
+            lines.extend(family.render())
+        return Response('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
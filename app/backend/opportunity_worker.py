@@ -0,0 +1,131 @@
+"""Background worker that applies the TradeOpportunity refreshes queued in TradeOpportunityOutbox.
+
+The Collection and Wishlist triggers no longer touch TradeOpportunity. They append a
+('owner' | 'target', userID, cardID) entry to the outbox, so a user's "add card" transaction
+costs one small insert whatever the card's popularity. This process drains the outbox:
+
+- read the oldest OUTBOX_BATCH_SIZE entries (a plain read, so the triggers never wait on it)
+- collapse repeated (kind, userID, cardID) entries into one refresh
+- per refresh, in its own transaction: CALL refresh_owner_opportunities or
+  refresh_target_opportunities, which recompute that (user, card) from current data, then
+  delete the entries it covered
+
+The procedures are idempotent, so an entry applied twice (a crash before the delete, or
+two workers racing) only repeats work. When the outbox is empty the worker sleeps
+OUTBOX_POLL_INTERVAL seconds. The lag is the age of the oldest pending entry, printed
+with every batch and reported by /api/health.
+
+    python opportunity_worker.py
+"""
+import os
+import signal
+import time
+import traceback
+from pathlib import Path
+
+import MySQLdb
+
+from sql_statements import load_statements
+
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 500))
+OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', 1.0))
+
+SQL_QUERIES = load_statements(Path(__file__).parent / 'sql', {
+    'get_opportunity_outbox_batch': 'get_opportunity_outbox_batch.sql',
+    'get_opportunity_outbox_lag': 'get_opportunity_outbox_lag.sql',
+    'delete_opportunity_outbox': 'delete_opportunity_outbox.sql',
+    'refresh_owner_opportunities': 'refresh_owner_opportunities.sql',
+    'refresh_target_opportunities': 'refresh_target_opportunities.sql',
+})
+REFRESH = {
+    'owner': SQL_QUERIES['refresh_owner_opportunities'],
+    'target': SQL_QUERIES['refresh_target_opportunities'],
+}
+
+_stopping = False
+
+
+def _stop(signum, frame):
+    global _stopping
+    _stopping = True
+
+
+def connect():
+    return MySQLdb.connect(
+        host=os.environ.get('MYSQL_HOST', 'db'),
+        user=os.environ.get('MYSQL_USER', 'user'),
+        passwd=os.environ.get('MYSQL_PASSWORD', 'password'),
+        db=os.environ.get('MYSQL_DATABASE', 'app_db'),
+        port=int(os.environ.get('MYSQL_PORT', 3306)),
+    )
+
+
+def drain_batch(conn, batch_size=OUTBOX_BATCH_SIZE):
+    """Apply up to `batch_size` outbox entries; returns (entries, refreshes) applied."""
+    cur = conn.cursor()
+    try:
+        SQL_QUERIES['get_opportunity_outbox_batch'].execute(cur, {'batchSize': batch_size})
+        rows = cur.fetchall()
+        conn.commit()  # end the read snapshot so each refresh sees the latest data
+        pending = {}  # (kind, userID, cardID) -> outbox ids, oldest first
+        for outbox_id, kind, user_id, card_id in rows:
+            pending.setdefault((kind, user_id, card_id), []).append(outbox_id)
+
+        for (kind, user_id, card_id), ids in pending.items():
+            REFRESH[kind].execute(cur, {'userId': user_id, 'cardId': card_id})
+            SQL_QUERIES['delete_opportunity_outbox'].execute(cur, {'ids': ids})
+            conn.commit()
+        return len(rows), len(pending)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def outbox_lag(conn):
+    """(pending entries, age in seconds of the oldest one or None)."""
+    cur = conn.cursor()
+    try:
+        SQL_QUERIES['get_opportunity_outbox_lag'].execute(cur)
+        pending, oldest = cur.fetchone()
+        conn.commit()
+        return pending, None if oldest is None else float(oldest)
+    finally:
+        cur.close()
+
+
+def main():
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    print(f'opportunity worker: batch size {OUTBOX_BATCH_SIZE}, poll interval {OUTBOX_POLL_INTERVAL}s',
+          flush=True)
+    conn = None
+    while not _stopping:
+        try:
+            if conn is None:
+                conn = connect()
+            started = time.perf_counter()
+            entries, refreshes = drain_batch(conn)
+            if not entries:
+                time.sleep(OUTBOX_POLL_INTERVAL)
+                continue
+            pending, oldest = outbox_lag(conn)
+            lag = f'{oldest:.1f}s' if oldest is not None else '0s'
+            print(f'opportunity worker: applied {entries} entries as {refreshes} refreshes in '
+                  f'{time.perf_counter() - started:.3f}s; {pending} pending, lag {lag}', flush=True)
+        except MySQLdb.Error:
+            traceback.print_exc()
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                conn = None
+            time.sleep(OUTBOX_POLL_INTERVAL)
+    if conn is not None:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
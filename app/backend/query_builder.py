@@ -0,0 +1,66 @@
+"""Optional-filter queries that only contain the predicates a request supplies.
+
+A template .sql file declares its optional predicates in header comments and marks
+where they go with `{filters}` (and optionally `{limit}`):
+
+    -- @filter rarity: c.rarity = :rarity
+    -- @filter type:   c.type = :type
+    SELECT ... WHERE col.userID = :userId{filters}
+    ORDER BY c.rarity, c.name{limit}
+
+`FilteredQuery.execute(cur, values)` emits `AND <predicate>` for each filter whose value
+is not None, plus `LIMIT :pageSize` when `pageSize` is given. MySQL therefore plans every
+filter combination on its own instead of one generic `(:x IS NULL OR col = :x)` plan. Each
+combination is compiled once and cached.
+"""
+import re
+import threading
+
+from sql_statements import compile_sql
+
+_FILTER_LINE = re.compile(r'^\s*--\s*@filter\s+(\w+)\s*:\s*(.+?)\s*$', re.MULTILINE)
+
+
+class FilteredQuery:
+    """A SQL template plus its named optional predicates (in declaration order)."""
+
+    def __init__(self, name, template, filters):
+        if '{filters}' not in template:
+            raise ValueError(f'{name}: template has no {{filters}} marker')
+        self.name = name
+        self.template = template
+        self.filters = dict(filters)
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_text(cls, name, text):
+        """Build from a template file's text, reading `-- @filter key: predicate` lines."""
+        return cls(name, text, _FILTER_LINE.findall(text))
+
+    def variant(self, supplied, paged=False):
+        """The compiled SQLStatement for the filter keys in `supplied`."""
+        key = (tuple(k for k in self.filters if k in supplied), paged)
+        stmt = self._variants.get(key)
+        if stmt is None:
+            filters, _ = key
+            text = self.template.replace(
+                '{filters}', ''.join(f'\n  AND {self.filters[k]}' for k in filters)
+            ).replace('{limit}', '\nLIMIT :pageSize' if paged else '')
+            label = '+'.join(filters) or 'all'
+            stmt = compile_sql(f'{self.name}[{label}{",paged" if paged else ""}]', text)
+            with self._lock:
+                stmt = self._variants.setdefault(key, stmt)
+        return stmt
+
+    def variant_for(self, values):
+        """The variant matching the non-None filter values in `values`."""
+        supplied = [k for k in self.filters if values.get(k) is not None]
+        return self.variant(supplied, values.get('pageSize') is not None)
+
+    def execute(self, cur, values):
+        """Execute the variant matching the non-None filter values in `values`."""
+        return self.variant_for(values).execute(cur, values)
+
+    def __repr__(self):
+        return f'<FilteredQuery {self.name} filters={list(self.filters)}>'
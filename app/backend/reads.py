@@ -0,0 +1,373 @@
+"""Read paths shared by the sync app (app.py) and the async app (async_app.py).
+
+Each `read_*` function is a generator: it yields `(statement, values)` for every query it
+needs, receives the fetched rows back and returns its result. `sql_statements.run` drives
+it on a MySQLdb cursor and `sql_statements.run_async` on an aiomysql cursor, so both
+servers run the same SQL and shape rows into the same JSON.
+
+Query-string parsing helpers take the request's `args` MultiDict, which Flask and Quart
+share.
+"""
+import base64
+import hashlib
+import json
+import threading
+import time
+
+from card_search import SEARCH_MODES, CardNameIndex
+from match_engine import flatten_matches, mutual_matches
+
+# Keyset pagination for the list endpoints (/api/cards, /api/collection, /api/wishlist)
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+CARD_FIELDS = ('cardID', 'name', 'packName', 'rarity', 'type', 'imageURL')
+COLLECTION_FIELDS = ('cardID', 'name', 'packName', 'rarity', 'type', 'quantity', 'imageURL')
+WISHLIST_FIELDS = ('cardID', 'name', 'packName', 'rarity', 'type', 'dateAdded', 'imageURL')
+
+def _text(value):
+    return str(value) if value else None
+
+
+# Column layouts of get_cards, get_users and get_market_trends rows for the columnar formats
+# (formats.encode): (name, converter applied in the JSON/MessagePack encodings)
+CARD_COLUMNS = tuple((name, None) for name in CARD_FIELDS)
+USER_COLUMNS = (('userID', None), ('username', None), ('dateJoined', _text))
+MARKET_TREND_COLUMNS = tuple((name, None) for name in (
+    'cardID', 'name', 'rarity', 'packName', 'imageURL', 'demand', 'supply', 'trend'))
+
+# Sections of /api/dashboard, each shaped like the body of the endpoint it replaces
+DASHBOARD_SECTIONS = ('activeTrades', 'users', 'tradeOpportunities', 'collection', 'matches', 'cards')
+
+
+def encode_cursor(rarity_rank, name, card_id):
+    """Opaque cursor for the row a page ended on (its sort key)."""
+    raw = json.dumps([int(rarity_rank), name, card_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        rank, name, card_id = json.loads(raw)
+        if not isinstance(rank, int) or not isinstance(name, str) or not isinstance(card_id, str):
+            raise ValueError
+        return rank, name, card_id
+    except Exception:
+        raise ValueError('invalid cursor') from None
+
+
+def parse_page_args(args, allowed_fields):
+    """Read limit/cursor/fields query params.
+
+    Returns (limit, after, fields): limit is None when the caller did not ask for a page,
+    after is the decoded cursor (or None) and fields the projected field names (or None).
+    Raises ValueError with a client-facing message on bad input.
+    """
+    limit = args.get('limit')
+    cursor = args.get('cursor')
+    fields = args.get('fields')
+
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError('limit must be an integer') from None
+        if limit <= 0 or limit > MAX_PAGE_SIZE:
+            raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    elif cursor:
+        limit = DEFAULT_PAGE_SIZE
+
+    after = decode_cursor(cursor) if cursor else None
+
+    if fields:
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in fields if f not in allowed_fields]
+        if unknown:
+            raise ValueError(f'unknown fields: {", ".join(unknown)}')
+    else:
+        fields = None
+    return limit, after, fields
+
+
+def parse_match_mode(args):
+    match = args.get('match', 'substring')
+    if match not in SEARCH_MODES:
+        raise ValueError(f'match must be one of: {", ".join(SEARCH_MODES)}')
+    return match
+
+
+def parse_include(args):
+    """Dashboard sections named by `include` (comma-separated); all of them when absent."""
+    include = args.get('include')
+    if not include:
+        return list(DASHBOARD_SECTIONS)
+    sections = [s.strip() for s in include.split(',') if s.strip()]
+    unknown = [s for s in sections if s not in DASHBOARD_SECTIONS]
+    if unknown or not sections:
+        raise ValueError(f'include must list sections from: {", ".join(DASHBOARD_SECTIONS)}')
+    return [s for s in DASHBOARD_SECTIONS if s in sections]
+
+
+def page_params(limit, after):
+    """Bind values for the :after*/:pageSize parameters of the paged statements."""
+    rank, name, card_id = after if after else (None, None, None)
+    # One extra row tells us whether another page exists without a COUNT(*)
+    return {'afterRank': rank, 'afterName': name, 'afterCardId': card_id, 'pageSize': limit + 1}
+
+
+def project(items, fields):
+    if not fields:
+        return items
+    return [{f: item[f] for f in fields} for item in items]
+
+
+def _trim_page(rows, limit, rank_col):
+    """Cut the look-ahead row off a page; returns (rows, nextCursor or None)."""
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last[rank_col], last[1], last[0])
+
+
+# Row shapes of the read endpoints
+
+def card_item(card):
+    return {
+        'cardID': card[0],
+        'name': card[1],
+        'packName': card[2],
+        'rarity': card[3],
+        'type': card[4],
+        'imageURL': card[5]
+    }
+
+
+def collection_item(r):
+    return {
+        'cardID': r[0], 'name': r[1], 'packName': r[2], 'rarity': r[3], 'type': r[4],
+        'quantity': r[5], 'imageURL': r[6]
+    }
+
+
+def wishlist_item(r):
+    return {
+        'cardID': r[0], 'name': r[1], 'packName': r[2], 'rarity': r[3], 'type': r[4],
+        'dateAdded': str(r[5]) if r[5] else None, 'imageURL': r[6]
+    }
+
+
+def user_item(user):
+    return {
+        'userID': user[0],
+        'username': user[1],
+        'dateJoined': str(user[2]) if user[2] else None
+    }
+
+
+def market_trend_item(r):
+    return {
+        'cardID': r[0], 'name': r[1], 'rarity': r[2], 'packName': r[3], 'imageURL': r[4],
+        'demand': r[5], 'supply': r[6], 'trend': r[7]
+    }
+
+
+def trade_opportunity_item(r):
+    return {
+        'ownerID': r[0], 'ownerName': r[1], 'cardID': r[2], 'cardName': r[3], 'createdAt': str(r[4]) if r[4] else None
+    }
+
+
+def active_trade_item(r):
+    # get_active_trades.sql columns:
+    # 0: tradeID, 1: initiatorID, 2: responderID,
+    # 3: cardOfferedByUser1, 4: cardOfferedByUser1Name, 5: cardOfferedByUser1Image,
+    # 6: cardOfferedByUser2, 7: cardOfferedByUser2Name, 8: cardOfferedByUser2Image,
+    # 9: status, 10: createdBy, 11: confirmedBy, 12: dateCompleted, 13: dateStarted
+    status = r[9]
+    return {
+        'initiatorID': r[1], 'responderID': r[2],
+        'cardOfferedByUser1': r[3], 'cardOfferedByUser1Name': r[4], 'cardOfferedByUser1Image': r[5],
+        'cardOfferedByUser2': r[6], 'cardOfferedByUser2Name': r[7], 'cardOfferedByUser2Image': r[8],
+        'status': status,
+        'confirmed': True if status == 'accepted' else False,
+        'createdBy': r[10], 'confirmedBy': r[11],
+        'dateCompleted': str(r[12]) if r[12] else None,
+        'createdAt': str(r[13]) if r[13] else None
+    }
+
+
+class CardCatalogue:
+    """The serialized /api/cards response and card-name search index, keyed by the
+    CatalogVersion row for 'Card'. The version is re-read at most every `check_interval`
+    seconds.
+    """
+
+    def __init__(self, statements, check_interval=5.0):
+        self.statements = statements
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._state = {'version': None, 'etag': None, 'body': None, 'index': None, 'checked_at': 0.0}
+
+    def current(self):
+        """Read generator returning (etag, body, index), rebuilt only when the version changes.
+
+        `body` is the serialized /api/cards response and `index` the CardNameIndex over it.
+        """
+        state = self._state
+        now = time.monotonic()
+        with self._lock:
+            if state['body'] is not None and now - state['checked_at'] < self.check_interval:
+                return state['etag'], state['body'], state['index']
+
+        rows = yield self.statements['get_catalog_version'], {'name': 'Card'}
+        version = rows[0][0] if rows else 0
+        with self._lock:
+            if state['body'] is not None and state['version'] == version:
+                state['checked_at'] = now
+                return state['etag'], state['body'], state['index']
+
+        cards = yield self.statements['get_cards'], None
+        card_list = [card_item(card) for card in cards]
+
+        # Same bytes as jsonify's default provider (sorted keys, ASCII), minus whitespace
+        body = json.dumps({
+            'status': 'success',
+            'cards': card_list,
+            'count': len(card_list)
+        }, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        etag = f'cards-v{version}-{hashlib.sha1(body).hexdigest()[:16]}'
+        index = CardNameIndex(card_list)
+        with self._lock:
+            state.update(version=version, etag=etag, body=body, index=index, checked_at=now)
+        return etag, body, index
+
+
+def card_name_filter(catalogue, name, match):
+    """Read generator resolving a name filter to the cardIDs bound as :cardIds.
+
+    The name goes through the in-process search index, so MySQL probes Card/Collection by
+    key instead of scanning with LIKE '%name%'. Returns None when there is nothing to
+    filter on and an empty list when no card can match.
+    """
+    if not name:
+        return None
+    _, _, index = yield from catalogue.current()
+    card_ids = index.search(name, match)
+    if len(card_ids) == len(index):
+        return None
+    return card_ids
+
+
+def read_cards(statements, limit=None, after=None):
+    """All cards, or one keyset page when `limit` is set. Returns (items, nextCursor)."""
+    if limit is None:
+        rows = yield statements['get_cards'], None
+        return [card_item(card) for card in rows], None
+    rows = yield statements['get_cards_page'], page_params(limit, after)
+    rows, next_cursor = _trim_page(rows, limit, 6)
+    return [card_item(card) for card in rows], next_cursor
+
+
+def read_rows(statement, values=None):
+    """The raw rows of one statement, for encoders that work on cursor rows directly."""
+    rows = yield statement, values
+    return rows
+
+
+def read_users(statements):
+    rows = yield statements['get_users'], None
+    return [user_item(user) for user in rows]
+
+
+def read_filtered(query, params, shape, limit=None, after=None):
+    """Run a FilteredQuery (collection/wishlist). Returns (items, nextCursor).
+
+    `params` holds the filter values; an empty :cardIds list means nothing can match.
+    """
+    if params.get('cardIds') == []:
+        return [], None
+    if limit is not None:
+        params = dict(params, **page_params(limit, after))
+    rows = yield query.variant_for(params), params
+    rows, next_cursor = _trim_page(rows, limit, 7)
+    return [shape(r) for r in rows], next_cursor
+
+
+def read_trade_opportunities(statements, user_id):
+    rows = yield statements['get_trade_opportunities'], {'targetId': user_id}
+    return [trade_opportunity_item(r) for r in rows]
+
+
+def read_active_trades(statements, user_id):
+    # Trades on either side of the user, both legs resolved in one pass (get_active_trades.sql)
+    rows = yield statements['get_active_trades'], {'userId': user_id}
+    return [active_trade_item(r) for r in rows]
+
+
+class PartnerCache:
+    """Per-user ranked mutual-match partners, reused for `ttl` seconds (0 disables)."""
+
+    def __init__(self, statements, ttl=0.0, max_users=10000):
+        self.statements = statements
+        self.ttl = ttl
+        self.max_users = max_users
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def ranked(self, user_id, refresh=False):
+        """Read generator returning ranked partners (see match_engine.mutual_matches)."""
+        now = time.monotonic()
+        if self.ttl > 0 and not refresh:
+            with self._lock:
+                hit = self._entries.get(user_id)
+            if hit and now - hit[0] < self.ttl:
+                return hit[1]
+
+        partners = yield from mutual_matches(self.statements, user_id)
+        if self.ttl > 0:
+            with self._lock:
+                self._entries.pop(user_id, None)
+                if len(self._entries) >= self.max_users:
+                    self._entries.pop(next(iter(self._entries)))
+                self._entries[user_id] = (now, partners)
+        return partners
+
+
+def _listed(read, key='items'):
+    items = yield from read
+    return {key: items, 'count': len(items)}
+
+
+def _cards_section(catalogue):
+    _, _, index = yield from catalogue.current()
+    cards = list(index.cards.values())
+    return {'cards': cards, 'count': len(cards)}
+
+
+def _matches_section(partner_cache, user_id):
+    partners = yield from partner_cache.ranked(user_id)
+    items = flatten_matches(partners)
+    return {'items': items, 'count': len(items), 'partners': partners}
+
+
+def dashboard_reads(statements, collection_query, catalogue, partner_cache, user_id, sections):
+    """Read generators for the requested /api/dashboard sections, keyed by section name.
+
+    They are independent of each other, so the caller may run them concurrently on
+    separate connections.
+    """
+    def collection():
+        items, _ = yield from read_filtered(collection_query, {'userId': user_id}, collection_item)
+        return {'items': items, 'count': len(items)}
+
+    builders = {
+        'activeTrades': lambda: _listed(read_active_trades(statements, user_id)),
+        'users': lambda: _listed(read_users(statements), 'users'),
+        'tradeOpportunities': lambda: _listed(read_trade_opportunities(statements, user_id)),
+        'collection': collection,
+        'matches': lambda: _matches_section(partner_cache, user_id),
+        'cards': lambda: _cards_section(catalogue),
+    }
+    return {name: builders[name]() for name in sections}
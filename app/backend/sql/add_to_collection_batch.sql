@@ -0,0 +1,5 @@
+-- Multi-row form of add_to_collection.sql (dateAcquired falls back to its CURRENT_TIMESTAMP default).
+-- Every VALUES entry is a placeholder so executemany() sends all rows as one INSERT.
+INSERT INTO Collection (userID, cardID, quantity)
+VALUES (:userId, :cardId, :quantity)
+ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity);
@@ -1,6 +1,4 @@
--- Confirm a pending trade: call stored procedure to validate and perform collection transfers
--- Params: confirmedBy, user1, user2, cardSent1, cardSent2
--- Confirm a trade by tradeID. Triggers on Trade will perform the collection swap.
+-- Mark trades accepted once trade_settlement.py has applied their swaps
 UPDATE Trade
-SET status = 'accepted', confirmedBy = %s, dateCompleted = NOW()
-WHERE tradeID = %s AND status = 'pending';
+SET status = 'accepted', confirmedBy = :confirmedBy, dateCompleted = NOW()
+WHERE tradeID IN :tradeIds AND status = 'pending';
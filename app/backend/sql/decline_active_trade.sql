@@ -1,6 +1,4 @@
--- Decline (mark rejected) a pending trade via stored procedure
--- Params: user1, user2, cardSent1, cardSent2
--- Decline a trade by tradeID (the caller should locate the matching tradeID)
+-- Decline (mark rejected) pending trades by tradeID (the caller locates or lists the tradeIDs)
 UPDATE Trade
 SET status = 'declined', dateCompleted = NOW()
-WHERE tradeID = %s AND status = 'pending';
+WHERE tradeID IN :tradeIds AND status = 'pending';
@@ -0,0 +1,4 @@
+-- Take one copy of :cardId from :userId in a single statement while more than one remains.
+-- LAST_INSERT_ID(expr) hands the new quantity back as the cursor's lastrowid (no re-read)
+UPDATE Collection SET quantity = LAST_INSERT_ID(quantity - 1)
+WHERE userID = :userId AND cardID = :cardId AND quantity > 1;
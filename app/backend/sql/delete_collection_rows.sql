@@ -0,0 +1,2 @@
+-- Delete Collection rows by (userID, cardID) pairs (settled trades that gave away the last copy)
+DELETE FROM Collection WHERE (userID, cardID) IN :pairs;
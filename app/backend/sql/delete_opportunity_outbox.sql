@@ -0,0 +1,2 @@
+-- Remove applied outbox entries by primary key (no gap locks, so triggers keep appending)
+DELETE FROM TradeOpportunityOutbox WHERE id IN :ids;
@@ -1,20 +1,28 @@
--- Get active trades (built from canonical Trade + Tradecard via view)
--- Params: userID, userID
+-- Get active trades for :userId (either side of the trade)
+-- The UNION lets each branch use its own Trade index (initiator / recipient) instead of an OR,
+-- then both legs are resolved in one pass over Tradecard joined to Card.
 SELECT
-    at.tradeID,
-    at.initiatorID AS initiatorID,
-    at.responderID AS responderID,
-    at.cardOfferedByUser1 AS cardOfferedByUser1,
-    at.cardOfferedByUser1Name AS cardOfferedByUser1Name,
-    at.cardOfferedByUser1Image AS cardOfferedByUser1Image,
-    at.cardOfferedByUser2 AS cardOfferedByUser2,
-    at.cardOfferedByUser2Name AS cardOfferedByUser2Name,
-    at.cardOfferedByUser2Image AS cardOfferedByUser2Image,
-    at.status,
-    at.createdBy,
-    at.confirmedBy,
-    at.dateCompleted,
-    at.dateStarted AS createdAt
-FROM active_trades_view at
-WHERE at.initiatorID = %s OR at.responderID = %s
-ORDER BY at.dateStarted DESC;
+    t.tradeID,
+    t.initiatorID AS initiatorID,
+    t.recipientID AS responderID,
+    MAX(CASE WHEN tc.fromUserID = t.initiatorID THEN tc.cardID END)  AS cardOfferedByUser1,
+    MAX(CASE WHEN tc.fromUserID = t.initiatorID THEN c.name END)     AS cardOfferedByUser1Name,
+    MAX(CASE WHEN tc.fromUserID = t.initiatorID THEN c.imageURL END) AS cardOfferedByUser1Image,
+    MAX(CASE WHEN tc.fromUserID = t.recipientID THEN tc.cardID END)  AS cardOfferedByUser2,
+    MAX(CASE WHEN tc.fromUserID = t.recipientID THEN c.name END)     AS cardOfferedByUser2Name,
+    MAX(CASE WHEN tc.fromUserID = t.recipientID THEN c.imageURL END) AS cardOfferedByUser2Image,
+    t.status,
+    t.createdBy,
+    t.confirmedBy,
+    t.dateCompleted,
+    t.dateStarted AS createdAt
+FROM (
+    SELECT tradeID FROM Trade WHERE initiatorID = :userId
+    UNION
+    SELECT tradeID FROM Trade WHERE recipientID = :userId
+) mine
+JOIN Trade t ON t.tradeID = mine.tradeID
+LEFT JOIN Tradecard tc ON tc.tradeID = t.tradeID
+LEFT JOIN Card c ON c.cardID = tc.cardID
+GROUP BY t.tradeID
+ORDER BY t.dateStarted DESC;
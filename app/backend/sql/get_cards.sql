@@ -12,4 +12,5 @@ ORDER BY
     WHEN '1D' THEN 8
     ELSE 99
   END,
-  name;
+  name,
+  cardID;
@@ -0,0 +1,23 @@
+-- One keyset page of the catalogue in the get_cards.sql order (rarity rank, name, cardID)
+-- :afterRank/:afterName/:afterCardId come from the previous page's cursor (all NULL for the first page)
+SELECT cardID, name, packName, rarity, type, imageURL, rarityRank
+FROM (
+  SELECT cardID, name, packName, rarity, type, imageURL,
+    CASE rarity
+      WHEN 'C'  THEN 1
+      WHEN '3S' THEN 2
+      WHEN '4D' THEN 3
+      WHEN '3D' THEN 4
+      WHEN '2S' THEN 5
+      WHEN '1S' THEN 6
+      WHEN '2D' THEN 7
+      WHEN '1D' THEN 8
+      ELSE 99
+    END AS rarityRank
+  FROM Card
+) c
+WHERE :afterRank IS NULL
+   OR c.rarityRank > :afterRank
+   OR (c.rarityRank = :afterRank AND (c.name > :afterName OR (c.name = :afterName AND c.cardID > :afterCardId)))
+ORDER BY c.rarityRank, c.name, c.cardID
+LIMIT :pageSize;
@@ -0,0 +1,2 @@
+-- Current version of a cached catalogue (bumped by the Card triggers)
+SELECT version FROM CatalogVersion WHERE name = :name;
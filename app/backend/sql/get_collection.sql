@@ -1,10 +1,14 @@
--- :userId, :rarityOpt, :typeOpt, :packOpt, :nameSearchOpt are parameters
-SELECT c.cardID, c.name, c.packName, c.rarity, c.type, col.quantity, c.imageURL
+-- Get a user's collection, ordered by (rarity, name, cardID); rarityRank is the ENUM index
+-- that ORDER BY c.rarity sorts on and feeds the keyset cursor.
+-- Template for query_builder.FilteredQuery: only the filters a request supplies are added.
+-- :cardIds is the name search resolved to cardIDs by the in-process index (see card_search.py)
+-- @filter rarity: c.rarity = :rarity
+-- @filter type: c.type = :type
+-- @filter packName: c.packName = :packName
+-- @filter cardIds: c.cardID IN :cardIds
+-- @filter afterRank: (c.rarity + 0 > :afterRank OR (c.rarity + 0 = :afterRank AND (c.name > :afterName OR (c.name = :afterName AND c.cardID > :afterCardId))))
+SELECT c.cardID, c.name, c.packName, c.rarity, c.type, col.quantity, c.imageURL, c.rarity + 0 AS rarityRank
 FROM Collection col
 JOIN Card c ON c.cardID = col.cardID
-WHERE col.userID = :userId
-  AND (:rarityOpt IS NULL OR c.rarity = :rarityOpt)
-  AND (:typeOpt   IS NULL OR c.type   = :typeOpt)
-  AND (:packOpt   IS NULL OR c.packName = :packOpt)
-  AND (:nameSearchOpt IS NULL OR c.name LIKE CONCAT('%%', :nameSearchOpt, '%%'))
-ORDER BY c.rarity, c.name;
+WHERE col.userID = :userId{filters}
+ORDER BY c.rarity, c.name, c.cardID{limit};
@@ -1 +1,6 @@
-SELECT * FROM market_trends_view;
+-- Market trends from the incrementally maintained CardMarketStats table
+-- (idx_cardmarketstats_trend serves the ORDER BY without a sort)
+SELECT c.cardID, c.name, c.rarity, c.packName, c.imageURL, s.demand, s.supply, s.trend
+FROM CardMarketStats s
+JOIN Card c ON c.cardID = s.cardID
+ORDER BY s.trend DESC;
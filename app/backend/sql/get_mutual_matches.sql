@@ -1,3 +1,5 @@
+-- Legacy cross-join form of the mutual-match query. /api/matches now uses match_engine.py;
+-- this file is kept as the baseline for database/scripts/bench_mutual_matches.py.
 -- :me is the logged-in userId
 -- Finds users (other) where me wants X and other owns X, and other wants Y and me owns Y
 -- Only returns pairs where the two cards share the same rarity
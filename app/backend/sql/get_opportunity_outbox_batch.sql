@@ -0,0 +1,6 @@
+-- Oldest queued TradeOpportunity refreshes for backend/opportunity_worker.py.
+-- A plain consistent read: locking it would also lock the gap the triggers append into.
+SELECT id, kind, userID, cardID
+FROM TradeOpportunityOutbox
+ORDER BY id
+LIMIT :batchSize;
@@ -0,0 +1,4 @@
+-- Queued TradeOpportunity refreshes and the age in seconds of the oldest one
+SELECT COUNT(*) AS pending,
+       TIMESTAMPDIFF(MICROSECOND, MIN(createdAt), NOW(3)) / 1000000 AS oldestSeconds
+FROM TradeOpportunityOutbox;
@@ -1,4 +1,5 @@
 -- Get trade opportunities for a target user
+-- Reads idx_tradeopportunity_target_created backwards: no filesort, no TradeOpportunity row lookups
 SELECT t.ownerID, u.username AS ownerName, t.cardID, c.name AS cardName, t.createdAt
 FROM TradeOpportunity t
 JOIN User u ON u.userID = t.ownerID
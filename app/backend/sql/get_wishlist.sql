@@ -1,10 +1,11 @@
--- Get a user's wishlist items with optional filters (same named-param pattern as get_collection.sql)
-SELECT c.cardID, c.name, c.packName, c.rarity, c.type, w.dateAdded, c.imageURL
+-- Get a user's wishlist items (same template and filters as get_collection.sql)
+-- @filter rarity: c.rarity = :rarity
+-- @filter type: c.type = :type
+-- @filter packName: c.packName = :packName
+-- @filter cardIds: c.cardID IN :cardIds
+-- @filter afterRank: (c.rarity + 0 > :afterRank OR (c.rarity + 0 = :afterRank AND (c.name > :afterName OR (c.name = :afterName AND c.cardID > :afterCardId))))
+SELECT c.cardID, c.name, c.packName, c.rarity, c.type, w.dateAdded, c.imageURL, c.rarity + 0 AS rarityRank
 FROM Wishlist w
 JOIN Card c USING (cardID)
-WHERE w.userID = :userId
-  AND ( :rarityOpt IS NULL OR c.rarity = :rarityOpt )
-  AND ( :typeOpt IS NULL OR c.type = :typeOpt )
-  AND ( :packOpt IS NULL OR c.packName = :packOpt )
-  AND ( :nameSearchOpt IS NULL OR c.name LIKE CONCAT('%', :nameSearchOpt, '%') )
-ORDER BY c.rarity, c.name;
+WHERE w.userID = :userId{filters}
+ORDER BY c.rarity, c.name, c.cardID{limit};
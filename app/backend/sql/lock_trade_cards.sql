@@ -0,0 +1,8 @@
+-- Lock the two Card rows of a new trade in cardID order, before validate_new_trade.sql reads
+-- them. Concurrent creates with the cards swapped then queue on the first card instead of
+-- each holding one Card lock and deadlocking on the other.
+SELECT cardID
+FROM Card
+WHERE cardID IN (LEAST(:cardSent1, :cardSent2), GREATEST(:cardSent1, :cardSent2))
+ORDER BY cardID
+FOR UPDATE;
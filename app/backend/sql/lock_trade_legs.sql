@@ -0,0 +1,16 @@
+-- Every leg of the trades in :tradeIds with the sender's current quantity, in one locking read.
+-- FOR UPDATE locks the Trade, Tradecard and sender Collection rows in tradeID order, so
+-- concurrent settlements queue on the same rows instead of deadlocking on them.
+-- toUserID may be NULL on older rows; the receiver is then the other participant.
+-- Returns: tradeID, initiatorID, recipientID, createdBy, status, fromUserID, toUserID, cardID, quantity
+SELECT t.tradeID, t.initiatorID, t.recipientID, t.createdBy, t.status,
+       tc.fromUserID,
+       COALESCE(tc.toUserID, IF(tc.fromUserID = t.initiatorID, t.recipientID, t.initiatorID)) AS toUserID,
+       tc.cardID,
+       col.quantity
+FROM Trade t
+JOIN Tradecard tc ON tc.tradeID = t.tradeID
+LEFT JOIN Collection col ON col.userID = tc.fromUserID AND col.cardID = tc.cardID
+WHERE t.tradeID IN :tradeIds
+ORDER BY t.tradeID, tc.id
+FOR UPDATE;
@@ -0,0 +1,6 @@
+-- Status and participants of the trades in :tradeIds, locked in tradeID order before they are declined
+SELECT tradeID, status, initiatorID, recipientID
+FROM Trade
+WHERE tradeID IN :tradeIds
+ORDER BY tradeID
+FOR UPDATE;
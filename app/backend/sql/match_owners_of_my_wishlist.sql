@@ -0,0 +1,7 @@
+-- Mutual-match probe 1: for each card on :me's wishlist, the other users holding a copy.
+-- Starts from :me's wishlist (PK prefix) and probes idx_collection_card_qty_user (covering).
+SELECT w.cardID, c.name, c.rarity, col.userID
+FROM Wishlist w
+JOIN Card c ON c.cardID = w.cardID
+JOIN Collection col ON col.cardID = w.cardID AND col.quantity > 0 AND col.userID <> :me
+WHERE w.userID = :me;
@@ -0,0 +1,2 @@
+-- Usernames for the partners found by match_engine (:userIds expands to an IN list)
+SELECT userID, username FROM User WHERE userID IN :userIds;
@@ -0,0 +1,7 @@
+-- Mutual-match probe 2: for each card :me holds, the other users wishing for it.
+-- Starts from :me's collection (PK prefix) and probes idx_wishlist_card_user (covering).
+SELECT col.cardID, c.name, c.rarity, w.userID
+FROM Collection col
+JOIN Card c ON c.cardID = col.cardID
+JOIN Wishlist w ON w.cardID = col.cardID AND w.userID <> :me
+WHERE col.userID = :me AND col.quantity > 0;
@@ -0,0 +1,8 @@
+-- Recompute every CardMarketStats row from Wishlist and Collection (same as
+-- database/migrations/03-populate-card-market-stats.sql); used by `flask rebuild-market-stats`
+INSERT INTO CardMarketStats (cardID, demand, supply)
+SELECT c.cardID, COALESCE(w.demand, 0), COALESCE(col.supply, 0)
+FROM Card c
+LEFT JOIN (SELECT cardID, COUNT(*) AS demand FROM Wishlist GROUP BY cardID) w ON w.cardID = c.cardID
+LEFT JOIN (SELECT cardID, COUNT(*) AS supply FROM Collection GROUP BY cardID) col ON col.cardID = c.cardID
+ON DUPLICATE KEY UPDATE demand = VALUES(demand), supply = VALUES(supply);
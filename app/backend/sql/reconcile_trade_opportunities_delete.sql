@@ -0,0 +1,7 @@
+-- Drop TradeOpportunity rows for cards in (:afterCardId, :lastCardId] whose owner no longer
+-- holds a duplicate or whose target no longer wishes for the card
+DELETE t FROM TradeOpportunity t
+LEFT JOIN Collection col ON col.userID = t.ownerID AND col.cardID = t.cardID AND col.quantity >= 2
+LEFT JOIN Wishlist w ON w.userID = t.targetID AND w.cardID = t.cardID
+WHERE t.cardID > :afterCardId AND t.cardID <= :lastCardId
+  AND (col.userID IS NULL OR w.userID IS NULL OR t.ownerID = t.targetID);
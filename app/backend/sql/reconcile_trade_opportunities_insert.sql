@@ -0,0 +1,8 @@
+-- Add missing TradeOpportunity rows for cards in (:afterCardId, :lastCardId]
+-- (same rule as the refresh_*_opportunities procedures in database/migrations/02-triggers.sql)
+INSERT IGNORE INTO TradeOpportunity (ownerID, targetID, cardID)
+SELECT col.userID, w.userID, col.cardID
+FROM Collection col
+JOIN Wishlist w ON w.cardID = col.cardID AND w.userID <> col.userID
+WHERE col.cardID > :afterCardId AND col.cardID <= :lastCardId
+  AND col.quantity >= 2;
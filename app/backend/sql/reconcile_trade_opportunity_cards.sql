@@ -0,0 +1,5 @@
+-- Next batch of card IDs for `flask reconcile-trade-opportunities` (keyset on cardID)
+SELECT cardID FROM Card
+WHERE cardID > :afterCardId
+ORDER BY cardID
+LIMIT :batchSize;
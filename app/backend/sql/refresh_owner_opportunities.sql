@@ -0,0 +1,2 @@
+-- Recompute the opportunities :userId offers for :cardId (see database/migrations/02-triggers.sql)
+CALL refresh_owner_opportunities(:userId, :cardId);
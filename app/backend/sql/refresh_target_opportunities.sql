@@ -0,0 +1,2 @@
+-- Recompute the opportunities offered to :userId for :cardId (see database/migrations/02-triggers.sql)
+CALL refresh_target_opportunities(:userId, :cardId);
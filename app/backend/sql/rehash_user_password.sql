@@ -0,0 +1,4 @@
+-- Replace a legacy plaintext password with its hash (no-op if the row changed meanwhile)
+UPDATE User
+SET passwordHash = :passwordHash
+WHERE userID = :userId AND passwordHash = :oldPasswordHash;
@@ -1,2 +1,3 @@
--- Remove a card from a user's collection
-DELETE FROM Collection WHERE userID = :userId AND cardID = :cardId;
+-- Remove the last copy of a card from a user's collection
+-- (the fallback when decrement_collection.sql matched no row)
+DELETE FROM Collection WHERE userID = :userId AND cardID = :cardId AND quantity <= 1;
@@ -0,0 +1,2 @@
+-- Delete Wishlist entries by (userID, cardID) pairs (cards received in settled trades)
+DELETE FROM Wishlist WHERE (userID, cardID) IN :pairs;
@@ -0,0 +1,2 @@
+-- Resolve a username to its userID (cached by user_resolver.UserResolver)
+SELECT userID FROM User WHERE username = :username;
@@ -0,0 +1,23 @@
+-- Set-based decrement used by trade settlement: the sender rows in :pairs (net givers that keep
+-- at least one copy) lose their net number of copies across the settled trades in :tradeIds.
+-- The join runs over the Tradecard legs and Collection rows lock_trade_legs.sql locked, and an
+-- UPDATE never inserts: trade_settlement.py checks that exactly len(:pairs) rows changed.
+UPDATE Collection col
+JOIN (
+  SELECT legs.userID, legs.cardID, SUM(legs.given) AS given
+  FROM (
+    SELECT tc.fromUserID AS userID, tc.cardID, 1 AS given
+    FROM Tradecard tc
+    WHERE tc.tradeID IN :tradeIds
+    UNION ALL
+    SELECT COALESCE(tc.toUserID, IF(tc.fromUserID = t.initiatorID, t.recipientID, t.initiatorID)),
+           tc.cardID, -1
+    FROM Tradecard tc
+    JOIN Trade t ON t.tradeID = tc.tradeID
+    WHERE tc.tradeID IN :tradeIds
+  ) legs
+  GROUP BY legs.userID, legs.cardID
+) net ON net.userID = col.userID AND net.cardID = col.cardID
+SET col.quantity = col.quantity - net.given
+WHERE (col.userID, col.cardID) IN :pairs
+  AND col.quantity > net.given;
@@ -0,0 +1,26 @@
+-- Everything create_active_trade needs to validate a new trade, read in one locking statement.
+-- Run after lock_trade_cards.sql, which takes the Card locks in cardID order; holding both
+-- serializes concurrent creates that involve either card, and locking the two Collection
+-- rows keeps the quantities stable until the Trade rows are inserted.
+-- Returns: rarity1, rarity2, quantity1, quantity2, pending1, pending2
+SELECT
+  c1.rarity    AS rarity1,
+  c2.rarity    AS rarity2,
+  col1.quantity AS quantity1,
+  col2.quantity AS quantity2,
+  EXISTS (
+    SELECT 1 FROM Tradecard tc JOIN Trade t ON t.tradeID = tc.tradeID
+    WHERE tc.cardID = :cardSent1 AND t.status = 'pending'
+    LOCK IN SHARE MODE
+  ) AS pending1,
+  EXISTS (
+    SELECT 1 FROM Tradecard tc JOIN Trade t ON t.tradeID = tc.tradeID
+    WHERE tc.cardID = :cardSent2 AND t.status = 'pending'
+    LOCK IN SHARE MODE
+  ) AS pending2
+FROM (SELECT 1 AS one) anchor
+LEFT JOIN Card c1 ON c1.cardID = :cardSent1
+LEFT JOIN Card c2 ON c2.cardID = :cardSent2
+LEFT JOIN Collection col1 ON col1.userID = :user1 AND col1.cardID = :cardSent1
+LEFT JOIN Collection col2 ON col2.userID = :user2 AND col2.cardID = :cardSent2
+FOR UPDATE;
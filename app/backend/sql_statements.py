@@ -0,0 +1,209 @@
+"""Compile-once SQL statements for the files in backend/sql.
+
+Each .sql file is parsed a single time at startup into a `SQLStatement` that holds
+driver-ready SQL (positional `%s` placeholders, literal percent signs escaped) and
+the ordered list of named parameters it expects. Handlers then bind a dict of values
+instead of rewriting the SQL text on every request.
+
+Multi-query reads can be written once as generators that yield `(statement, values)` and
+receive the fetched rows; `run` drives them on a MySQLdb cursor and `run_async` on an
+aiomysql cursor (see reads.py).
+"""
+
+
+class SQLStatement:
+    """A parsed SQL file: positional SQL plus the ordered parameter names.
+
+    `params` lists the named parameters in the order they appear (a name used twice
+    appears twice). Files written with raw `%s` placeholders have `positional` set
+    and must be bound with a sequence instead of a dict.
+
+    A named parameter bound to a list or tuple expands to a parenthesised placeholder
+    list, so `c.cardID IN :cardIds` works for any number of IDs.
+    """
+
+    __slots__ = ('name', 'sql', 'params', 'positional', '_parts')
+
+    def __init__(self, name, sql, params, positional=0, parts=None):
+        self.name = name
+        self.sql = sql
+        self.params = tuple(params)
+        self.positional = positional
+        # SQL text between placeholders, used to expand list-valued parameters
+        self._parts = tuple(parts) if parts is not None else tuple(sql.split('%s'))
+
+    def bind(self, values=None):
+        """Return the parameter tuple for `values` (a dict for named statements)."""
+        if self.params:
+            if values is None:
+                values = {}
+            try:
+                return tuple(values[key] for key in self.params)
+            except KeyError as e:
+                raise ValueError(f'{self.name}: missing value for :{e.args[0]}') from None
+        values = tuple(values or ())
+        if len(values) != self.positional:
+            raise ValueError(
+                f'{self.name}: expected {self.positional} positional values, got {len(values)}'
+            )
+        return values
+
+    def render(self, values=None):
+        """Return (sql, args) for `values`, expanding list-valued named parameters."""
+        args = self.bind(values)
+        if not self.params or not any(isinstance(v, (list, tuple)) for v in args):
+            return self.sql, args
+        pieces = [self._parts[0]]
+        flat = []
+        for value, part in zip(args, self._parts[1:]):
+            if isinstance(value, (list, tuple)):
+                if not value:
+                    raise ValueError(f'{self.name}: list parameters cannot be empty')
+                pieces.append('(' + ', '.join(['%s'] * len(value)) + ')')
+                flat.extend(value)
+            else:
+                pieces.append('%s')
+                flat.append(value)
+            pieces.append(part)
+        return ''.join(pieces), tuple(flat)
+
+    def execute(self, cur, values=None):
+        """Bind `values` and execute on `cur`; always passes a tuple so `%%` unescapes.
+
+        `cur.statement_name` is set first so instrumented cursors (metrics.py) can label
+        the query.
+        """
+        cur.statement_name = self.name
+        return cur.execute(*self.render(values))
+
+    def executemany(self, cur, rows):
+        """Bind each item of `rows` and run them with `cur.executemany`.
+
+        For a single INSERT ... VALUES statement the driver sends all rows as one
+        multi-row INSERT.
+        """
+        cur.statement_name = self.name
+        return cur.executemany(self.sql, [self.bind(values) for values in rows])
+
+    def __repr__(self):
+        return f'<SQLStatement {self.name} params={list(self.params)}>'
+
+
+def _is_ident_char(ch):
+    return ch.isalnum() or ch == '_'
+
+
+def compile_sql(name, text):
+    """Parse SQL text into a `SQLStatement`.
+
+    Comments are dropped, quoted literals are copied verbatim (with `%` escaped),
+    `:name` tokens outside literals become `%s`, and existing `%s` placeholders are
+    counted as positional parameters.
+    """
+    out = []
+    parts = []  # SQL text between placeholders
+    params = []
+    positional = 0
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        nxt = text[i + 1] if i + 1 < n else ''
+
+        # -- line comments (MySQL requires whitespace after the dashes) and # comments
+        if (ch == '-' and nxt == '-' and (i + 2 >= n or text[i + 2].isspace())) or ch == '#':
+            end = text.find('\n', i)
+            if end == -1:
+                break
+            out.append('\n')
+            i = end + 1
+            continue
+
+        # /* block comments */
+        if ch == '/' and nxt == '*':
+            end = text.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            out.append(' ')
+            continue
+
+        # 'string', "string" and `identifier` literals
+        if ch in ("'", '"', '`'):
+            j = i + 1
+            while j < n:
+                if text[j] == '\\' and ch != '`':
+                    j += 2
+                    continue
+                if text[j] == ch:
+                    if j + 1 < n and text[j + 1] == ch:
+                        j += 2
+                        continue
+                    break
+                j += 1
+            out.append(text[i:j + 1].replace('%', '%%'))
+            i = j + 1
+            continue
+
+        # :named parameters (ignore `:=` assignments and identifiers like a:b)
+        if ch == ':' and (nxt.isalpha() or nxt == '_') and not (i > 0 and _is_ident_char(text[i - 1])):
+            j = i + 1
+            while j < n and _is_ident_char(text[j]):
+                j += 1
+            params.append(text[i + 1:j])
+            parts.append(''.join(out))
+            out = []
+            i = j
+            continue
+
+        if ch == '%':
+            if nxt == 's':
+                positional += 1
+                parts.append(''.join(out))
+                out = []
+                i += 2
+                continue
+            out.append('%%')
+            i += 1
+            continue
+
+        out.append(ch)
+        i += 1
+
+    if params and positional:
+        raise ValueError(f'{name}: mixes named and positional parameters')
+
+    parts.append(''.join(out))
+    parts[0] = parts[0].lstrip()
+    parts[-1] = parts[-1].rstrip().rstrip(';').rstrip()
+    return SQLStatement(name, '%s'.join(parts), params, positional, parts)
+
+
+def load_statements(sql_dir, name_to_file):
+    """Compile the files in `name_to_file` ({name: filename}); missing files are skipped."""
+    statements = {}
+    for name, filename in name_to_file.items():
+        path = sql_dir / filename
+        if path.exists():
+            statements[name] = compile_sql(name, path.read_text(encoding='utf-8'))
+    return statements
+
+
+def run(cur, read):
+    """Drive a read generator on a DB-API cursor and return its result."""
+    try:
+        statement, values = next(read)
+        while True:
+            statement.execute(cur, values)
+            statement, values = read.send(cur.fetchall())
+    except StopIteration as done:
+        return done.value
+
+
+async def run_async(cur, read):
+    """Drive a read generator on an aiomysql cursor and return its result."""
+    try:
+        statement, values = next(read)
+        while True:
+            await cur.execute(*statement.render(values))
+            statement, values = read.send(await cur.fetchall())
+    except StopIteration as done:
+        return done.value
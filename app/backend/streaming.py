@@ -0,0 +1,104 @@
+"""Streamed JSON bodies for the large list endpoints (`stream=1`).
+
+`RowStream` runs a statement on an unbuffered server-side cursor (`SSCursor`) and encodes
+rows into the response as they arrive. At most one `fetchmany` batch is held in memory,
+however many rows the query returns, and the first bytes go out before the last row is
+read. The body has the same keys as the buffered response, with `count` written last:
+
+    {"status":"success","items":[{...},{...}],"count":2}
+
+Items are encoded with orjson when it is installed and the standard json module otherwise.
+Once streaming has started the status code is already sent, so a database error mid-stream
+ends the body early and the client sees truncated JSON.
+"""
+import decimal
+import json
+import traceback
+
+from MySQLdb.cursors import SSCursor
+
+try:
+    import orjson
+except ImportError:  # optional; falls back to the json module
+    orjson = None
+
+STREAM_BATCH_ROWS = 500
+
+
+def _default(value):
+    # Same fallbacks as Flask's JSON provider for the types our queries return
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+if orjson is not None:
+    def dumps(obj):
+        return orjson.dumps(obj, default=_default)
+else:
+    def dumps(obj):
+        return json.dumps(obj, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+class RowStream:
+    """Iterable of JSON body chunks for one statement, on a connection of its own.
+
+    The statement is executed in the constructor, so errors before the first row still
+    surface as exceptions the handler can turn into a 500. `cursor_class` must be an
+    unbuffered cursor (an SSCursor subclass). The connection goes back to
+    `pool` when iteration ends or the server closes the response (client went away).
+    """
+
+    def __init__(self, pool, statement, values, shape, key='items', fields=None,
+                 batch_rows=STREAM_BATCH_ROWS, cursor_class=None):
+        self.shape = shape
+        self.key = key
+        self.fields = fields
+        self.batch_rows = batch_rows
+        self._pool = pool
+        self._conn = pool.acquire()
+        self._cur = None
+        try:
+            self._cur = self._conn.cursor(cursor_class or SSCursor)
+            statement.execute(self._cur, values)
+        except Exception:
+            self.close(discard=True)
+            raise
+
+    def _items(self, rows):
+        items = (self.shape(r) for r in rows)
+        if self.fields:
+            items = ({f: item[f] for f in self.fields} for item in items)
+        return items
+
+    def __iter__(self):
+        count = 0
+        try:
+            yield b'{"status":"success",' + dumps(self.key) + b':['
+            while True:
+                rows = self._cur.fetchmany(self.batch_rows)
+                if not rows:
+                    break
+                chunk = b','.join(dumps(item) for item in self._items(rows))
+                yield (b',' + chunk) if count else chunk
+                count += len(rows)
+            yield b'],"count":' + str(count).encode('ascii') + b'}'
+        except GeneratorExit:
+            raise
+        except Exception:
+            traceback.print_exc()
+            self.close(discard=True)
+            return
+        self.close()
+
+    def close(self, discard=False):
+        """Release the cursor and connection (idempotent)."""
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            if self._cur is not None:
+                self._cur.close()  # drains any unread rows off the wire
+        except Exception:
+            discard = True
+        self._pool.release(conn, discard=discard)
@@ -0,0 +1,54 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+from auth import _verify_password, is_legacy_plaintext, is_password_hash, session_secret_key
+
+
+def test_werkzeug_hashes_are_recognized():
+    assert is_password_hash(generate_password_hash('pw', method='pbkdf2:sha256:1000'))
+    assert is_password_hash('scrypt:32768:8:1$salt$abc123')
+
+
+def test_plaintext_is_not_a_hash():
+    for stored in ('hunter2', 'pa$$word', 'a$b$c', 'pbkdf2:sha256', 'pbkdf2:sha256$salt$', '', None):
+        assert not is_password_hash(stored)
+
+
+def test_hash_verifies_only_the_password():
+    stored = generate_password_hash('pw', method='pbkdf2:sha256:1000')
+    assert _verify_password(stored, 'pw')
+    assert not _verify_password(stored, 'other')
+    assert not is_legacy_plaintext(stored, 'pw')
+
+
+def test_presenting_the_stored_hash_does_not_log_in():
+    stored = generate_password_hash('pw', method='pbkdf2:sha256:1000')
+    assert not _verify_password(stored, stored)
+    assert not is_legacy_plaintext(stored, stored)
+
+
+def test_plaintext_with_dollar_signs_verifies_and_is_rehashed():
+    assert _verify_password('pa$$word', 'pa$$word')
+    assert is_legacy_plaintext('pa$$word', 'pa$$word')
+    assert not _verify_password('pa$$word', 'password')
+
+
+def test_missing_stored_value_never_verifies():
+    assert not _verify_password(None, 'x')
+    assert not _verify_password('', '')
+
+
+def test_secret_key_comes_from_the_environment():
+    assert session_secret_key({'SECRET_KEY': 'k'}) == 'k'
+
+
+def test_missing_secret_key_fails_outside_debug():
+    with pytest.raises(RuntimeError, match='SECRET_KEY is not set'):
+        session_secret_key({})
+    with pytest.raises(RuntimeError):
+        session_secret_key({'SECRET_KEY': '', 'FLASK_DEBUG': '0'})
+
+
+def test_debug_mode_generates_a_throwaway_key():
+    first = session_secret_key({'FLASK_DEBUG': '1'})
+    assert len(first) == 64 and first != session_secret_key({'FLASK_DEBUG': 'true'})
@@ -0,0 +1,61 @@
+import pytest
+
+from card_search import CardNameIndex, normalize
+
+CARDS = [
+    {'cardID': 'A1-001', 'name': 'Bulbasaur'},
+    {'cardID': 'A1-036', 'name': 'Charizard ex'},
+    {'cardID': 'A1-033', 'name': 'Charmander'},
+    {'cardID': 'A2-010', 'name': 'Mega Charizard ex'},
+    {'cardID': 'A1-129', 'name': 'Mr. Mime'},
+    {'cardID': 'P-007', 'name': 'Pokémon Center Lady'},
+    {'cardID': 'A3-036', 'name': 'Charizard ex'},  # reprint: same name, later in the catalogue
+]
+
+
+@pytest.fixture(scope='module')
+def index():
+    return CardNameIndex(CARDS)
+
+
+def test_normalize_folds_case_accents_and_punctuation():
+    assert normalize('Pokémon') == 'pokemon'
+    assert normalize('  Mr.  Mime! ') == 'mr mime'
+    assert normalize(None) == ''
+
+
+def test_prefix_ranks_whole_name_before_word_then_shorter_names(index):
+    assert index.search('char', 'prefix') == ['A1-033', 'A1-036', 'A3-036', 'A2-010']
+    assert index.search('mime', 'prefix') == ['A1-129']
+
+
+def test_substring_puts_name_starts_first_then_catalogue_order(index):
+    assert index.search('izard', 'substring') == ['A1-036', 'A2-010', 'A3-036']
+    assert index.search('charizard', 'substring') == ['A1-036', 'A3-036', 'A2-010']
+
+
+def test_queries_are_normalized_like_names(index):
+    assert index.search('POKEMON', 'substring') == ['P-007']
+    assert index.search('mr mime', 'substring') == ['A1-129']
+    assert index.search('  ', 'substring') == []
+
+
+def test_fuzzy_tolerates_typos_scaled_to_query_length(index):
+    assert index.search('charzard', 'fuzzy')[:3] == ['A1-036', 'A3-036', 'A2-010']
+    assert index.search('bulbasuar', 'fuzzy') == ['A1-001']
+    assert index.search('mme', 'fuzzy') == []  # three letters or fewer must match exactly
+
+
+def test_limit_and_unknown_mode(index):
+    assert index.search('char', 'prefix', limit=2) == ['A1-033', 'A1-036']
+    with pytest.raises(ValueError, match='match must be one of'):
+        index.search('char', 'regex')
+
+
+def test_suggest_fills_from_prefix_then_substring_then_fuzzy(index):
+    assert index.suggest('chari', limit=10) == [
+        ('A1-036', 'prefix'), ('A3-036', 'prefix'), ('A2-010', 'prefix'), ('A1-033', 'fuzzy')]
+    assert index.suggest('zard', limit=10) == [
+        ('A1-036', 'substring'), ('A2-010', 'substring'), ('A3-036', 'substring')]
+    assert index.suggest('charmandr', limit=10)[0] == ('A1-033', 'fuzzy')
+    assert len(index.suggest('char', limit=2)) == 2
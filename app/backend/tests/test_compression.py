@@ -0,0 +1,128 @@
+import gzip
+
+import pytest
+from flask import Flask, Response, request
+
+import compression
+from compression import Compress
+
+BODY = b'{"items":[' + b','.join(b'{"cardID":"A1-%03d"}' % i for i in range(200)) + b']}'
+
+
+def make_app(**config):
+    app = Flask(__name__)
+    app.config.update(config)
+    compress = Compress(app, policies={'cards': 'public, max-age=60'})
+
+    @app.get('/cards')
+    def cards():
+        response = Response(BODY, mimetype='application/json')
+        response.set_etag('v1')
+        return response.make_conditional(request)
+
+    @app.get('/private')
+    def private():
+        return Response(BODY, mimetype='application/json')
+
+    @app.get('/tiny')
+    def tiny():
+        return Response(b'{}', mimetype='application/json')
+
+    @app.get('/stream')
+    def stream():
+        return Response((BODY[i:i + 100] for i in range(0, len(BODY), 100)), mimetype='application/json')
+
+    return app, compress
+
+
+@pytest.fixture
+def gzip_only(monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', None)
+    return make_app()
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip', 'gzip'),
+    ('gzip;q=0.5, br', 'br'),
+    ('br;q=0.1, gzip;q=0.9', 'gzip'),
+    ('*', 'br'),
+    ('gzip;q=0, br;q=0', None),
+    ('identity', None),
+    ('', None),
+])
+def test_accept_encoding_honours_q_values(header, expected):
+    pytest.importorskip('brotli')
+    app, _ = make_app()
+    response = app.test_client().get('/cards', headers={'Accept-Encoding': header})
+    assert response.headers.get('Content-Encoding') == expected
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+
+def test_brotli_is_not_offered_without_the_package(gzip_only):
+    app, compress = gzip_only
+    assert compress.encodings == ['gzip']
+    response = app.test_client().get('/cards', headers={'Accept-Encoding': 'br'})
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_gzip_body_etag_and_cache_control(gzip_only):
+    app, _ = gzip_only
+    response = app.test_client().get('/cards', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Cache-Control'] == 'public, max-age=60'
+    assert response.headers['ETag'] == 'W/"v1"'
+    assert gzip.decompress(response.get_data()) == BODY
+
+
+def test_revalidation_still_matches_the_weak_etag(gzip_only):
+    app, _ = gzip_only
+    client = app.test_client()
+    response = client.get('/cards', headers={'Accept-Encoding': 'gzip', 'If-None-Match': 'W/"v1"'})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == 'W/"v1"'
+
+
+def test_small_bodies_are_left_alone(gzip_only):
+    app, _ = gzip_only
+    response = app.test_client().get('/tiny', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == b'{}'
+
+
+def test_streamed_bodies_are_compressed_per_chunk(gzip_only):
+    app, _ = gzip_only
+    response = app.test_client().get('/stream', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert gzip.decompress(response.get_data()) == BODY
+
+
+def test_only_public_responses_are_cached(gzip_only):
+    app, compress = gzip_only
+    client = app.test_client()
+    for _ in range(3):
+        client.get('/cards', headers={'Accept-Encoding': 'gzip'})
+        client.get('/private', headers={'Accept-Encoding': 'gzip'})
+    stats = compress.stats()
+    assert (stats['cache_entries'], stats['cache_misses'], stats['cache_hits']) == (1, 1, 2)
+
+
+def test_cache_evicts_least_recently_used(gzip_only):
+    _, compress = gzip_only
+    compress.cache_max_entries = 2
+    bodies = [BODY + bytes([i]) for i in range(3)]
+    with Flask(__name__).test_request_context():
+        compress._cached_compress(bodies[0], 'gzip', 'a')
+        compress._cached_compress(bodies[1], 'gzip', 'b')
+        compress._cached_compress(bodies[0], 'gzip', 'a')  # a is now the most recent
+        compress._cached_compress(bodies[2], 'gzip', 'c')
+    assert [key for key, _ in compress._cache] == ['a', 'c']
+    assert compress.stats()['cache_bytes'] == sum(len(v) for v in compress._cache.values())
+
+
+def test_cache_byte_budget(gzip_only):
+    _, compress = gzip_only
+    compress.cache_max_bytes = len(compress._compress(BODY, 'gzip')) + 10
+    compress._cached_compress(BODY, 'gzip', 'a')
+    compress._cached_compress(BODY + b' ', 'gzip', 'b')
+    assert [key for key, _ in compress._cache] == ['b']
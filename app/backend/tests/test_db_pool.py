@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import deque
+
+import pytest
+
+MySQLdb = pytest.importorskip('MySQLdb')
+
+from flask import Flask  # noqa: E402
+
+from db_pool import ConnectionPool, PooledMySQL, PoolTimeout  # noqa: E402
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.alive = True
+        self.closed = False
+        self.rollbacks = 0
+
+    def ping(self):
+        if not self.alive:
+            raise MySQLdb.OperationalError(2006, 'MySQL server has gone away')
+
+    def rollback(self):
+        if not self.alive:
+            raise MySQLdb.OperationalError(2006, 'MySQL server has gone away')
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_connect(monkeypatch):
+    opened = []
+
+    def connect(self):
+        conn = FakeConnection(len(opened) + 1)
+        opened.append(conn)
+        with self._cond:
+            self._created += 1
+        return conn
+
+    monkeypatch.setattr(ConnectionPool, '_connect', connect)
+    return opened
+
+
+def test_invalid_sizes_are_rejected():
+    with pytest.raises(ValueError):
+        ConnectionPool({}, min_size=3, max_size=2)
+    with pytest.raises(ValueError):
+        ConnectionPool({}, min_size=0, max_size=0)
+
+
+def test_connections_are_reused_most_recent_first(fake_connect):
+    pool = ConnectionPool({}, min_size=0, max_size=2)
+    a, b = pool.acquire(), pool.acquire()
+    pool.release(a)
+    pool.release(b)
+    assert pool.acquire() is b
+    assert len(fake_connect) == 2
+    assert a.rollbacks == 1
+
+
+def test_exhausted_pool_times_out():
+    pool = ConnectionPool({}, min_size=0, max_size=1, wait_timeout=0.05)
+    pool.acquire()
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout, match='max_size=1'):
+        pool.acquire()
+    assert time.monotonic() - started >= 0.05
+    stats = pool.stats()
+    assert (stats['size'], stats['in_use'], stats['wait_timeouts'], stats['waits']) == (1, 1, 1, 1)
+
+
+def test_waiter_gets_the_released_connection():
+    pool = ConnectionPool({}, min_size=0, max_size=1, wait_timeout=5)
+    conn = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    time.sleep(0.05)
+    pool.release(conn)
+    waiter.join(5)
+    assert got == [conn]
+    assert pool.stats()['size'] == 1
+
+
+def test_idle_connections_are_reaped_down_to_min_size(fake_connect):
+    pool = ConnectionPool({}, min_size=1, max_size=3, idle_timeout=60)
+    held = [pool.acquire() for _ in range(3)]
+    for conn in held:
+        pool.release(conn)
+    # Age every idle connection past idle_timeout
+    pool._idle = deque((conn, at - 120) for conn, at in pool._idle)
+
+    conn = pool.acquire()
+    assert conn is held[-1]
+    assert [c.closed for c in held] == [True, True, False]
+    assert pool.stats()['size'] == 1 and pool.stats()['discarded'] == 2
+
+
+def test_dead_connection_is_replaced_on_checkout(fake_connect):
+    pool = ConnectionPool({}, min_size=0, max_size=1)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.alive = False
+
+    fresh = pool.acquire()
+    assert fresh is not conn and conn.closed
+    assert pool.stats()['size'] == 1 and pool.stats()['discarded'] == 1
+
+
+def test_failed_rollback_discards_on_release():
+    pool = ConnectionPool({}, min_size=0, max_size=1)
+    conn = pool.acquire()
+    conn.alive = False
+    pool.release(conn)
+    assert conn.closed
+    assert pool.stats()['size'] == 0 and pool.stats()['idle'] == 0
+
+
+def test_failed_connect_frees_the_slot(monkeypatch):
+    pool = ConnectionPool({}, min_size=0, max_size=1)
+
+    def refuse(self):
+        raise MySQLdb.OperationalError(2003, "Can't connect")
+
+    monkeypatch.setattr(ConnectionPool, '_connect', refuse)
+    with pytest.raises(MySQLdb.OperationalError):
+        pool.acquire()
+    assert pool.stats()['size'] == 0 and pool.stats()['in_use'] == 0
+
+
+def test_request_connection_is_released_at_teardown(fake_connect):
+    app = Flask(__name__)
+    app.config['MYSQL_POOL_MAX_SIZE'] = 1
+    mysql = PooledMySQL(app)
+
+    with app.app_context():
+        mysql.rollback()  # nothing checked out yet: must not acquire
+        assert fake_connect == []
+        conn = mysql.connection
+        assert mysql.connection is conn
+        mysql.rollback()
+        assert conn.rollbacks == 1
+    assert mysql.pool.stats()['in_use'] == 0
+    assert conn.rollbacks == 2
@@ -0,0 +1,73 @@
+import json
+from datetime import datetime
+
+import pytest
+from werkzeug.datastructures import MIMEAccept, MultiDict
+from werkzeug.http import parse_accept_header
+
+MySQLdb = pytest.importorskip('MySQLdb')  # formats encodes JSON with streaming.dumps
+
+import formats  # noqa: E402
+from formats import ARROW, COLUMNAR, JSON, MSGPACK, NotAcceptable, encode, negotiate  # noqa: E402
+from reads import USER_COLUMNS  # noqa: E402
+
+ROWS = [(1, 'ash', datetime(2024, 1, 2, 3, 4, 5)), (2, 'misty', None)]
+
+
+def accept(header):
+    return parse_accept_header(header, MIMEAccept)
+
+
+def test_json_is_the_default():
+    assert negotiate(MultiDict(), accept('')) == JSON
+    assert negotiate(MultiDict(), accept('*/*')) == JSON
+    assert negotiate(MultiDict(), accept('text/html')) == JSON
+
+
+def test_accept_header_picks_the_best_available_format():
+    assert negotiate(MultiDict(), accept(COLUMNAR)) == COLUMNAR
+    assert negotiate(MultiDict(), accept(f'{JSON};q=0.5, {MSGPACK}')) == MSGPACK
+
+
+def test_format_argument_overrides_accept():
+    assert negotiate(MultiDict({'format': 'columnar'}), accept(MSGPACK)) == COLUMNAR
+    with pytest.raises(ValueError, match='format must be one of'):
+        negotiate(MultiDict({'format': 'xml'}), accept(''))
+
+
+def test_missing_optional_dependency(monkeypatch):
+    monkeypatch.setitem(formats._REQUIRES, MSGPACK, ('msgpack', None))
+    assert MSGPACK not in formats.available()
+    assert negotiate(MultiDict(), accept(MSGPACK)) == JSON
+    with pytest.raises(NotAcceptable, match='need the msgpack package'):
+        negotiate(MultiDict({'format': 'msgpack'}), accept(''))
+
+
+def test_columnar_json_applies_converters_and_field_order():
+    body = json.loads(encode(COLUMNAR, USER_COLUMNS, ROWS))
+    assert body == {'status': 'success', 'count': 2, 'columns': {
+        'userID': [1, 2], 'username': ['ash', 'misty'], 'dateJoined': ['2024-01-02 03:04:05', None]}}
+
+    body = json.loads(encode(COLUMNAR, USER_COLUMNS, ROWS, fields=['username', 'userID']))
+    assert list(body['columns']) == ['username', 'userID']
+
+
+def test_empty_result_keeps_every_column():
+    body = json.loads(encode(COLUMNAR, USER_COLUMNS, []))
+    assert body == {'status': 'success', 'count': 0,
+                    'columns': {'userID': [], 'username': [], 'dateJoined': []}}
+
+
+def test_msgpack_matches_columnar_json():
+    msgpack = pytest.importorskip('msgpack')
+    assert msgpack.unpackb(encode(MSGPACK, USER_COLUMNS, ROWS)) == json.loads(encode(COLUMNAR, USER_COLUMNS, ROWS))
+
+
+def test_arrow_keeps_native_types():
+    pyarrow = pytest.importorskip('pyarrow')
+    import pyarrow.ipc
+
+    table = pyarrow.ipc.open_stream(encode(ARROW, USER_COLUMNS, ROWS, fields=['userID', 'dateJoined'])).read_all()
+    assert table.column_names == ['userID', 'dateJoined']
+    assert pyarrow.types.is_timestamp(table.schema.field('dateJoined').type)
+    assert table.to_pydict() == {'userID': [1, 2], 'dateJoined': [datetime(2024, 1, 2, 3, 4, 5), None]}
@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import pytest
+
+from query_builder import FilteredQuery
+
+SQL_DIR = Path(__file__).resolve().parents[1] / 'sql'
+
+TEMPLATE = '''-- @filter rarity: c.rarity = :rarity
+-- @filter cardIds: c.cardID IN :cardIds
+SELECT c.cardID FROM Card c WHERE c.packName = :pack{filters}
+ORDER BY c.cardID{limit}'''
+
+
+@pytest.fixture
+def query():
+    return FilteredQuery.from_text('cards', TEMPLATE)
+
+
+def test_filter_lines_are_read_in_declaration_order(query):
+    assert query.filters == {'rarity': 'c.rarity = :rarity', 'cardIds': 'c.cardID IN :cardIds'}
+
+
+def test_template_without_marker_is_rejected():
+    with pytest.raises(ValueError, match='no {filters} marker'):
+        FilteredQuery('bad', 'SELECT 1', [])
+
+
+def test_no_filters_leaves_only_the_base_predicate(query):
+    stmt = query.variant_for({'pack': 'A1', 'rarity': None})
+    assert stmt.name == 'cards[all]'
+    assert stmt.render({'pack': 'A1'}) == (
+        'SELECT c.cardID FROM Card c WHERE c.packName = %s\nORDER BY c.cardID', ('A1',))
+
+
+def test_supplied_filters_become_predicates_in_declaration_order(query):
+    values = {'pack': 'A1', 'cardIds': ['A1-001', 'A1-002'], 'rarity': 'C'}
+    stmt = query.variant_for(values)
+    assert stmt.name == 'cards[rarity+cardIds]'
+    assert stmt.render(values) == (
+        'SELECT c.cardID FROM Card c WHERE c.packName = %s\n  AND c.rarity = %s'
+        '\n  AND c.cardID IN (%s, %s)\nORDER BY c.cardID',
+        ('A1', 'C', 'A1-001', 'A1-002'))
+
+
+def test_page_size_adds_limit(query):
+    values = {'pack': 'A1', 'pageSize': 51}
+    stmt = query.variant_for(values)
+    assert stmt.name == 'cards[all,paged]'
+    assert stmt.render(values) == (
+        'SELECT c.cardID FROM Card c WHERE c.packName = %s\nORDER BY c.cardID\nLIMIT %s', ('A1', 51))
+
+
+def test_each_combination_compiles_once(query):
+    first = query.variant_for({'rarity': 'C'})
+    assert query.variant(['rarity']) is first
+    assert query.variant(['rarity'], paged=True) is not first
+    assert query.variant_for({'rarity': 'RR', 'type': 'Fire'}) is first  # unknown keys are ignored
+
+
+def test_execute_runs_the_matching_variant(query):
+    class RecordingCursor:
+        def execute(self, sql, args):
+            self.executed = (sql, args)
+            return 0
+
+    cur = RecordingCursor()
+    query.execute(cur, {'pack': 'A1', 'rarity': 'C'})
+    assert cur.statement_name == 'cards[rarity]'
+    assert cur.executed[1] == ('A1', 'C')
+
+
+@pytest.mark.parametrize('name', ['get_collection', 'get_wishlist'])
+def test_shipped_templates_bind_each_value_once(name):
+    query = FilteredQuery.from_text(name, (SQL_DIR / f'{name}.sql').read_text(encoding='utf-8'))
+    assert list(query.filters) == ['rarity', 'type', 'packName', 'cardIds', 'afterRank']
+
+    plain = query.variant_for({'userId': 1})
+    assert plain.params == ('userId',)
+    assert ':' not in plain.sql and '{' not in plain.sql
+
+    paged = query.variant_for({'userId': 1, 'type': 'Fire', 'afterRank': 2, 'pageSize': 51})
+    assert paged.params == ('userId', 'type', 'afterRank', 'afterRank', 'afterName',
+                            'afterName', 'afterCardId', 'pageSize')
+    assert paged.sql.rstrip().endswith('LIMIT %s')
@@ -0,0 +1,89 @@
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from reads import (
+    CARD_FIELDS, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor, page_params,
+    parse_page_args, read_filtered,
+)
+
+
+def test_cursor_round_trips():
+    token = encode_cursor(3, 'Pokémon Center Lady', 'P-007')
+    assert '=' not in token
+    assert decode_cursor(token) == (3, 'Pokémon Center Lady', 'P-007')
+
+
+@pytest.mark.parametrize('token', [
+    'not base64!',
+    encode_cursor(1, 'x', 'y')[:-2],
+    'WzEsMl0',          # [1,2]
+    'WyIxIiwieCIsInkiXQ',  # ["1","x","y"]
+])
+def test_malformed_cursors_are_rejected(token):
+    with pytest.raises(ValueError, match='invalid cursor'):
+        decode_cursor(token)
+
+
+def test_page_args_default_to_unpaged():
+    assert parse_page_args(MultiDict(), CARD_FIELDS) == (None, None, None)
+
+
+def test_cursor_without_limit_uses_default_page_size():
+    token = encode_cursor(1, 'Bulbasaur', 'A1-001')
+    limit, after, fields = parse_page_args(MultiDict({'cursor': token, 'fields': 'cardID, name'}), CARD_FIELDS)
+    assert (limit, after, fields) == (DEFAULT_PAGE_SIZE, (1, 'Bulbasaur', 'A1-001'), ['cardID', 'name'])
+
+
+@pytest.mark.parametrize('args, message', [
+    ({'limit': 'ten'}, 'limit must be an integer'),
+    ({'limit': '0'}, 'limit must be between'),
+    ({'limit': str(MAX_PAGE_SIZE + 1)}, 'limit must be between'),
+    ({'cursor': 'bogus'}, 'invalid cursor'),
+    ({'fields': 'cardID,secret'}, 'unknown fields: secret'),
+])
+def test_bad_page_args(args, message):
+    with pytest.raises(ValueError, match=message):
+        parse_page_args(MultiDict(args), CARD_FIELDS)
+
+
+def test_page_params_fetch_one_extra_row():
+    assert page_params(2, None) == {'afterRank': None, 'afterName': None, 'afterCardId': None, 'pageSize': 3}
+    assert page_params(2, (1, 'a', 'b'))['afterCardId'] == 'b'
+
+
+class Query:
+    """Stands in for a FilteredQuery: records the values of the variant it is asked for."""
+
+    def variant_for(self, values):
+        self.values = values
+        return 'stmt'
+
+
+def drive(read, rows):
+    statement, values = next(read)
+    try:
+        read.send(rows)
+    except StopIteration as done:
+        return statement, values, done.value
+
+
+def test_read_filtered_returns_next_cursor_for_the_last_row_kept():
+    rows = [(f'A1-00{i}', f'Card {i}', 'A', 'C', 'Grass', 1, None, 1) for i in range(3)]
+    query = Query()
+    _, values, (items, next_cursor) = drive(
+        read_filtered(query, {'userId': 1}, lambda r: r[0], limit=2, after=(1, 'Card', 'A1-000')), rows)
+    assert values['pageSize'] == 3 and values['afterName'] == 'Card'
+    assert items == ['A1-000', 'A1-001']
+    assert decode_cursor(next_cursor) == (1, 'Card 1', 'A1-001')
+
+
+def test_read_filtered_last_page_has_no_cursor():
+    rows = [('A1-000', 'Card', 'A', 'C', 'Grass', 1, None, 1)]
+    _, _, (items, next_cursor) = drive(read_filtered(Query(), {'userId': 1}, lambda r: r[0], limit=2), rows)
+    assert items == ['A1-000'] and next_cursor is None
+
+
+def test_read_filtered_with_no_matching_card_ids_skips_the_query():
+    with pytest.raises(StopIteration) as done:
+        next(read_filtered(Query(), {'userId': 1, 'cardIds': []}, lambda r: r))
+    assert done.value.value == ([], None)
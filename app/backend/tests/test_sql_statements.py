@@ -0,0 +1,93 @@
+import pytest
+
+from sql_statements import compile_sql
+
+
+def test_named_parameters_become_positional():
+    stmt = compile_sql('q', 'SELECT * FROM Card WHERE cardID = :cardId AND rarity = :rarity;')
+    assert stmt.sql == 'SELECT * FROM Card WHERE cardID = %s AND rarity = %s'
+    assert stmt.params == ('cardId', 'rarity')
+    assert stmt.bind({'cardId': 'A1-001', 'rarity': 'C'}) == ('A1-001', 'C')
+
+
+def test_repeated_parameter_is_bound_each_time():
+    stmt = compile_sql('q', 'SELECT 1 WHERE a = :id OR b = :id')
+    assert stmt.render({'id': 7}) == ('SELECT 1 WHERE a = %s OR b = %s', (7, 7))
+
+
+def test_quoted_literals_are_copied_verbatim():
+    stmt = compile_sql('q', "SELECT ':notParam', \"50% off\", `a:b` FROM t WHERE x = :x")
+    assert stmt.params == ('x',)
+    assert stmt.sql == "SELECT ':notParam', \"50%% off\", `a:b` FROM t WHERE x = %s"
+
+
+def test_escaped_quotes_do_not_end_literals():
+    stmt = compile_sql('q', "SELECT 'it''s :a', 'it\\'s :b' FROM t WHERE x = :x")
+    assert stmt.params == ('x',)
+    assert stmt.sql == "SELECT 'it''s :a', 'it\\'s :b' FROM t WHERE x = %s"
+
+
+def test_percent_outside_literals_is_escaped():
+    stmt = compile_sql('q', 'SELECT quantity % 2 FROM Collection WHERE userID = :userId')
+    assert stmt.sql == 'SELECT quantity %% 2 FROM Collection WHERE userID = %s'
+
+
+def test_line_comments_are_dropped():
+    stmt = compile_sql('q', '-- owner :ignored 100%\nSELECT 1 # trailing :alsoIgnored\nWHERE a = :a -- last')
+    assert stmt.params == ('a',)
+    assert stmt.sql == 'SELECT 1 \nWHERE a = %s'
+
+
+def test_double_dash_without_space_is_not_a_comment():
+    stmt = compile_sql('q', 'SELECT 5--:a')
+    assert stmt.params == ('a',)
+    assert stmt.sql == 'SELECT 5--%s'
+
+
+def test_block_comments_are_dropped():
+    stmt = compile_sql('q', 'SELECT /* :ignored\n 100% */ a FROM t /* unterminated :b')
+    assert stmt.params == ()
+    assert stmt.sql == 'SELECT   a FROM t'
+
+
+def test_assignment_operator_is_not_a_parameter():
+    stmt = compile_sql('q', 'SET @n := :start')
+    assert stmt.params == ('start',)
+    assert stmt.sql == 'SET @n := %s'
+
+
+def test_one_element_list_expands_to_one_placeholder():
+    stmt = compile_sql('q', 'SELECT * FROM Trade WHERE tradeID IN :tradeIds AND status = :status')
+    assert stmt.render({'tradeIds': [5], 'status': 'pending'}) == (
+        'SELECT * FROM Trade WHERE tradeID IN (%s) AND status = %s', (5, 'pending'))
+
+
+def test_list_expands_to_placeholder_list():
+    stmt = compile_sql('q', 'DELETE FROM Collection WHERE (userID, cardID) IN :pairs')
+    assert stmt.render({'pairs': [(1, 'A1-001'), (2, 'A1-002')]}) == (
+        'DELETE FROM Collection WHERE (userID, cardID) IN (%s, %s)', ((1, 'A1-001'), (2, 'A1-002')))
+
+
+def test_empty_list_is_rejected():
+    stmt = compile_sql('q', 'SELECT * FROM Trade WHERE tradeID IN :tradeIds')
+    with pytest.raises(ValueError, match='list parameters cannot be empty'):
+        stmt.render({'tradeIds': []})
+
+
+def test_missing_parameter_is_reported_by_name():
+    stmt = compile_sql('get_trade', 'SELECT * FROM Trade WHERE tradeID = :tradeId AND status = :status')
+    with pytest.raises(ValueError, match='get_trade: missing value for :status'):
+        stmt.render({'tradeId': 1})
+
+
+def test_positional_statements_check_the_value_count():
+    stmt = compile_sql('q', 'SELECT * FROM Trade WHERE tradeID = %s')
+    assert stmt.positional == 1
+    assert stmt.render((3,)) == ('SELECT * FROM Trade WHERE tradeID = %s', (3,))
+    with pytest.raises(ValueError, match='expected 1 positional values, got 2'):
+        stmt.render((3, 4))
+
+
+def test_mixing_named_and_positional_is_rejected():
+    with pytest.raises(ValueError, match='mixes named and positional'):
+        compile_sql('q', 'SELECT * FROM t WHERE a = :a AND b = %s')
@@ -0,0 +1,155 @@
+from pathlib import Path
+
+import pytest
+
+MySQLdb = pytest.importorskip('MySQLdb')
+
+import trade_settlement  # noqa: E402
+from sql_statements import load_statements  # noqa: E402
+from trade_settlement import CollectionChanged, decline_trades, run_in_chunks, settle_trades  # noqa: E402
+
+STATEMENTS = load_statements(Path(__file__).resolve().parents[1] / 'sql', {
+    name: f'{name}.sql' for name in (
+        'lock_trade_legs', 'lock_trades', 'add_to_collection_batch', 'take_from_collection_batch',
+        'delete_collection_rows', 'remove_from_wishlist_batch', 'confirm_active_trade',
+        'decline_active_trade',
+    )
+})
+
+
+class ScriptedCursor:
+    """Answers each execute with the next (rows, rowcount) and records what ran."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.ran = []
+
+    def execute(self, sql, args=None):
+        self.ran.append((self.statement_name, args))
+        rows, count = self.responses.pop(0) if self.responses else ([], 0)
+        self._rows = rows
+        return count
+
+    def executemany(self, sql, rows):
+        self.ran.append((self.statement_name, rows))
+        return len(rows)
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+def leg(trade_id, from_user, to_user, card_id, quantity, initiator=1, recipient=2, created_by=1,
+        status='pending'):
+    return (trade_id, initiator, recipient, created_by, status, from_user, to_user, card_id, quantity)
+
+
+def test_swap_settles_with_netted_writes():
+    legs = [leg(1, 1, 2, 'x', 3), leg(1, 2, 1, 'y', 1)]
+    cur = ScriptedCursor((legs, 2), ([], 1), ([], 1), ([], 2), ([], 1))
+    assert settle_trades(cur, STATEMENTS, [1], 2) == {1: None}
+    ran = dict(cur.ran)
+    assert ran['add_to_collection_batch'] == [(2, 'x', 1), (1, 'y', 1)]
+    assert ran['take_from_collection_batch'] == (1, 1, (1, 'x'))  # :tradeIds twice, then :pairs
+    assert ran['delete_collection_rows'] == ((2, 'y'),)
+    assert ran['confirm_active_trade'] == (2, 1)
+
+
+def test_rejections_use_the_trigger_messages():
+    legs = [
+        leg(1, 1, 2, 'x', 1), leg(1, 2, 1, 'y', 1),
+        leg(2, 1, 2, 'x', 1), leg(2, 2, 1, 'z', 1),   # x was already given away by trade 1
+        leg(3, 2, 1, 'q', 1, created_by=2),
+        leg(4, 1, 2, 'w', 1, status='accepted'),
+    ]
+    cur = ScriptedCursor((legs, 6), ([], 2), ([], 2), ([], 1))
+    assert settle_trades(cur, STATEMENTS, [1, 2, 3, 4, 9], 2) == {
+        1: None,
+        2: 'Trade: initiator does not have required card at confirmation time',
+        3: 'Trade: creator cannot confirm their own trade',
+        4: 'trade is accepted',
+        9: 'trade not found',
+    }
+    assert settle_trades(ScriptedCursor(([leg(5, 1, 2, 'x', 2)], 1)), STATEMENTS, [5], 7) == {
+        5: 'Trade: confirmedBy must be one of the participants'}
+
+
+def test_vanished_collection_row_aborts_instead_of_inserting():
+    legs = [leg(1, 1, 2, 'x', 3), leg(1, 2, 1, 'y', 2)]
+    cur = ScriptedCursor((legs, 2), ([], 1))  # only one of the two sender rows changed
+    with pytest.raises(CollectionChanged, match='expected to decrement 2 Collection rows, changed 1'):
+        settle_trades(cur, STATEMENTS, [1], 2)
+
+
+def test_decline_requires_a_participant():
+    rows = [(1, 'pending', 1, 2), (2, 'pending', 3, 4), (3, 'declined', 1, 2)]
+    cur = ScriptedCursor((rows, 3), ([], 1))
+    assert decline_trades(cur, STATEMENTS, [1, 2, 3, 4], 1) == {
+        1: None,
+        2: 'Trade: declinedBy must be one of the participants',
+        3: 'trade is declined',
+        4: 'trade not found',
+    }
+    assert cur.ran[-1] == ('decline_active_trade', (1,))
+
+
+class ScriptedConnection:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return ScriptedCursor()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_chunks_run_in_ascending_order_and_commit_separately():
+    conn = ScriptedConnection()
+    seen = []
+
+    def apply(cur, chunk):
+        seen.append(chunk)
+        return {trade_id: None for trade_id in chunk}
+
+    results, retried = run_in_chunks(conn, [5, 1, 4, 2, 3, 1], apply, chunk_size=2)
+    assert seen == [[1, 2], [3, 4], [5]]
+    assert results == {1: None, 2: None, 3: None, 4: None, 5: None}
+    assert (conn.commits, retried) == (3, 0)
+
+
+def test_deadlocked_chunk_is_retried(monkeypatch):
+    monkeypatch.setattr(trade_settlement.time, 'sleep', lambda seconds: None)
+    conn = ScriptedConnection()
+    failures = [MySQLdb.OperationalError(1213, 'Deadlock found'), MySQLdb.OperationalError(1205, 'Lock wait')]
+
+    def apply(cur, chunk):
+        if failures:
+            raise failures.pop(0)
+        return {trade_id: None for trade_id in chunk}
+
+    results, retried = run_in_chunks(conn, [1, 2], apply, retries=3)
+    assert results == {1: None, 2: None}
+    assert (retried, conn.rollbacks, conn.commits) == (2, 2, 1)
+
+
+def test_exhausted_retries_and_other_errors_fail_only_their_chunk(monkeypatch):
+    monkeypatch.setattr(trade_settlement.time, 'sleep', lambda seconds: None)
+
+    def apply(cur, chunk):
+        if chunk == [1]:
+            raise MySQLdb.OperationalError(1213, 'Deadlock found')
+        if chunk == [2]:
+            raise ValueError('bad leg')
+        return {trade_id: None for trade_id in chunk}
+
+    results, retried = run_in_chunks(ScriptedConnection(), [1, 2, 3], apply, chunk_size=1, retries=2)
+    assert results[3] is None
+    assert 'Deadlock' in results[1] and results[2] == 'bad leg'
+    assert retried == 2
@@ -0,0 +1,85 @@
+import user_resolver
+from sql_statements import compile_sql
+from user_resolver import UserResolver
+
+RESOLVE = compile_sql('resolve_user_id', 'SELECT userID FROM User WHERE username = :username')
+
+
+class UserTable:
+    """Cursor answering RESOLVE from a dict, matching usernames case-insensitively like MySQL."""
+
+    def __init__(self, users):
+        self.users = {name.casefold(): user_id for name, user_id in users.items()}
+        self.queries = 0
+
+    def execute(self, sql, args):
+        self.queries += 1
+        user_id = self.users.get(args[0].casefold())
+        self._rows = [(user_id,)] if user_id is not None else []
+
+    def fetchall(self):
+        return self._rows
+
+
+def test_hits_skip_the_query():
+    cur = UserTable({'alice': 1})
+    resolver = UserResolver(RESOLVE)
+    assert resolver.resolve(cur, 'alice') == 1
+    assert resolver.resolve(cur, 'alice') == 1
+    assert cur.queries == 1
+    assert resolver.stats() == {'size': 1, 'max_size': 10000, 'hits': 1, 'misses': 1}
+
+
+def test_misses_are_not_cached():
+    cur = UserTable({})
+    resolver = UserResolver(RESOLVE)
+    assert resolver.resolve(cur, 'bob') is None
+    cur.users['bob'] = 2
+    assert resolver.resolve(cur, 'bob') == 2
+
+
+def test_usernames_share_one_entry_regardless_of_case():
+    cur = UserTable({'Alice': 1})
+    resolver = UserResolver(RESOLVE)
+    assert resolver.resolve(cur, 'Alice') == 1
+    assert resolver.resolve(cur, 'alice') == 1
+    assert resolver.resolve(cur, 'ALICE') == 1
+    assert cur.queries == 1
+    resolver.invalidate('aLiCe')
+    assert resolver.stats()['size'] == 0
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(user_resolver.time, 'monotonic', lambda: clock[0])
+    cur = UserTable({'alice': 1})
+    resolver = UserResolver(RESOLVE, ttl=5)
+    resolver.resolve(cur, 'alice')
+    clock[0] += 4
+    resolver.resolve(cur, 'alice')
+    assert cur.queries == 1
+    clock[0] += 2
+    resolver.resolve(cur, 'alice')
+    assert cur.queries == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cur = UserTable({'a': 1, 'b': 2, 'c': 3})
+    resolver = UserResolver(RESOLVE, max_size=2)
+    resolver.resolve(cur, 'a')
+    resolver.resolve(cur, 'b')
+    resolver.resolve(cur, 'a')  # a is now the most recently used
+    resolver.resolve(cur, 'c')  # evicts b
+    queries = cur.queries
+    resolver.resolve(cur, 'a')
+    assert cur.queries == queries
+    resolver.resolve(cur, 'b')
+    assert cur.queries == queries + 1
+
+
+def test_zero_size_or_ttl_disables_caching():
+    for resolver in (UserResolver(RESOLVE, max_size=0), UserResolver(RESOLVE, ttl=0)):
+        cur = UserTable({'alice': 1})
+        resolver.resolve(cur, 'alice')
+        resolver.resolve(cur, 'alice')
+        assert cur.queries == 2
@@ -0,0 +1,193 @@
+"""Set-based settlement of confirmed trades (the card swaps behind /api/active-trades/confirm).
+
+`settle_trades(cur, statements, trade_ids, confirmed_by)` settles any number of pending
+trades inside the caller's transaction, with a fixed number of statements per call:
+
+1. lock_trade_legs.sql reads every leg (Tradecard row) of every trade together with the
+   sender's quantity, locking them in tradeID order.
+2. Each trade is checked here, with the same rules and messages the Trade trigger used to
+   apply: still pending, confirmed by a participant who did not create it, and every sender
+   still holding the card. Copies already given away earlier in the batch count as gone.
+3. The legs of the trades that pass are netted per (user, card) and applied with a
+   multi-row upsert for receivers (add_to_collection_batch.sql), one UPDATE ... JOIN for
+   senders that keep copies (take_from_collection_batch.sql) and multi-row deletes for
+   emptied Collection rows and received Wishlist cards. The sender writes must touch
+   exactly the rows locked in step 1; otherwise `CollectionChanged` is raised and the
+   caller rolls back.
+4. confirm_active_trade.sql marks them accepted.
+
+Legs are handled individually, so trades with several cards per side settle the same way.
+
+`decline_trades` is the matching routine for declines, and `run_in_chunks` applies either one
+to a long list of trades in short transactions, retrying chunks that hit a deadlock.
+"""
+import random
+import time
+import traceback
+from collections import defaultdict
+
+import MySQLdb
+
+NOT_FOUND = 'trade not found'
+# ER_LOCK_DEADLOCK and ER_LOCK_WAIT_TIMEOUT: the chunk is rolled back and can simply run again
+RETRYABLE_ERRORS = (1213, 1205)
+
+
+class CollectionChanged(Exception):
+    """Raised when a sender's Collection rows no longer match what lock_trade_legs.sql read."""
+
+
+def _check(trade, confirmed_by, available):
+    """Return the reason `trade` cannot settle, or None (reserving its cards in `available`)."""
+    if trade['status'] != 'pending':
+        return f"trade is {trade['status']}"
+    if confirmed_by not in (trade['initiatorID'], trade['recipientID']):
+        return 'Trade: confirmedBy must be one of the participants'
+    if confirmed_by == trade['createdBy']:
+        return 'Trade: creator cannot confirm their own trade'
+    given = defaultdict(int)
+    for leg in trade['legs']:
+        given[(leg['fromUserID'], leg['cardID'])] += 1
+    for (user_id, card_id), count in given.items():
+        if available.get((user_id, card_id), 0) < count:
+            side = 'initiator' if user_id == trade['initiatorID'] else 'recipient'
+            return f'Trade: {side} does not have required card at confirmation time'
+    for key, count in given.items():
+        available[key] -= count
+    return None
+
+
+def settle_trades(cur, statements, trade_ids, confirmed_by):
+    """Settle the pending trades in `trade_ids` as confirmed by `confirmed_by`.
+
+    Runs in the caller's transaction; the caller commits. Returns {tradeID: None when
+    settled, else the reason it was not}, for every ID in `trade_ids`.
+    """
+    trade_ids = list(dict.fromkeys(trade_ids))
+    if not trade_ids:
+        return {}
+    statements['lock_trade_legs'].execute(cur, {'tradeIds': trade_ids})
+    trades = {}
+    available = {}  # (userID, cardID) -> copies not yet given away in this batch
+    for (trade_id, initiator_id, recipient_id, created_by, status,
+         from_user, to_user, card_id, quantity) in cur.fetchall():
+        trade = trades.setdefault(trade_id, {
+            'initiatorID': initiator_id, 'recipientID': recipient_id, 'createdBy': created_by,
+            'status': status, 'legs': [],
+        })
+        trade['legs'].append({'fromUserID': from_user, 'toUserID': to_user, 'cardID': card_id})
+        available.setdefault((from_user, card_id), int(quantity or 0))
+
+    held = dict(available)  # quantities as locked, before this batch
+    results = {}
+    settled = []
+    delta = defaultdict(int)  # (userID, cardID) -> net change in copies
+    received = set()
+    for trade_id in trade_ids:
+        trade = trades.get(trade_id)
+        reason = _check(trade, confirmed_by, available) if trade else NOT_FOUND
+        results[trade_id] = reason
+        if reason is not None:
+            continue
+        settled.append(trade_id)
+        for leg in trade['legs']:
+            delta[(leg['fromUserID'], leg['cardID'])] -= 1
+            delta[(leg['toUserID'], leg['cardID'])] += 1
+            received.add((leg['toUserID'], leg['cardID']))
+    if not settled:
+        return results
+
+    gains, takes, emptied = [], [], []
+    for (user_id, card_id), change in delta.items():
+        if change > 0:
+            gains.append({'userId': user_id, 'cardId': card_id, 'quantity': change})
+        elif change < 0:
+            if held[(user_id, card_id)] + change == 0:
+                emptied.append((user_id, card_id))
+            else:
+                takes.append((user_id, card_id))
+    if gains:
+        statements['add_to_collection_batch'].executemany(cur, gains)
+    if takes:
+        changed = statements['take_from_collection_batch'].execute(
+            cur, {'tradeIds': settled, 'pairs': takes})
+        if changed != len(takes):
+            raise CollectionChanged(f'expected to decrement {len(takes)} Collection rows, changed {changed}')
+    if emptied:
+        deleted = statements['delete_collection_rows'].execute(cur, {'pairs': emptied})
+        if deleted != len(emptied):
+            raise CollectionChanged(f'expected to delete {len(emptied)} Collection rows, deleted {deleted}')
+    statements['remove_from_wishlist_batch'].execute(cur, {'pairs': sorted(received)})
+    statements['confirm_active_trade'].execute(
+        cur, {'confirmedBy': confirmed_by, 'tradeIds': settled})
+    return results
+
+
+def decline_trades(cur, statements, trade_ids, declined_by):
+    """Decline, as `declined_by`, the pending trades in `trade_ids` that user takes part in.
+
+    Same transaction and return shape as settle_trades.
+    """
+    trade_ids = list(dict.fromkeys(trade_ids))
+    if not trade_ids:
+        return {}
+    statements['lock_trades'].execute(cur, {'tradeIds': trade_ids})
+    trades = {trade_id: (status, initiator_id, recipient_id)
+              for trade_id, status, initiator_id, recipient_id in cur.fetchall()}
+    results = {}
+    for trade_id in trade_ids:
+        if trade_id not in trades:
+            results[trade_id] = NOT_FOUND
+            continue
+        status, initiator_id, recipient_id = trades[trade_id]
+        if declined_by not in (initiator_id, recipient_id):
+            results[trade_id] = 'Trade: declinedBy must be one of the participants'
+        elif status != 'pending':
+            results[trade_id] = f'trade is {status}'
+        else:
+            results[trade_id] = None
+    pending = [trade_id for trade_id, reason in results.items() if reason is None]
+    if pending:
+        statements['decline_active_trade'].execute(cur, {'tradeIds': pending})
+    return results
+
+
+def run_in_chunks(conn, trade_ids, apply, chunk_size=50, retries=3):
+    """Run `apply(cur, chunk)` over `trade_ids`, committing after every `chunk_size` trades.
+
+    IDs are processed in ascending order, so concurrent batches lock trades in the same order.
+    A chunk that fails with a deadlock or lock wait timeout is rolled back and retried up to
+    `retries` times with jittered backoff. A chunk that still fails (or fails with any other
+    error) reports the error for each of its trades while the remaining chunks carry on.
+
+    Returns ({tradeID: None or reason}, number of retries).
+    """
+    ordered = sorted(set(trade_ids))
+    results = {}
+    retried = 0
+    for start in range(0, len(ordered), chunk_size):
+        chunk = ordered[start:start + chunk_size]
+        for attempt in range(retries + 1):
+            cur = conn.cursor()
+            try:
+                outcome = apply(cur, chunk)
+                conn.commit()
+                break
+            except MySQLdb.OperationalError as e:
+                conn.rollback()
+                if e.args and e.args[0] in RETRYABLE_ERRORS and attempt < retries:
+                    retried += 1
+                    time.sleep(0.02 * (2 ** attempt) * (1 + random.random()))
+                    continue
+                traceback.print_exc()
+                outcome = {trade_id: str(e) for trade_id in chunk}
+                break
+            except Exception as e:
+                conn.rollback()
+                traceback.print_exc()
+                outcome = {trade_id: str(e) for trade_id in chunk}
+                break
+            finally:
+                cur.close()
+        results.update(outcome)
+    return results, retried
@@ -0,0 +1,70 @@
+"""Shared username -> userID lookup for the handlers that accept `username`.
+
+Usernames are unique and never change, so the mapping is kept in an in-process LRU with
+a TTL and most requests skip the extra `SELECT userID FROM User` round trip. Misses are
+not cached, so a freshly signed-up user resolves immediately on every worker. MySQL
+compares usernames case-insensitively, so entries are keyed by the casefolded name.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sql_statements import run
+
+
+class UserResolver:
+    """LRU + TTL cache in front of the `resolve_user_id` statement."""
+
+    def __init__(self, statement, max_size=10000, ttl=300.0):
+        self.statement = statement
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # casefolded username -> (userID, expires_at), oldest first
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def lookup(self, username):
+        """Read generator (see sql_statements.run) returning the userID, or None if unknown."""
+        key = username.casefold()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+
+        rows = yield self.statement, {'username': username}
+        if not rows:
+            return None
+        user_id = rows[0][0]
+        if self.max_size > 0 and self.ttl > 0:
+            with self._lock:
+                self._entries[key] = (user_id, now + self.ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return user_id
+
+    def resolve(self, cur, username):
+        """Return the userID for `username`, or None if no such user exists."""
+        return run(cur, self.lookup(username))
+
+    def invalidate(self, username=None):
+        """Forget one username, or everything when `username` is None."""
+        with self._lock:
+            if username is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(username.casefold(), None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self._hits,
+                'misses': self._misses,
+            }
@@ -1,57 +1,120 @@
--- Triggers to validate and perform confirmation swaps
+-- Triggers that validate trade confirmations and keep the derived tables up to date
 -- Created as a separate migration so the Docker init process can run it.
 
 DELIMITER $$
 
+-- TradeOpportunity has one maintenance path: these two procedures recompute every row for
+-- one (user, card) from the current Collection and Wishlist, so they are idempotent and can
+-- run again at any time. Both are set-based: one INSERT IGNORE or DELETE per call, whatever
+-- the number of matching users. A popular card can fan out to thousands of rows, so the
+-- triggers below only queue a TradeOpportunityOutbox entry and backend/opportunity_worker.py
+-- calls the procedure later, in its own short transaction.
+
+-- Opportunities offered by p_owner for p_card: one per wisher while p_owner holds a duplicate
+DROP PROCEDURE IF EXISTS refresh_owner_opportunities$$
+CREATE PROCEDURE refresh_owner_opportunities(IN p_owner INT, IN p_card VARCHAR(50))
+BEGIN
+    IF EXISTS (SELECT 1 FROM Collection
+               WHERE userID = p_owner AND cardID = p_card AND quantity >= 2) THEN
+        INSERT IGNORE INTO TradeOpportunity (ownerID, targetID, cardID)
+        SELECT p_owner, w.userID, p_card
+        FROM Wishlist w
+        WHERE w.cardID = p_card
+            AND w.userID <> p_owner;
+    ELSE
+        DELETE FROM TradeOpportunity
+        WHERE ownerID = p_owner AND cardID = p_card;
+    END IF;
+END$$
+
+-- Opportunities offered to p_target for p_card: one per duplicate holder while it is wished
+DROP PROCEDURE IF EXISTS refresh_target_opportunities$$
+CREATE PROCEDURE refresh_target_opportunities(IN p_target INT, IN p_card VARCHAR(50))
+BEGIN
+    IF EXISTS (SELECT 1 FROM Wishlist WHERE userID = p_target AND cardID = p_card) THEN
+        INSERT IGNORE INTO TradeOpportunity (ownerID, targetID, cardID)
+        SELECT col.userID, p_target, p_card
+        FROM Collection col
+        WHERE col.cardID = p_card
+            AND col.quantity >= 2
+            AND col.userID <> p_target;
+    ELSE
+        DELETE FROM TradeOpportunity
+        WHERE targetID = p_target AND cardID = p_card;
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS trg_collection_after_insert$$
 CREATE TRIGGER trg_collection_after_insert
 AFTER INSERT ON Collection
 FOR EACH ROW
 BEGIN
+    INSERT INTO CardMarketStats (cardID, demand, supply) VALUES (NEW.cardID, 0, 1)
+        ON DUPLICATE KEY UPDATE supply = supply + 1;
+
     IF NEW.quantity >= 2 THEN
-        INSERT IGNORE INTO TradeOpportunity (ownerID, targetID, cardID)
-        SELECT NEW.userID, w.userID, NEW.cardID
-        FROM Wishlist w
-        WHERE w.cardID = NEW.cardID
-            AND w.userID <> NEW.userID;
+        INSERT INTO TradeOpportunityOutbox (kind, userID, cardID) VALUES ('owner', NEW.userID, NEW.cardID);
     END IF;
 END$$
 
+-- The only AFTER UPDATE trigger on Collection. Quantities never reach 0 through an UPDATE:
+-- decrements use `quantity - 1 ... WHERE quantity > 1` and delete the last copy instead
+-- (backend/sql/decrement_collection.sql; trade_settlement.py does the same for trades), so
+-- no cleanup trigger is needed.
+DROP TRIGGER IF EXISTS trg_collection_after_update$$
 CREATE TRIGGER trg_collection_after_update
 AFTER UPDATE ON Collection
 FOR EACH ROW
 BEGIN
-    IF OLD.quantity < 2 AND NEW.quantity >= 2 THEN
-        INSERT IGNORE INTO TradeOpportunity (ownerID, targetID, cardID)
-        SELECT NEW.userID, w.userID, NEW.cardID
-        FROM Wishlist w
-        WHERE w.cardID = NEW.cardID
-            AND w.userID <> NEW.userID;
+    -- Only crossing the duplicate threshold (either way) changes the owner's opportunities
+    IF (OLD.quantity >= 2) <> (NEW.quantity >= 2) THEN
+        INSERT INTO TradeOpportunityOutbox (kind, userID, cardID) VALUES ('owner', NEW.userID, NEW.cardID);
     END IF;
+END$$
 
-    IF NEW.quantity < 2 THEN
-        DELETE FROM TradeOpportunity
-        WHERE ownerID = NEW.userID AND cardID = NEW.cardID;
+DROP TRIGGER IF EXISTS trg_collection_after_delete$$
+CREATE TRIGGER trg_collection_after_delete
+AFTER DELETE ON Collection
+FOR EACH ROW
+BEGIN
+    UPDATE CardMarketStats SET supply = supply - 1
+    WHERE cardID = OLD.cardID AND supply > 0;
+
+    IF OLD.quantity >= 2 THEN
+        INSERT INTO TradeOpportunityOutbox (kind, userID, cardID) VALUES ('owner', OLD.userID, OLD.cardID);
     END IF;
 END$$
 
+DROP TRIGGER IF EXISTS trg_wishlist_after_insert$$
+CREATE TRIGGER trg_wishlist_after_insert
+AFTER INSERT ON Wishlist
+FOR EACH ROW
+BEGIN
+    INSERT INTO CardMarketStats (cardID, demand, supply) VALUES (NEW.cardID, 1, 0)
+        ON DUPLICATE KEY UPDATE demand = demand + 1;
+
+    INSERT INTO TradeOpportunityOutbox (kind, userID, cardID) VALUES ('target', NEW.userID, NEW.cardID);
+END$$
+
+DROP TRIGGER IF EXISTS trg_wishlist_after_delete$$
 CREATE TRIGGER trg_wishlist_after_delete
 AFTER DELETE ON Wishlist
 FOR EACH ROW
 BEGIN
-    DELETE FROM TradeOpportunity
-    WHERE targetID = OLD.userID AND cardID = OLD.cardID;
+    INSERT INTO TradeOpportunityOutbox (kind, userID, cardID) VALUES ('target', OLD.userID, OLD.cardID);
+
+    UPDATE CardMarketStats SET demand = demand - 1
+    WHERE cardID = OLD.cardID AND demand > 0;
 END$$
 
+-- Card ownership and the swap itself are handled by backend/trade_settlement.py, which locks
+-- and checks every leg in one query and applies all swaps set-based. This trigger keeps only
+-- the row-local checks, as a guard for updates made outside the backend.
 DROP TRIGGER IF EXISTS trg_trade_before_update$$
 CREATE TRIGGER trg_trade_before_update
 BEFORE UPDATE ON Trade
 FOR EACH ROW
 BEGIN
-    DECLARE cnt1 INT DEFAULT 0;
-    DECLARE cnt2 INT DEFAULT 0;
-    DECLARE v_card1 VARCHAR(50);
-    DECLARE v_card2 VARCHAR(50);
-
     -- Only validate transitions to accepted
     IF OLD.status = 'pending' AND NEW.status = 'accepted' THEN
         -- confirmedBy must be provided and must be one of the participants
@@ -66,54 +129,11 @@ BEGIN
         IF NEW.confirmedBy = OLD.createdBy THEN
             SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Trade: creator cannot confirm their own trade';
         END IF;
-
-        -- Get representative cards (single-card-per-side assumption)
-        SELECT tc.cardID INTO v_card1 FROM Tradecard tc WHERE tc.tradeID = OLD.tradeID AND tc.fromUserID = OLD.initiatorID LIMIT 1;
-        SELECT tc.cardID INTO v_card2 FROM Tradecard tc WHERE tc.tradeID = OLD.tradeID AND tc.fromUserID = OLD.recipientID LIMIT 1;
-
-        -- Check user ownership
-        SELECT COUNT(*) INTO cnt1 FROM Collection WHERE userID = OLD.initiatorID AND cardID = v_card1 AND quantity >= 1;
-        SELECT COUNT(*) INTO cnt2 FROM Collection WHERE userID = OLD.recipientID AND cardID = v_card2 AND quantity >= 1;
-        IF cnt1 = 0 THEN
-            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Trade: initiator does not have required card at confirmation time';
-        END IF;
-        IF cnt2 = 0 THEN
-            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Trade: recipient does not have required card at confirmation time';
-        END IF;
     END IF;
 END$$
 
+-- The per-row swap moved to backend/trade_settlement.py; dropped so existing databases lose it too
 DROP TRIGGER IF EXISTS trg_trade_after_update$$
-CREATE TRIGGER trg_trade_after_update
-AFTER UPDATE ON Trade
-FOR EACH ROW
-BEGIN
-    DECLARE v_card1 VARCHAR(50);
-    DECLARE v_card2 VARCHAR(50);
-
-    IF OLD.status = 'pending' AND NEW.status = 'accepted' THEN
-        -- fetch the one card IDs per participant
-        SELECT tc.cardID INTO v_card1 FROM Tradecard tc WHERE tc.tradeID = NEW.tradeID AND tc.fromUserID = NEW.initiatorID LIMIT 1;
-        SELECT tc.cardID INTO v_card2 FROM Tradecard tc WHERE tc.tradeID = NEW.tradeID AND tc.fromUserID = NEW.recipientID LIMIT 1;
-
-        -- decrement initiator's card
-        UPDATE Collection SET quantity = quantity - 1 WHERE userID = NEW.initiatorID AND cardID = v_card1;
-        -- increment/add to recipient
-        INSERT INTO Collection (userID, cardID, quantity) VALUES (NEW.recipientID, v_card1, 1)
-            ON DUPLICATE KEY UPDATE quantity = quantity + 1;
-
-        -- decrement recipient's card
-        UPDATE Collection SET quantity = quantity - 1 WHERE userID = NEW.recipientID AND cardID = v_card2;
-        -- increment/add to initiator
-        INSERT INTO Collection (userID, cardID, quantity) VALUES (NEW.initiatorID, v_card2, 1)
-            ON DUPLICATE KEY UPDATE quantity = quantity + 1;
-
-        -- Remove received cards from wishlists
-        DELETE FROM Wishlist WHERE userID = NEW.recipientID AND cardID = v_card1;
-        DELETE FROM Wishlist WHERE userID = NEW.initiatorID AND cardID = v_card2;
-
-    END IF;
-END$$
 
 DROP TRIGGER IF EXISTS trg_trade_before_insert$$
 CREATE TRIGGER trg_trade_before_insert
@@ -123,14 +143,33 @@ BEGIN
     SET NEW.status = 'pending';
 END$$
 
+-- Replaced by the decrement-or-delete statements; dropped so existing databases lose it too
 DROP TRIGGER IF EXISTS trg_collection_delete_empty$$
-CREATE TRIGGER trg_collection_delete_empty
-AFTER UPDATE ON Collection
+
+-- Any change to the card catalogue invalidates the backend's cached /api/cards response
+DROP TRIGGER IF EXISTS trg_card_after_insert$$
+CREATE TRIGGER trg_card_after_insert
+AFTER INSERT ON Card
 FOR EACH ROW
 BEGIN
-    IF NEW.quantity <= 0 THEN
-        DELETE FROM Collection WHERE userID = NEW.userID AND cardID = NEW.cardID;
-    END IF;
+    UPDATE CatalogVersion SET version = version + 1 WHERE name = 'Card';
+    INSERT IGNORE INTO CardMarketStats (cardID) VALUES (NEW.cardID);
+END$$
+
+DROP TRIGGER IF EXISTS trg_card_after_update$$
+CREATE TRIGGER trg_card_after_update
+AFTER UPDATE ON Card
+FOR EACH ROW
+BEGIN
+    UPDATE CatalogVersion SET version = version + 1 WHERE name = 'Card';
+END$$
+
+DROP TRIGGER IF EXISTS trg_card_after_delete$$
+CREATE TRIGGER trg_card_after_delete
+AFTER DELETE ON Card
+FOR EACH ROW
+BEGIN
+    UPDATE CatalogVersion SET version = version + 1 WHERE name = 'Card';
 END$$
 
 DELIMITER ;
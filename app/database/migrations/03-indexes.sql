@@ -9,12 +9,18 @@ CREATE INDEX idx_wishlist_card_user ON Wishlist(cardID, userID);
 -- Trade: filter by status and lookup trades for a user
 CREATE INDEX idx_trade_status ON Trade(status);
 CREATE INDEX idx_trade_initiator_recipient ON Trade(initiatorID, recipientID);
+CREATE INDEX idx_trade_recipient ON Trade(recipientID);
 
 -- Tradecard: joins from Trade -> Tradecard and lookups by fromUser
 CREATE INDEX idx_tradecard_tradeID ON Tradecard(tradeID);
+-- Covers the per-trade leg lookups (both sides of a trade in one index range)
+CREATE INDEX idx_tradecard_trade_from_card ON Tradecard(tradeID, fromUserID, cardID);
 CREATE INDEX idx_tradecard_fromUserID ON Tradecard(fromUserID);
 CREATE INDEX idx_tradecard_toUserID ON Tradecard(toUserID);
 CREATE INDEX idx_tradecard_cardID ON Tradecard(cardID);
 
--- TradeOpportunity: fast lookup of opportunities for a target user
-CREATE INDEX idx_tradeopportunity_target ON TradeOpportunity(targetID);
\ No newline at end of file
+-- TradeOpportunity: a target user's opportunities, newest first. With the primary key
+-- appended (ownerID, cardID) it covers every TradeOpportunity column get_trade_opportunities.sql reads
+CREATE INDEX idx_tradeopportunity_target_created ON TradeOpportunity(targetID, createdAt);
+-- Card: filtered collection/wishlist browsing (rarity, then type/pack, in name order)
+CREATE INDEX idx_card_rarity_type_pack_name ON Card(rarity, type, packName, name);
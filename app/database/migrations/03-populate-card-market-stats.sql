@@ -0,0 +1,12 @@
+-- Rebuild CardMarketStats from Wishlist and Collection
+-- Runs once on first init (after the seed data) and can be re-run at any time to repair
+-- drift, e.g. after bulk-loading rows with the triggers disabled:
+--   docker compose exec backend flask --app app rebuild-market-stats
+-- demand = users wishing for the card, supply = users holding it (one row each by PK).
+
+INSERT INTO CardMarketStats (cardID, demand, supply)
+SELECT c.cardID, COALESCE(w.demand, 0), COALESCE(col.supply, 0)
+FROM Card c
+LEFT JOIN (SELECT cardID, COUNT(*) AS demand FROM Wishlist GROUP BY cardID) w ON w.cardID = c.cardID
+LEFT JOIN (SELECT cardID, COUNT(*) AS supply FROM Collection GROUP BY cardID) col ON col.cardID = c.cardID
+ON DUPLICATE KEY UPDATE demand = VALUES(demand), supply = VALUES(supply);
@@ -1,10 +1,12 @@
 -- One-time population of TradeOpportunity from existing Collection and Wishlist
--- Inserts rows for owners who have quantity > 2 and targets who have the card on their wishlist.
--- Safe to run multiple times because it uses INSERT IGNORE.
+-- Inserts rows for owners who have a duplicate (quantity >= 2, the same threshold as the
+-- triggers) and targets who have the card on their wishlist.
+-- Safe to run multiple times: the primary key makes INSERT IGNORE skip existing rows.
+-- To also remove stale rows, run `flask --app app reconcile-trade-opportunities`.
 
 INSERT IGNORE INTO TradeOpportunity (ownerID, targetID, cardID)
 SELECT col.userID AS ownerID, w.userID AS targetID, col.cardID
 FROM Collection col
 JOIN Wishlist w ON w.cardID = col.cardID
-WHERE col.quantity > 2
+WHERE col.quantity >= 2
   AND w.userID <> col.userID;
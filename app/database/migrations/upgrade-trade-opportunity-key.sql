@@ -0,0 +1,33 @@
+-- Upgrade an existing database to the keyed TradeOpportunity table (fresh volumes get it
+-- from schema.sql and do not need this). Run it once, then re-run 02-triggers.sql and
+-- `flask --app app reconcile-trade-opportunities` (see database/README.md).
+
+-- Keep the oldest row of each (owner, card, target) and drop the duplicates
+CREATE TEMPORARY TABLE TradeOpportunityKeep (id INT PRIMARY KEY)
+SELECT MIN(id) AS id FROM TradeOpportunity GROUP BY ownerID, cardID, targetID;
+
+DELETE t FROM TradeOpportunity t
+LEFT JOIN TradeOpportunityKeep k ON k.id = t.id
+WHERE k.id IS NULL;
+
+DROP TEMPORARY TABLE TradeOpportunityKeep;
+
+-- Replace the surrogate id with the natural key and add the (targetID, createdAt) index
+ALTER TABLE TradeOpportunity
+  DROP COLUMN id,
+  ADD PRIMARY KEY (ownerID, cardID, targetID),
+  ADD INDEX idx_tradeopportunity_target_created (targetID, createdAt);
+
+-- The old single-column targetID index is now redundant; not every database has it
+SET @drop_target_index = (
+  SELECT IF(COUNT(*) > 0,
+            'ALTER TABLE TradeOpportunity DROP INDEX idx_tradeopportunity_target',
+            'DO 0')
+  FROM information_schema.statistics
+  WHERE table_schema = DATABASE()
+    AND table_name = 'TradeOpportunity'
+    AND index_name = 'idx_tradeopportunity_target'
+);
+PREPARE drop_target_index FROM @drop_target_index;
+EXECUTE drop_target_index;
+DEALLOCATE PREPARE drop_target_index;
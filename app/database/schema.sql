@@ -73,38 +73,76 @@ CREATE TABLE IF NOT EXISTS `Tradecard` (
 );
 
 -- TradeOpportunity read-model
+-- One row per (owner, card, target): the owner holds a duplicate (quantity >= 2) of a card
+-- on the target's wishlist. Maintained by the procedures in migrations/02-triggers.sql,
+-- which backend/opportunity_worker.py runs for each TradeOpportunityOutbox entry.
 CREATE TABLE IF NOT EXISTS `TradeOpportunity` (
-  id INT AUTO_INCREMENT PRIMARY KEY,
   ownerID INT NOT NULL,
   targetID INT NOT NULL,
   cardID VARCHAR(50) NOT NULL,
   createdAt DATETIME DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (ownerID, cardID, targetID),
   FOREIGN KEY (ownerID) REFERENCES User(userID) ON DELETE CASCADE,
   FOREIGN KEY (targetID) REFERENCES User(userID) ON DELETE CASCADE,
   FOREIGN KEY (cardID) REFERENCES Card(cardID) ON DELETE CASCADE
 );
 
+-- Pending TradeOpportunity refreshes: the Collection and Wishlist triggers append one row per
+-- change and backend/opportunity_worker.py applies them in batches, outside user transactions
+CREATE TABLE IF NOT EXISTS `TradeOpportunityOutbox` (
+  id BIGINT AUTO_INCREMENT PRIMARY KEY,
+  kind ENUM('owner', 'target') NOT NULL,
+  userID INT NOT NULL,
+  cardID VARCHAR(50) NOT NULL,
+  createdAt DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3)
+);
+
+-- Catalogue versions: bumped by the Card triggers so the backend can cache /api/cards
+CREATE TABLE IF NOT EXISTS `CatalogVersion` (
+  name VARCHAR(50) PRIMARY KEY,
+  version INT NOT NULL DEFAULT 1,
+  updatedAt DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+INSERT IGNORE INTO CatalogVersion (name, version) VALUES ('Card', 1);
+
 -- Active trades view derived from canonical Trade + Tradecard (single-card-per-side)
+-- Plain joins (no subqueries or GROUP BY) so MySQL can merge the view and push
+-- WHERE filters down to Trade's indexes.
 DROP VIEW IF EXISTS active_trades_view;
 CREATE VIEW active_trades_view AS
 SELECT
   t.tradeID,
   t.initiatorID AS initiatorID,
   t.recipientID AS responderID,
-  (SELECT tc.cardID FROM Tradecard tc WHERE tc.tradeID = t.tradeID AND tc.fromUserID = t.initiatorID LIMIT 1) AS cardOfferedByUser1,
-  (SELECT c1.name FROM Card c1 WHERE c1.cardID = (SELECT tc.cardID FROM Tradecard tc WHERE tc.tradeID = t.tradeID AND tc.fromUserID = t.initiatorID LIMIT 1)) AS cardOfferedByUser1Name,
-  (SELECT c1.imageURL FROM Card c1 WHERE c1.cardID = (SELECT tc.cardID FROM Tradecard tc WHERE tc.tradeID = t.tradeID AND tc.fromUserID = t.initiatorID LIMIT 1)) AS cardOfferedByUser1Image,
-  (SELECT tc.cardID FROM Tradecard tc WHERE tc.tradeID = t.tradeID AND tc.fromUserID = t.recipientID LIMIT 1) AS cardOfferedByUser2,
-  (SELECT c2.name FROM Card c2 WHERE c2.cardID = (SELECT tc.cardID FROM Tradecard tc WHERE tc.tradeID = t.tradeID AND tc.fromUserID = t.recipientID LIMIT 1)) AS cardOfferedByUser2Name,
-  (SELECT c2.imageURL FROM Card c2 WHERE c2.cardID = (SELECT tc.cardID FROM Tradecard tc WHERE tc.tradeID = t.tradeID AND tc.fromUserID = t.recipientID LIMIT 1)) AS cardOfferedByUser2Image,
+  tc1.cardID AS cardOfferedByUser1,
+  c1.name AS cardOfferedByUser1Name,
+  c1.imageURL AS cardOfferedByUser1Image,
+  tc2.cardID AS cardOfferedByUser2,
+  c2.name AS cardOfferedByUser2Name,
+  c2.imageURL AS cardOfferedByUser2Image,
   t.status,
   t.createdBy,
   t.confirmedBy,
   t.dateCompleted,
   t.dateStarted
-FROM Trade t;
+FROM Trade t
+LEFT JOIN Tradecard tc1 ON tc1.tradeID = t.tradeID AND tc1.fromUserID = t.initiatorID
+LEFT JOIN Card c1 ON c1.cardID = tc1.cardID
+LEFT JOIN Tradecard tc2 ON tc2.tradeID = t.tradeID AND tc2.fromUserID = t.recipientID
+LEFT JOIN Card c2 ON c2.cardID = tc2.cardID;
+
+-- Per-card demand/supply counters, maintained incrementally by the Wishlist/Collection
+-- triggers (02-triggers.sql) and rebuilt by 03-populate-card-market-stats.sql
+CREATE TABLE IF NOT EXISTS `CardMarketStats` (
+  cardID VARCHAR(50) PRIMARY KEY,
+  demand INT NOT NULL DEFAULT 0,
+  supply INT NOT NULL DEFAULT 0,
+  trend INT AS (demand - supply) STORED,
+  FOREIGN KEY (cardID) REFERENCES Card(cardID) ON DELETE CASCADE,
+  INDEX idx_cardmarketstats_trend (trend, demand, supply)
+);
 
--- Market Trends View
+-- Market Trends View (pre-aggregates each side instead of fanning out wishlist x collection)
 DROP VIEW IF EXISTS market_trends_view;
 CREATE VIEW market_trends_view AS
 SELECT
@@ -113,12 +151,11 @@ SELECT
     c.rarity,
     c.packName,
     c.imageURL,
-    COUNT(DISTINCT w.userID) AS demand,
-    COUNT(DISTINCT col.userID) AS supply,
-    (COUNT(DISTINCT w.userID) - COUNT(DISTINCT col.userID)) AS trend
+    COALESCE(w.demand, 0) AS demand,
+    COALESCE(col.supply, 0) AS supply,
+    (COALESCE(w.demand, 0) - COALESCE(col.supply, 0)) AS trend
 FROM Card c
-LEFT JOIN Wishlist w ON c.cardID = w.cardID
-LEFT JOIN Collection col ON c.cardID = col.cardID
-GROUP BY c.cardID, c.name, c.rarity, c.packName, c.imageURL;
+LEFT JOIN (SELECT cardID, COUNT(*) AS demand FROM Wishlist GROUP BY cardID) w ON w.cardID = c.cardID
+LEFT JOIN (SELECT cardID, COUNT(*) AS supply FROM Collection GROUP BY cardID) col ON col.cardID = c.cardID;
 
 -- End of schema
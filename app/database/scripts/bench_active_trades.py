@@ -0,0 +1,134 @@
+"""
+Before/after benchmark for the active trades read path.
+Seeds a large Trade/Tradecard dataset (default one million trades) and times the
+legacy correlated-subquery view against backend/sql/get_active_trades.sql.
+Not yet run: no results are recorded in database/README.md.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from pathlib import Path
+
+from bench_common import add_connection_args, connect, ensure_bench_users, summarize, time_query
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPT_DIR.parents[1] / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from sql_statements import compile_sql  # noqa: E402
+
+# Compiled the way the backend compiles it, so the timed SQL is exactly what the app runs
+NEW_QUERY = compile_sql("get_active_trades",
+                        (BACKEND_DIR / "sql" / "get_active_trades.sql").read_text(encoding="utf-8"))
+
+DEFAULT_TRADES = 1_000_000
+DEFAULT_USERS = 10_000
+BATCH_SIZE = 5_000
+
+# The active_trades_view definition this change replaced, recreated under another name
+LEGACY_VIEW_DDL = """
+CREATE OR REPLACE VIEW active_trades_view_legacy AS
+SELECT
+  t.tradeID, t.initiatorID AS initiatorID, t.recipientID AS responderID,
+  (SELECT tc.cardID FROM Tradecard tc WHERE tc.tradeID = t.tradeID AND tc.fromUserID = t.initiatorID LIMIT 1) AS cardOfferedByUser1,
+  (SELECT c1.name FROM Card c1 WHERE c1.cardID = (SELECT tc.cardID FROM Tradecard tc WHERE tc.tradeID = t.tradeID AND tc.fromUserID = t.initiatorID LIMIT 1)) AS cardOfferedByUser1Name,
+  (SELECT c1.imageURL FROM Card c1 WHERE c1.cardID = (SELECT tc.cardID FROM Tradecard tc WHERE tc.tradeID = t.tradeID AND tc.fromUserID = t.initiatorID LIMIT 1)) AS cardOfferedByUser1Image,
+  (SELECT tc.cardID FROM Tradecard tc WHERE tc.tradeID = t.tradeID AND tc.fromUserID = t.recipientID LIMIT 1) AS cardOfferedByUser2,
+  (SELECT c2.name FROM Card c2 WHERE c2.cardID = (SELECT tc.cardID FROM Tradecard tc WHERE tc.tradeID = t.tradeID AND tc.fromUserID = t.recipientID LIMIT 1)) AS cardOfferedByUser2Name,
+  (SELECT c2.imageURL FROM Card c2 WHERE c2.cardID = (SELECT tc.cardID FROM Tradecard tc WHERE tc.tradeID = t.tradeID AND tc.fromUserID = t.recipientID LIMIT 1)) AS cardOfferedByUser2Image,
+  t.status, t.createdBy, t.confirmedBy, t.dateCompleted, t.dateStarted
+FROM Trade t
+"""
+
+# The old get_active_trades.sql
+LEGACY_QUERY = """
+SELECT * FROM active_trades_view_legacy at
+WHERE at.initiatorID = %s OR at.responderID = %s
+ORDER BY at.dateStarted DESC
+"""
+
+
+def seed_trades(conn, cur, target: int, user_ids: list[int]) -> None:
+    cur.execute("SELECT COUNT(*), COALESCE(MAX(tradeID), 0) FROM Trade")
+    existing, next_id = cur.fetchone()
+    if existing >= target:
+        print(f"Trade already has {existing} rows; skipping seed.")
+        return
+    cur.execute("SELECT cardID FROM Card")
+    card_ids = [row[0] for row in cur.fetchall()]
+    if not card_ids:
+        raise SystemExit("ERROR: Card is empty; load init-prod.sql first.")
+
+    print(f"Seeding {target - existing} trades...")
+    trades, legs = [], []
+    for _ in range(target - existing):
+        next_id += 1
+        a, b = random.sample(user_ids, 2)
+        trades.append((next_id, a, b, a))
+        legs.append((next_id, a, random.choice(card_ids), b))
+        legs.append((next_id, b, random.choice(card_ids), a))
+        if len(trades) >= BATCH_SIZE:
+            flush(conn, cur, trades, legs)
+            trades, legs = [], []
+    if trades:
+        flush(conn, cur, trades, legs)
+
+
+def flush(conn, cur, trades, legs) -> None:
+    cur.executemany(
+        "INSERT INTO Trade (tradeID, initiatorID, recipientID, createdBy) VALUES (%s, %s, %s, %s)",
+        trades,
+    )
+    cur.executemany(
+        "INSERT INTO Tradecard (tradeID, fromUserID, cardID, toUserID) VALUES (%s, %s, %s, %s)",
+        legs,
+    )
+    conn.commit()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_connection_args(parser)
+    parser.add_argument("--trades", type=int, default=DEFAULT_TRADES, help="Trades to seed (default: %(default)s).")
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS, help="Bench users to spread trades over (default: %(default)s).")
+    parser.add_argument("--samples", type=int, default=50, help="Random users to time per query (default: %(default)s).")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the new query (legacy is very slow at 1M trades).")
+    parser.add_argument("--seed", type=int, default=None, help="Optional RNG seed.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    conn = connect(args)
+    cur = conn.cursor()
+    user_ids = ensure_bench_users(cur, args.users)
+    conn.commit()
+    seed_trades(conn, cur, args.trades, user_ids)
+
+    if not args.skip_legacy:
+        cur.execute(LEGACY_VIEW_DDL)
+
+    probe = random.sample(user_ids, min(args.samples, len(user_ids)))
+    results = {"new (UNION + one pass)": [], "legacy (correlated view)": []}
+    for user_id in probe:
+        results["new (UNION + one pass)"] += time_query(cur, *NEW_QUERY.render({"userId": user_id}))
+        if not args.skip_legacy:
+            results["legacy (correlated view)"] += time_query(cur, LEGACY_QUERY, (user_id, user_id))
+
+    if not args.skip_legacy:
+        cur.execute("DROP VIEW IF EXISTS active_trades_view_legacy")
+
+    print(f"Trades: {args.trades}  Users: {args.users}")
+    for label, samples in results.items():
+        if samples:
+            print(summarize(label, samples))
+
+
+if __name__ == "__main__":
+    main()
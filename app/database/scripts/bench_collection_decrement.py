@@ -0,0 +1,138 @@
+"""
+Concurrent decrements of one hot Collection row.
+Gives a bench user `--copies` copies of one card, then `--threads` connections remove copies
+until none are left, first with the legacy DELETE /api/collection path (SELECT ... FOR UPDATE,
+then UPDATE or DELETE) and then with backend/sql/decrement_collection.sql falling back to
+remove_from_collection.sql. Reports throughput, per-decrement latency and a lost-update check.
+Not yet run: no results are recorded in database/README.md.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+from bench_common import add_connection_args, connect, ensure_bench_users, summarize
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPT_DIR.parents[1] / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from sql_statements import compile_sql  # noqa: E402
+
+DECREMENT = compile_sql("decrement_collection",
+                        (BACKEND_DIR / "sql" / "decrement_collection.sql").read_text(encoding="utf-8"))
+REMOVE_LAST = compile_sql("remove_from_collection",
+                          (BACKEND_DIR / "sql" / "remove_from_collection.sql").read_text(encoding="utf-8"))
+
+
+def legacy_decrement(cur, user_id: int, card_id: str) -> bool:
+    """The handler before this change: lock, read, then write. False once the row is gone."""
+    cur.execute(
+        "SELECT quantity FROM Collection WHERE userID = %s AND cardID = %s FOR UPDATE",
+        (user_id, card_id),
+    )
+    row = cur.fetchone()
+    if not row:
+        return False
+    if int(row[0]) <= 1:
+        cur.execute("DELETE FROM Collection WHERE userID = %s AND cardID = %s", (user_id, card_id))
+    else:
+        cur.execute(
+            "UPDATE Collection SET quantity = %s WHERE userID = %s AND cardID = %s",
+            (int(row[0]) - 1, user_id, card_id),
+        )
+    return True
+
+
+def atomic_decrement(cur, user_id: int, card_id: str) -> bool:
+    key = {"userId": user_id, "cardId": card_id}
+    return bool(DECREMENT.execute(cur, key) or REMOVE_LAST.execute(cur, key))
+
+
+def run(args, label: str, decrement, user_id: int, card_id: str) -> None:
+    conn = connect(args)
+    cur = conn.cursor()
+    cur.execute("DELETE FROM Collection WHERE userID = %s AND cardID = %s", (user_id, card_id))
+    cur.execute(
+        "INSERT INTO Collection (userID, cardID, quantity) VALUES (%s, %s, %s)",
+        (user_id, card_id, args.copies),
+    )
+    conn.commit()
+
+    samples, removed, errors, lock = [], [0], [0], threading.Lock()
+    start = threading.Barrier(args.threads + 1)
+
+    def worker():
+        wconn = connect(args)
+        wcur = wconn.cursor()
+        start.wait()
+        while True:
+            began = time.perf_counter()
+            try:
+                more = decrement(wcur, user_id, card_id)
+                wconn.commit()
+            except Exception:
+                wconn.rollback()
+                with lock:
+                    errors[0] += 1
+                    if errors[0] > args.copies:
+                        break
+                continue
+            if not more:
+                break
+            with lock:
+                samples.append((time.perf_counter() - began) * 1000)
+                removed[0] += 1
+        wconn.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for t in threads:
+        t.start()
+    start.wait()
+    began = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - began
+
+    cur.execute("SELECT COUNT(*) FROM Collection WHERE userID = %s AND cardID = %s", (user_id, card_id))
+    left = cur.fetchone()[0]
+    conn.commit()
+    conn.close()
+    print(summarize(label, samples))
+    print(f"{'':<28} {removed[0] / elapsed:9.0f} decrements/s  removed={removed[0]}/{args.copies}  "
+          f"errors={errors[0]}  rows left={left}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_connection_args(parser)
+    parser.add_argument("--copies", type=int, default=5_000, help="Starting quantity of the hot row (default: %(default)s).")
+    parser.add_argument("--threads", type=int, default=32, help="Concurrent connections (default: %(default)s).")
+    parser.add_argument("--card", default=None, help="Card to use (default: the first cardID).")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    conn = connect(args)
+    cur = conn.cursor()
+    user_id = ensure_bench_users(cur, 1)[0]
+    if args.card:
+        card_id = args.card
+    else:
+        cur.execute("SELECT MIN(cardID) FROM Card")
+        card_id = cur.fetchone()[0]
+    conn.commit()
+    conn.close()
+
+    print(f"Hot row: user {user_id}, card {card_id}, {args.copies} copies, {args.threads} threads")
+    run(args, "legacy (FOR UPDATE + write)", legacy_decrement, user_id, card_id)
+    run(args, "atomic (UPDATE, then DELETE)", atomic_decrement, user_id, card_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Shared helpers for the database benchmark scripts in this directory.
+Connection settings default to the docker-compose `db` service as exposed on the host.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+
+try:
+    import MySQLdb
+except ImportError:  # pragma: no cover - only needed when actually benchmarking
+    MySQLdb = None
+
+
+def add_connection_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--host", default=os.environ.get("MYSQL_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("MYSQL_PORT", 3307)))
+    parser.add_argument("--user", default=os.environ.get("MYSQL_USER", "user"))
+    parser.add_argument("--password", default=os.environ.get("MYSQL_PASSWORD", "password"))
+    parser.add_argument("--database", default=os.environ.get("MYSQL_DATABASE", "app_db"))
+
+
+def connect(args):
+    if MySQLdb is None:
+        raise SystemExit("ERROR: mysqlclient not installed. Please run `pip install mysqlclient`.")
+    return MySQLdb.connect(
+        host=args.host, port=args.port, user=args.user, passwd=args.password, db=args.database
+    )
+
+
+def time_query(cur, sql: str, params, repeat: int = 1) -> list[float]:
+    """Run `sql` `repeat` times, fetching all rows; returns wall times in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cur.execute(sql, params)
+        cur.fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def summarize(label: str, samples: list[float]) -> str:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(len(ordered) * 0.95)) - 1)]
+    return (
+        f"{label:<28} n={len(ordered):<5} median={statistics.median(ordered):9.2f} ms  "
+        f"p95={p95:9.2f} ms  max={ordered[-1]:9.2f} ms"
+    )
+
+
+def ensure_bench_users(cur, count: int, prefix: str = "bench_user_") -> list[int]:
+    """Create `count` throwaway users (idempotent) and return their userIDs."""
+    cur.execute("SELECT COUNT(*) FROM User WHERE username LIKE %s", (prefix + "%",))
+    existing = cur.fetchone()[0]
+    batch = []
+    for idx in range(existing, count):
+        batch.append((f"{prefix}{idx}", "bench"))
+        if len(batch) >= 5000:
+            cur.executemany("INSERT INTO User (username, passwordHash) VALUES (%s, %s)", batch)
+            batch = []
+    if batch:
+        cur.executemany("INSERT INTO User (username, passwordHash) VALUES (%s, %s)", batch)
+    cur.execute(
+        "SELECT userID FROM User WHERE username LIKE %s ORDER BY userID LIMIT %s",
+        (prefix + "%", count),
+    )
+    return [row[0] for row in cur.fetchall()]
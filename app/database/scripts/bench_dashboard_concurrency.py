@@ -0,0 +1,108 @@
+"""
+Concurrent-dashboard load test comparing the sync backend (app.py under gunicorn) with the
+async read endpoints (async_app.py under uvicorn).
+
+One "dashboard" is the trades page's data: six GET requests issued at once.
+For each --dashboards level (default 50, 200 and 1000) the script opens that many dashboards
+at the same moment, waits for all six responses of each, and reports the per-dashboard
+latency (slowest of its six requests). With --aggregated a dashboard is the single
+/api/dashboard request instead. Users are spread over --users userIDs.
+Not yet run: no results are recorded in database/README.md.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from bench_common import summarize
+
+DASHBOARD_PATHS = (
+    "/api/active-trades?userID={user_id}",
+    "/api/users",
+    "/api/trade-opportunities?userID={user_id}",
+    "/api/collection?userID={user_id}",
+    "/api/matches?userID={user_id}",
+    "/api/cards",
+)
+AGGREGATED_PATHS = ("/api/dashboard?userID={user_id}",)
+DEFAULT_LEVELS = (50, 200, 1000)
+
+
+async def fetch(host: str, port: int, path: str, timeout: float) -> int:
+    """GET `path` on a fresh connection and return the status code (body is drained)."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode("ascii"))
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        # Connection: close, so the body ends at EOF whatever its framing
+        while await asyncio.wait_for(reader.read(65536), timeout):
+            pass
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def dashboard(host: str, port: int, paths, user_id: int, timeout: float) -> tuple[float, bool]:
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(fetch(host, port, p.format(user_id=user_id), timeout) for p in paths),
+        return_exceptions=True,
+    )
+    ok = all(isinstance(r, int) and r < 500 for r in results)
+    return (time.perf_counter() - started) * 1000, ok
+
+
+async def run_level(base: str, paths, dashboards: int, user_ids: range, timeout: float):
+    parts = urlsplit(base)
+    host, port = parts.hostname, parts.port or 80
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(dashboard(host, port, paths, user_ids[i % len(user_ids)], timeout) for i in range(dashboards))
+    )
+    elapsed = time.perf_counter() - started
+    samples = [ms for ms, ok in results if ok]
+    return samples, len(results) - len(samples), elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sync-url", default="http://127.0.0.1:5001")
+    parser.add_argument("--async-url", default="http://127.0.0.1:5002")
+    parser.add_argument("--dashboards", type=int, nargs="+", default=list(DEFAULT_LEVELS))
+    parser.add_argument("--first-user", type=int, default=1)
+    parser.add_argument("--users", type=int, default=100, help="distinct userIDs to spread dashboards over")
+    parser.add_argument("--rounds", type=int, default=3, help="measured rounds per level")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds per request")
+    parser.add_argument("--aggregated", action="store_true", help="one /api/dashboard request per dashboard")
+    args = parser.parse_args()
+
+    paths = AGGREGATED_PATHS if args.aggregated else DASHBOARD_PATHS
+
+    user_ids = range(args.first_user, args.first_user + args.users)
+    targets = [("sync", args.sync_url), ("async", args.async_url)]
+    for label, base in targets:
+        # Warm caches and connection pools before measuring
+        asyncio.run(run_level(base, paths, min(args.dashboards), user_ids, args.timeout))
+
+    for level in args.dashboards:
+        for label, base in targets:
+            samples, failed, elapsed = [], 0, 0.0
+            for _ in range(args.rounds):
+                s, f, e = asyncio.run(run_level(base, paths, level, user_ids, args.timeout))
+                samples.extend(s)
+                failed += f
+                elapsed += e
+            rate = len(samples) / elapsed if elapsed else 0.0
+            if samples:
+                print(summarize(f"{label} dashboards={level}", samples)
+                      + f"  dashboards/s={rate:7.1f}  failed={failed}")
+            else:
+                print(f"{label} dashboards={level}: no complete dashboards (failed={failed})")
+
+
+if __name__ == "__main__":
+    main()
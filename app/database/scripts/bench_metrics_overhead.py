@@ -0,0 +1,121 @@
+"""
+Cost of the /metrics instrumentation (backend/metrics.py).
+Without a database it isolates what the instrumentation adds: the cursor wrapper around a no-op
+cursor (per statement, with a fetchall) and the request hooks around a trivial Flask route
+(per request, through the test client). With --db it also times a real indexed Collection read
+through MySQLdb's Cursor and InstrumentedCursor, and reports the wrapper as a share of it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from bench_common import add_connection_args, connect
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPT_DIR.parents[1] / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from flask import Flask, jsonify  # noqa: E402
+
+import metrics  # noqa: E402
+
+ROWS = [(f"A1-{i:03d}", 1) for i in range(20)]
+
+
+class NoopCursor:
+    def execute(self, query, args=None):
+        return len(ROWS)
+
+    def fetchall(self):
+        return ROWS
+
+
+class InstrumentedNoopCursor(metrics._InstrumentedMixin, NoopCursor):
+    pass
+
+
+def per_call_us(fn, iterations: int, rounds: int = 5) -> float:
+    """Best of `rounds` runs of `iterations` calls, in microseconds per call."""
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = (time.perf_counter() - started) / iterations * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def statement_cost(cursor_class, iterations: int) -> float:
+    cur = cursor_class()
+
+    def run():
+        cur.statement_name = "get_collection"
+        cur.execute("SELECT 1", None)
+        cur.fetchall()
+
+    return per_call_us(run, iterations)
+
+
+def request_cost(instrumented: bool, iterations: int) -> float:
+    app = Flask(f"bench_{instrumented}")
+    app.add_url_rule("/ping", "ping", lambda: jsonify({"status": "success"}))
+    if instrumented:
+        metrics.Metrics(app)
+    client = app.test_client()
+    return per_call_us(lambda: client.get("/ping"), iterations)
+
+
+def db_statement_cost(args, cursor_class, user_id: int) -> float:
+    conn = connect(args)
+    cur = conn.cursor(cursor_class)
+
+    def run():
+        cur.statement_name = "get_collection"
+        cur.execute("SELECT cardID, quantity FROM Collection WHERE userID = %s", (user_id,))
+        cur.fetchall()
+
+    try:
+        return per_call_us(run, args.db_iterations)
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_connection_args(parser)
+    parser.add_argument("--iterations", type=int, default=100_000, help="Statements per round (default: %(default)s).")
+    parser.add_argument("--requests", type=int, default=5_000, help="Requests per round (default: %(default)s).")
+    parser.add_argument("--db", action="store_true", help="Also time a real statement against MySQL.")
+    parser.add_argument("--db-iterations", type=int, default=2_000, help="Statements per round with --db (default: %(default)s).")
+    parser.add_argument("--user-id", type=int, default=1, help="userID whose collection is read with --db.")
+    args = parser.parse_args()
+
+    # Instrumented cursors report to the most recently initialised Metrics instance
+    metrics.Metrics(Flask("bench_cursor"))
+    plain = statement_cost(NoopCursor, args.iterations)
+    wrapped = statement_cost(InstrumentedNoopCursor, args.iterations)
+    per_statement = wrapped - plain
+    print(f"{'no-op statement':<28} plain={plain:8.2f} us  instrumented={wrapped:8.2f} us  "
+          f"added={per_statement:6.2f} us/statement")
+
+    plain = request_cost(False, args.requests)
+    wrapped = request_cost(True, args.requests)
+    print(f"{'trivial request':<28} plain={plain:8.2f} us  instrumented={wrapped:8.2f} us  "
+          f"added={wrapped - plain:6.2f} us/request")
+
+    if args.db:
+        from MySQLdb.cursors import Cursor
+
+        plain = db_statement_cost(args, Cursor, args.user_id)
+        wrapped = db_statement_cost(args, metrics.InstrumentedCursor, args.user_id)
+        print(f"{'Collection read (MySQL)':<28} plain={plain:8.2f} us  instrumented={wrapped:8.2f} us  "
+              f"added={100 * (wrapped - plain) / plain:5.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark for /api/matches as the user count grows.
+For each scale (default 10 -> 100k users) it tops up bench users with random collections
+and wishlists, then times the legacy cross-join query (backend/sql/get_mutual_matches.sql)
+against the index-probing engine in backend/match_engine.py for a sample of users.
+Not yet run: no results are recorded in database/README.md.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+from bench_common import add_connection_args, connect, ensure_bench_users, summarize, time_query
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPT_DIR.parents[1] / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from match_engine import find_mutual_matches  # noqa: E402
+from sql_statements import compile_sql  # noqa: E402
+
+DEFAULT_SCALES = (10, 100, 1_000, 10_000, 100_000)
+DEFAULT_COLLECTION_RANGE = (8, 15)
+DEFAULT_WISHLIST_RANGE = (4, 8)
+BATCH_SIZE = 5_000
+
+
+def load_statement(name: str):
+    return compile_sql(name, (BACKEND_DIR / "sql" / f"{name}.sql").read_text(encoding="utf-8"))
+
+
+def seed_user_cards(conn, cur, user_ids: list[int], card_ids: list[str]) -> None:
+    """Give every bench user without a collection a random collection and wishlist."""
+    cur.execute("SELECT DISTINCT userID FROM Collection")
+    seeded = {row[0] for row in cur.fetchall()}
+    todo = [uid for uid in user_ids if uid not in seeded]
+    if not todo:
+        return
+    print(f"  seeding cards for {len(todo)} users...")
+    collection, wishlist = [], []
+    for uid in todo:
+        for card_id in random.sample(card_ids, random.randint(*DEFAULT_COLLECTION_RANGE)):
+            collection.append((uid, card_id, random.randint(1, 4)))
+        for card_id in random.sample(card_ids, random.randint(*DEFAULT_WISHLIST_RANGE)):
+            wishlist.append((uid, card_id))
+        if len(collection) >= BATCH_SIZE:
+            flush(conn, cur, collection, wishlist)
+            collection, wishlist = [], []
+    flush(conn, cur, collection, wishlist)
+
+
+def flush(conn, cur, collection, wishlist) -> None:
+    if wishlist:
+        cur.executemany("INSERT IGNORE INTO Wishlist (userID, cardID) VALUES (%s, %s)", wishlist)
+    if collection:
+        cur.executemany(
+            "INSERT IGNORE INTO Collection (userID, cardID, quantity) VALUES (%s, %s, %s)", collection
+        )
+    conn.commit()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_connection_args(parser)
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES),
+                        help="User counts to benchmark at (default: %(default)s).")
+    parser.add_argument("--samples", type=int, default=20, help="Users timed per scale (default: %(default)s).")
+    parser.add_argument("--legacy-max", type=int, default=10_000,
+                        help="Skip the legacy query above this many users (default: %(default)s).")
+    parser.add_argument("--seed", type=int, default=None, help="Optional RNG seed.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    conn = connect(args)
+    cur = conn.cursor()
+    cur.execute("SELECT cardID FROM Card")
+    card_ids = [row[0] for row in cur.fetchall()]
+    if not card_ids:
+        raise SystemExit("ERROR: Card is empty; load init-prod.sql first.")
+
+    legacy = load_statement("get_mutual_matches")
+    statements = {
+        name: load_statement(name)
+        for name in (
+            "match_owners_of_my_wishlist",
+            "match_wishers_of_my_collection",
+            "match_partner_usernames",
+        )
+    }
+
+    for scale in sorted(args.scales):
+        print(f"Scale: {scale} users")
+        user_ids = ensure_bench_users(cur, scale)
+        conn.commit()
+        seed_user_cards(conn, cur, user_ids, card_ids)
+
+        probe = random.sample(user_ids, min(args.samples, len(user_ids)))
+        engine_ms, legacy_ms = [], []
+        for user_id in probe:
+            engine_ms += time_engine(cur, statements, user_id)
+            if scale <= args.legacy_max:
+                legacy_ms += time_query(cur, legacy.sql, legacy.bind({"me": user_id}))
+        print("  " + summarize("engine (index probes)", engine_ms))
+        if legacy_ms:
+            print("  " + summarize("legacy (cross join)", legacy_ms))
+
+
+def time_engine(cur, statements, user_id) -> list[float]:
+    started = time.perf_counter()
+    find_mutual_matches(cur, statements, user_id)
+    return [(time.perf_counter() - started) * 1000]
+
+
+if __name__ == "__main__":
+    main()
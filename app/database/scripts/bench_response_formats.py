@@ -0,0 +1,71 @@
+"""
+Compares the response formats of the bulk endpoints on a running backend: body size,
+transfer time and client-side decode time for row JSON, columnar JSON, MessagePack and
+Arrow. Formats whose decoder (msgpack, pyarrow) is not installed locally are skipped.
+Not yet run: no results are recorded in database/README.md.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import time
+from urllib.parse import urlsplit
+
+from bench_common import summarize
+
+DEFAULT_PATHS = ("/api/cards", "/api/users", "/api/market-trends")
+
+
+def _decoders():
+    decoders = {"json": json.loads, "columnar": json.loads}
+    try:
+        import msgpack
+
+        decoders["msgpack"] = msgpack.unpackb
+    except ImportError:
+        pass
+    try:
+        import pyarrow.ipc
+
+        decoders["arrow"] = lambda body: pyarrow.ipc.open_stream(body).read_all()
+    except ImportError:
+        pass
+    return decoders
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://127.0.0.1:5001")
+    parser.add_argument("--path", action="append", dest="paths", help="endpoint to request (repeatable)")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    parts = urlsplit(args.base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=120)
+    decoders = _decoders()
+    for path in args.paths or DEFAULT_PATHS:
+        for name, decode in decoders.items():
+            target = path + ("&" if "?" in path else "?") + f"format={name}"
+            fetch_ms, decode_ms, size = [], [], 0
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                conn.request("GET", target)
+                resp = conn.getresponse()
+                body = resp.read()
+                fetched = time.perf_counter()
+                if resp.status != 200:
+                    raise SystemExit(f"{target}: HTTP {resp.status} {body[:200]!r}")
+                decode(body)
+                fetch_ms.append((fetched - started) * 1000)
+                decode_ms.append((time.perf_counter() - fetched) * 1000)
+                size = len(body)
+            print(f"{path} [{name}] bytes={size}")
+            print("  " + summarize("fetch", fetch_ms))
+            print("  " + summarize("decode", decode_ms))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
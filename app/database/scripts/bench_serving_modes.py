@@ -0,0 +1,107 @@
+"""
+HTTP load test for comparing backend serving modes, e.g. the Werkzeug development server
+(`python app.py`) against gunicorn (`gunicorn -c gunicorn.conf.py wsgi:app`).
+Start the backend in one mode, run this script, restart in the other mode and run it again
+with a different --label. Each client thread keeps one HTTP/1.1 connection alive and
+requests the endpoints round-robin for --duration seconds per concurrency level.
+--accept-encoding (e.g. "br, gzip") measures compressed responses; the mean body size on the
+wire is reported alongside the latencies.
+Not yet run: no results are recorded in database/README.md.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+from bench_common import summarize
+
+DEFAULT_PATHS = (
+    "/api/cards",
+    "/api/collection?userID=1",
+    "/api/wishlist?userID=1",
+    "/api/market-trends",
+)
+DEFAULT_CONCURRENCY = (1, 8, 32, 64)
+
+
+def client_loop(base, paths, headers, deadline, samples, errors, sizes, lock):
+    parts = urlsplit(base)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    local_samples, local_errors, local_bytes = [], 0, 0
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+            local_bytes += len(resp.read())
+            if resp.status >= 500:
+                local_errors += 1
+            else:
+                local_samples.append((time.perf_counter() - started) * 1000)
+        except (OSError, http.client.HTTPException):
+            local_errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    conn.close()
+    with lock:
+        samples.extend(local_samples)
+        errors[0] += local_errors
+        sizes[0] += local_bytes
+
+
+def run_level(base, paths, concurrency, duration, headers=None):
+    samples, errors, sizes, lock = [], [0], [0], threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(
+            target=client_loop,
+            args=(base, paths, headers or {}, deadline, samples, errors, sizes, lock),
+        )
+        for _ in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    mean_bytes = sizes[0] / (len(samples) + errors[0]) if samples or errors[0] else 0.0
+    return samples, errors[0], time.perf_counter() - started, mean_bytes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://127.0.0.1:5001")
+    parser.add_argument("--label", default="backend", help="name of the serving mode under test")
+    parser.add_argument("--path", action="append", dest="paths", help="endpoint to request (repeatable)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(DEFAULT_CONCURRENCY))
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per concurrency level")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of unmeasured load first")
+    parser.add_argument("--accept-encoding", help='Accept-Encoding to send, e.g. "br, gzip"')
+    args = parser.parse_args()
+
+    headers = {"Accept-Encoding": args.accept_encoding} if args.accept_encoding else {}
+
+    paths = args.paths or list(DEFAULT_PATHS)
+    print(f"{args.label}: {args.base_url} paths={paths}")
+    if args.warmup > 0:
+        run_level(args.base_url, paths, min(args.concurrency), args.warmup, headers)
+
+    for concurrency in args.concurrency:
+        samples, errors, elapsed, mean_bytes = run_level(
+            args.base_url, paths, concurrency, args.duration, headers)
+        rps = len(samples) / elapsed if elapsed else 0.0
+        if samples:
+            print(summarize(f"{args.label} c={concurrency}", samples) + f"  rps={rps:8.1f}  bytes={mean_bytes:9.0f}  errors={errors}")
+        else:
+            print(f"{args.label} c={concurrency}: no successful requests (errors={errors})")
+
+
+if __name__ == "__main__":
+    main()
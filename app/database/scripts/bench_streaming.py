@@ -0,0 +1,74 @@
+"""
+Compares buffered and streamed (`stream=1`) responses of the large list endpoints on a running
+backend: time to first byte, total time and body size per request. With --pid (the backend
+worker's process id, e.g. a single `gunicorn -w 1` worker) the worker's resident and peak
+memory are read from /proc after each mode.
+Not yet run: no results are recorded in database/README.md.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import time
+from urllib.parse import urlsplit
+
+from bench_common import summarize
+
+DEFAULT_PATHS = (
+    "/api/cards?fields=cardID,name",
+    "/api/users",
+    "/api/market-trends",
+    "/api/collection?userID=1",
+    "/api/wishlist?userID=1",
+)
+
+
+def fetch(conn: http.client.HTTPConnection, path: str) -> tuple[float, float, int]:
+    started = time.perf_counter()
+    conn.request("GET", path)
+    resp = conn.getresponse()
+    first = resp.read(1)
+    ttfb = time.perf_counter() - started
+    size = len(first) + len(resp.read())
+    return ttfb * 1000, (time.perf_counter() - started) * 1000, size
+
+
+def memory(pid: int) -> str:
+    fields = {}
+    with open(f"/proc/{pid}/status") as fh:
+        for line in fh:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                fields[key] = value.strip()
+    return f"rss={fields.get('VmRSS')} peak={fields.get('VmHWM')}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://127.0.0.1:5001")
+    parser.add_argument("--path", action="append", dest="paths", help="endpoint to request (repeatable)")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--pid", type=int, help="backend worker pid to sample memory from")
+    args = parser.parse_args()
+
+    parts = urlsplit(args.base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=120)
+    for path in args.paths or DEFAULT_PATHS:
+        streamed = path + ("&" if "?" in path else "?") + "stream=1"
+        for label, target in (("buffered", path), ("streamed", streamed)):
+            ttfb, total, size = [], [], 0
+            for _ in range(args.repeat):
+                first, whole, size = fetch(conn, target)
+                ttfb.append(first)
+                total.append(whole)
+            print(f"{path} [{label}] bytes={size}")
+            print("  " + summarize("first byte", ttfb))
+            print("  " + summarize("total", total))
+            if args.pid:
+                print("  " + memory(args.pid))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
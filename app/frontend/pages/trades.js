@@ -52,40 +52,36 @@ const TradesPage = () => {
   useEffect(() => {
     if (!mounted || !userID) return;
     setLoading(true);
-    // fetch active trades, users and opportunities
+    // one round trip for active trades, users, opportunities, collection, matches and cards
     const base = "http://localhost:5001";
-    Promise.all([
-      fetch(`${base}/api/active-trades?userID=${userID}`).then((r) => r.json()),
-      fetch(`${base}/api/users`).then((r) => r.json()),
-      fetch(`${base}/api/trade-opportunities?userID=${userID}`).then((r) =>
-        r.json()
-      ),
-      fetch(`${base}/api/collection?userID=${userID}`).then((r) => r.json()),
-      fetch(`${base}/api/matches?userID=${userID}`).then((r) => r.json()),
-      fetch(`${base}/api/cards`).then((r) => r.json()),
-    ])
-      .then(([tradesRes, usersRes, oppRes, collRes, matchesRes, cardsRes]) => {
-        if (tradesRes && tradesRes.status === "success")
-          setActiveTrades(tradesRes.items || []);
-        if (usersRes && usersRes.status === "success") {
+    fetch(`${base}/api/dashboard?userID=${userID}`)
+      .then((r) => r.json())
+      .then((dash) => {
+        if (!dash || dash.status !== "success") return;
+        const {
+          activeTrades: tradesRes,
+          users: usersRes,
+          tradeOpportunities: oppRes,
+          collection: collRes,
+          matches: matchesRes,
+          cards: cardsRes,
+        } = dash;
+        if (tradesRes) setActiveTrades(tradesRes.items || []);
+        if (usersRes) {
           const um = {};
           (usersRes.users || []).forEach((u) => {
             um[u.userID] = u.username || u.name || `User ${u.userID}`;
           });
           setUsersMap(um);
         }
-        if (oppRes && oppRes.status === "success")
-          setOpportunities(oppRes.items || []);
-        if (collRes && collRes.status === "success")
-          setMyCollection(collRes.items || []);
-        if (matchesRes && matchesRes.status === "success")
-          setMatches(matchesRes.items || []);
-        if (cardsRes && (cardsRes.cards || cardsRes.items || cardsRes)) {
-          // backend returns { status, cards } while some endpoints may return items
-          const arr = cardsRes.cards || cardsRes.items || cardsRes;
-          setAllCards(arr || []);
+        if (oppRes) setOpportunities(oppRes.items || []);
+        if (collRes) setMyCollection(collRes.items || []);
+        if (matchesRes) setMatches(matchesRes.items || []);
+        if (cardsRes) {
+          const arr = cardsRes.cards || [];
+          setAllCards(arr);
           const map = {};
-          (arr || []).forEach((c) => {
+          arr.forEach((c) => {
             map[c.cardID] = c;
           });
           setCardsMap(map);